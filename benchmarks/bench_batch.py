@@ -0,0 +1,74 @@
+import argparse
+import random
+import sys
+import time
+from typing import Dict, List
+
+from src.logic import EPSLogic
+from src.models import EPSInput, ExtraPart
+
+# Batch Quoting Benchmark
+# EPSLogic.calculate_many against one calculate() per item on the same
+# seeded price list (distinct box sizes, 0-2 caps, mostly order quotes).
+# Both engines run cold (cache_size=0) so every size is computed; input
+# models are built before timing, as /calculate/batch receives them parsed.
+#
+#   python -m benchmarks.bench_batch
+#   python -m benchmarks.bench_batch --items 2000 --repeat 7
+#
+# Reports quotes/s for both paths (best of --repeat) and checks that the
+# results are identical.
+
+
+def price_list(n: int, seed: int = 1) -> List[EPSInput]:
+    rng = random.Random(seed)
+    items = []
+    for _ in range(n):
+        parts = [ExtraPart(name=f"Kapak {i + 1}", count=1, thickness_cm=rng.choice([1.0, 1.5, 2.0]))
+                 for i in range(rng.choice([0, 0, 1, 2]))]
+        items.append(EPSInput(
+            boy=round(rng.uniform(5, 60), 1), en=round(rng.uniform(5, 50), 1),
+            yukseklik=round(rng.uniform(3, 40), 1), wall_thickness=rng.choice([0.5, 1.0, 1.5]),
+            extra_parts=parts, req_boxes=rng.choice([None, rng.randint(50, 20000)]),
+        ))
+    return items
+
+
+def run(n_items: int, repeat: int = 5, seed: int = 1) -> Dict:
+    items = price_list(n_items, seed)
+    engine = EPSLogic(cache_size=0)
+    single = [engine.calculate(d) for d in items]
+    if engine.calculate_many(items) != single:
+        raise AssertionError("calculate_many differs from calculate")
+    # Interleaved, so drift on a shared box hits both paths alike
+    single_s = batch_s = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        [engine.calculate(d) for d in items]
+        single_s = min(single_s, time.perf_counter() - start)
+        start = time.perf_counter()
+        engine.calculate_many(items)
+        batch_s = min(batch_s, time.perf_counter() - start)
+    return {
+        "items": n_items,
+        "single_per_s": round(n_items / single_s, 1),
+        "batch_per_s": round(n_items / batch_s, 1),
+        "speedup": round(single_s / batch_s, 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="calculate_many vs calculate benchmark")
+    parser.add_argument("--items", type=int, default=1000, help="box sizes in the price list")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per path (best counts)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    r = run(args.items, args.repeat, args.seed)
+    print(f"{r['items']} items: calculate {r['single_per_s']:.0f}/s, "
+          f"calculate_many {r['batch_per_s']:.0f}/s ({r['speedup']:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.logic import EPSLogic
+from src.models import EPSInput, ExtraPart
+
+# Engine Benchmark
+# Drives EPSLogic.calculate over a fixed corpus (tiny and huge footprints,
+# 0-8 extra parts, order and no-order quotes, very large req_boxes) and
+# reports ops/sec, p50/p99 latency and peak traced memory per scenario.
+#
+# Every scenario runs "cold" (cache_size=0: cut dims, axis selection,
+# planning, pricing and report on each call) and "warm" (geometry cache
+# hit, the path repeated quotes take).
+#
+#   python -m benchmarks.bench_engine --out bench.json
+#   python -m benchmarks.bench_engine --baseline bench.json --threshold 0.2
+#
+# With --baseline the run fails (exit 1) when a scenario is slower than the
+# baseline by more than the threshold (ops/sec or p50), uses more peak
+# memory than the threshold allows, or returns a different blocks_needed.
+
+MODES = ("cold", "warm")
+MEMORY_FLOOR_KIB = 64.0  # peaks below this are noise, not compared
+
+
+def _parts(n: int) -> List[ExtraPart]:
+    # n caps / separators of varying thickness and count
+    return [ExtraPart(name=f"Parca {i + 1}", count=1 + i % 3, thickness_cm=1.0 + 0.5 * (i % 4))
+            for i in range(n)]
+
+
+def _input(boy, en, yukseklik, wall=1.0, parts=0, req=None, **kw) -> EPSInput:
+    return EPSInput(boy=boy, en=en, yukseklik=yukseklik, wall_thickness=wall,
+                    extra_parts=_parts(parts), req_boxes=req, **kw)
+
+
+# name -> input. Fixed: results are only comparable on the same corpus.
+CORPUS: Dict[str, EPSInput] = {
+    "tiny_no_order": _input(2, 2, 1.5, wall=0.2),
+    "tiny_order_1m": _input(2, 2, 1.5, wall=0.2, req=1_000_000),
+    "tiny_8_parts_order": _input(3, 2, 2, wall=0.2, parts=8, req=200_000),
+    "small_caps_no_order": _input(22.5, 18.5, 16.4, wall=0.5, parts=2),
+    "medium_order_500": _input(40, 30, 20, req=500),
+    "medium_4_parts_order": _input(40, 30, 20, parts=4, req=2_500),
+    "medium_8_parts_no_order": _input(40, 30, 20, parts=8),
+    "medium_8_parts_order": _input(40, 30, 20, parts=8, req=10_000),
+    "mixed_blocks_order": _input(40, 30, 20, parts=3, req=7_777, multi_block="mixed"),
+    "large_44cm_order": _input(50, 50, 50, wall=2.0, parts=2, req=100),
+    "huge_order_10m": _input(60, 45, 35, parts=3, req=10_000_000),
+    "huge_footprint_order": _input(110, 95, 80, req=50),
+    "oversize_no_fit": _input(250, 130, 120, req=10),
+}
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    # Nearest-rank percentile of an ascending list
+    k = max(0, min(len(sorted_values) - 1, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def _engine(mode: str, strategy: str, packing: str) -> EPSLogic:
+    return EPSLogic(strategy=strategy, packing=packing, cache_size=0 if mode == "cold" else 1024)
+
+
+def run_scenario(data: EPSInput, mode: str, strategy: str = "fast", packing: str = "grid",
+                 min_time: float = 0.5, min_iters: int = 20, time_budget: Optional[float] = None,
+                 mem_iters: int = 3) -> Dict:
+    engine = _engine(mode, strategy, packing)
+    calc: Callable = lambda: engine.calculate(data, time_budget=time_budget)
+
+    out = calc()  # warm-up (fills the cache in warm mode)
+    calc()
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < min_iters or time.perf_counter() - start < min_time:
+        t = time.perf_counter()
+        calc()
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+
+    # Peak memory in a separate pass: tracemalloc slows every allocation
+    mem_engine = _engine(mode, strategy, packing)
+    if mode == "warm":
+        mem_engine.calculate(data, time_budget=time_budget)
+    tracemalloc.start()
+    try:
+        for _ in range(mem_iters):
+            mem_engine.calculate(data, time_budget=time_budget)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "iterations": len(latencies),
+        "ops_per_s": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 4),
+        "peak_kib": round(peak / 1024, 1),
+        "blocks_needed": out.blocks_needed,
+        "optimal": out.optimal,
+    }
+
+
+def run(names: List[str], modes=MODES, **kw) -> Dict:
+    results = {}
+    for name in names:
+        for mode in modes:
+            results[f"{name}/{mode}"] = run_scenario(CORPUS[name], mode, **kw)
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[Tuple[str, str]]:
+    # [(scenario, reason)] for every regression against the baseline results
+    problems = []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if cur["blocks_needed"] != base["blocks_needed"]:
+            problems.append((key, f"blocks_needed {base['blocks_needed']} -> {cur['blocks_needed']}"))
+        if cur["ops_per_s"] < base["ops_per_s"] * (1 - threshold):
+            problems.append((key, f"ops/s {base['ops_per_s']} -> {cur['ops_per_s']}"))
+        if cur["p50_ms"] > base["p50_ms"] * (1 + threshold):
+            problems.append((key, f"p50 {base['p50_ms']} ms -> {cur['p50_ms']} ms"))
+        if (base["peak_kib"] >= MEMORY_FLOOR_KIB
+                and cur["peak_kib"] > base["peak_kib"] * (1 + threshold)):
+            problems.append((key, f"peak {base['peak_kib']} KiB -> {cur['peak_kib']} KiB"))
+    return problems
+
+
+def _meta(args) -> Dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "strategy": args.strategy,
+        "packing": args.packing,
+        "min_time_s": args.min_time,
+        "created_unix": int(time.time()),
+    }
+
+
+def _table(results: Dict) -> str:
+    head = f"{'scenario':<34}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'peak KiB':>10}{'blocks':>10}"
+    lines = [head, "-" * len(head)]
+    for key, r in results.items():
+        lines.append(f"{key:<34}{r['ops_per_s']:>12.1f}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+                     f"{r['peak_kib']:>10.1f}{r['blocks_needed']:>10}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="EPSLogic.calculate benchmark")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed relative regression (default 0.2 = 20%%)")
+    parser.add_argument("--only", action="append", default=[],
+                        help="run scenarios whose name contains this (repeatable)")
+    parser.add_argument("--modes", default=",".join(MODES), help="cold,warm")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per scenario")
+    parser.add_argument("--strategy", default="fast")
+    parser.add_argument("--packing", default="grid")
+    parser.add_argument("--time-budget-ms", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    names = [n for n in CORPUS if not args.only or any(s in n for s in args.only)]
+    results = run(
+        names, modes=[m for m in args.modes.split(",") if m],
+        strategy=args.strategy, packing=args.packing, min_time=args.min_time,
+        time_budget=args.time_budget_ms / 1000.0 if args.time_budget_ms else None,
+    )
+    print(_table(results))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"meta": _meta(args), "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("strategy", args.strategy) != args.strategy:
+            print("warning: baseline was recorded with another planning strategy")
+        problems = compare(results, baseline["results"], args.threshold)
+        for key, reason in problems:
+            print(f"REGRESSION {key}: {reason}")
+        if problems:
+            return 1
+        print(f"no regressions above {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
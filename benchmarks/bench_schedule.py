@@ -0,0 +1,76 @@
+import argparse
+import random
+import sys
+import time
+from typing import Dict, List
+
+from src.logic import EPSLogic
+from src.models import EPSInput, Machine, ScheduleInput, ScheduleJob
+from src.scheduling import schedule
+
+# Scheduler Benchmark
+# Times scheduling.schedule on a seeded queue of order quotes (thousands of
+# blocks) over three machines of different speed, once per objective. The
+# plans are computed up front; only the scheduler is timed (best of
+# --repeat runs).
+#
+#   python -m benchmarks.bench_schedule
+#   python -m benchmarks.bench_schedule --jobs 1000 --max-s 1.0
+#
+# With --max-s the run fails (exit 1) when an objective takes longer.
+
+OBJECTIVES = ("makespan", "lateness")
+
+
+def jobs(n: int, seed: int = 1) -> List[ScheduleJob]:
+    rng = random.Random(seed)
+    engine = EPSLogic()
+    return [ScheduleJob(
+        job_id=f"J{i}",
+        plan=engine.calculate(EPSInput(
+            boy=rng.uniform(15, 60), en=rng.uniform(15, 50), yukseklik=rng.uniform(8, 40),
+            wall_thickness=1, req_boxes=rng.randint(50, 3000),
+        )),
+        due_s=rng.uniform(3600, 30 * 8 * 3600),
+    ) for i in range(n)]
+
+
+def run(n_jobs: int, repeat: int = 5, seed: int = 1) -> Dict:
+    queue = jobs(n_jobs, seed)
+    machines = [Machine(name="A"), Machine(name="B", speed=1.5), Machine(name="C", speed=0.8)]
+    results = {}
+    for objective in OBJECTIVES:
+        req = ScheduleInput(jobs=queue, machines=machines, objective=objective)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            out = schedule(req)
+            best = min(best, time.perf_counter() - start)
+        results[objective] = {
+            "jobs": n_jobs,
+            "blocks": sum(len(m.blocks) for m in out.machines),
+            "seconds": round(best, 4),
+        }
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="scheduling.schedule benchmark")
+    parser.add_argument("--jobs", type=int, default=300, help="queued order quotes")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per objective (best counts)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-s", type=float, default=None, help="fail above this many seconds")
+    args = parser.parse_args(argv)
+
+    results = run(args.jobs, args.repeat, args.seed)
+    failed = False
+    for objective, r in results.items():
+        print(f"{objective:<10}{r['jobs']:>6} jobs{r['blocks']:>8} blocks{r['seconds']:>10.4f} s")
+        if args.max_s is not None and r["seconds"] > args.max_s:
+            print(f"SLOW {objective}: {r['seconds']} s > {args.max_s} s")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
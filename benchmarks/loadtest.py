@@ -0,0 +1,305 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+# HTTP Load Test (/calculate or /calculate/lean end to end)
+# Starts the app under uvicorn on a free local port (or targets --url) and
+# fires /calculate requests from a seeded, realistic input mix: mostly
+# order quotes, some price checks without req_boxes, 0-3 caps, with
+# repeated products (Zipf weights) so caches and coalescing see real reuse.
+#
+#   closed loop: --concurrency clients, each sends its next request as soon
+#                as the previous one returns (max throughput)
+#   open loop:   --rate requests/s with Poisson arrivals over at most
+#                --concurrency connections; latency is measured from the
+#                scheduled arrival, so queueing is not hidden
+#
+#   python -m benchmarks.loadtest --workers 2 --pool-workers 2 --concurrency 32
+#   python -m benchmarks.loadtest --rate 300 --duration 30 --json run.json
+#
+# The client is a minimal HTTP/1.1 keep-alive client on asyncio streams, so
+# it needs nothing beyond the standard library and stays cheap next to the
+# server it measures. Everything runs offline on one box.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# --- Input mix ---
+
+def payloads(n: int, seed: int = 1) -> List[bytes]:
+    # n distinct /calculate bodies
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        data = {
+            "boy": round(rng.uniform(10, 80), 1),
+            "en": round(rng.uniform(8, 60), 1),
+            "yukseklik": round(rng.uniform(5, 50), 1),
+            "wall_thickness": rng.choice([0.5, 1.0, 1.5, 2.0]),
+            "extra_parts": [
+                {"name": f"Kapak {i + 1}", "count": 1, "thickness_cm": rng.choice([1.0, 1.5, 2.0])}
+                for i in range(rng.choice([0, 0, 1, 2, 2, 3]))
+            ],
+        }
+        if rng.random() < 0.75:
+            data["req_boxes"] = int(math.exp(rng.uniform(math.log(50), math.log(50_000))))
+        out.append(json.dumps(data).encode())
+    return out
+
+
+def zipf_weights(n: int, s: float) -> List[float]:
+    # Popularity of the i-th product; s = 0 -> uniform
+    return [1.0 / (i + 1) ** s for i in range(n)]
+
+
+# --- Minimal HTTP/1.1 client ---
+
+class Connection:
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def _open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> Tuple[int, bytes]:
+        if self.writer is None:
+            await self._open()
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+        try:
+            self.writer.write(head.encode() + body)
+            await self.writer.drain()
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionError("connection closed by server")
+            status = int(status_line.split()[1])
+            length, chunked, close = 0, False, False
+            while True:
+                line = await self.reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                name, value = name.strip().lower(), value.strip().lower()
+                if name == "content-length":
+                    length = int(value)
+                elif name == "transfer-encoding" and "chunked" in value:
+                    chunked = True
+                elif name == "connection" and value == "close":
+                    close = True
+            if chunked:
+                data = b""
+                while True:
+                    size = int((await self.reader.readline()).split(b";")[0], 16)
+                    chunk = await self.reader.readexactly(size + 2)
+                    if size == 0:
+                        break
+                    data += chunk[:-2]
+            else:
+                data = await self.reader.readexactly(length)
+        except Exception:
+            self.close()
+            raise
+        if close:
+            self.close()
+        return status, data
+
+
+# --- Load models ---
+
+class Recorder:
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+
+    def add(self, started: float, status: str):
+        if started < self.measure_from:
+            return  # warm-up
+        self.latencies.append(time.perf_counter() - started)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+
+async def _send(conn: Connection, path: str, body: bytes, rec: Recorder, started: float):
+    try:
+        status, _ = await conn.request("POST", path, body)
+        rec.add(started, str(status))
+    except Exception as e:
+        rec.add(started, type(e).__name__)
+
+
+async def closed_loop(host, port, path, bodies, weights, concurrency, end, rec, seed):
+    async def client(i):
+        rng = random.Random(seed + i)
+        conn = Connection(host, port)
+        while time.perf_counter() < end:
+            body = rng.choices(bodies, weights)[0]
+            await _send(conn, path, body, rec, time.perf_counter())
+        conn.close()
+
+    await asyncio.gather(*[client(i) for i in range(concurrency)])
+
+
+async def open_loop(host, port, path, bodies, weights, concurrency, end, rec, seed, rate):
+    rng = random.Random(seed)
+    idle: asyncio.Queue = asyncio.Queue()
+    for _ in range(concurrency):
+        idle.put_nowait(Connection(host, port))
+
+    async def arrival(body, scheduled):
+        conn = await idle.get()
+        try:
+            await _send(conn, path, body, rec, scheduled)
+        finally:
+            idle.put_nowait(conn)
+
+    tasks = []
+    next_at = time.perf_counter()
+    while next_at < end:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(arrival(rng.choices(bodies, weights)[0], next_at)))
+        next_at += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    while not idle.empty():
+        idle.get_nowait().close()
+
+
+# --- Report ---
+
+def summarize(rec: Recorder, seconds: float) -> Dict:
+    lat = sorted(rec.latencies)
+    total = len(lat)
+    errors = total - rec.statuses.get("200", 0)
+
+    def pct(q):
+        if not lat:
+            return None
+        return round(lat[max(0, min(total - 1, math.ceil(q * total) - 1))] * 1000, 3)
+
+    return {
+        "requests": total,
+        "throughput_rps": round(total / seconds, 1) if seconds > 0 else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "statuses": rec.statuses,
+        "latency_ms": {"p50": pct(0.50), "p90": pct(0.90), "p99": pct(0.99), "max": pct(1.0)},
+    }
+
+
+# --- Server ---
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, workers: int, env: Dict[str, str]) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1",
+           "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen(cmd, cwd=ROOT, env={**os.environ, **env})
+
+
+async def wait_ready(host: str, port: int, timeout: float = 60.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        conn = Connection(host, port)
+        try:
+            status, _ = await conn.request("GET", "/health")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            conn.close()
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"server on {host}:{port} not ready after {timeout:.0f}s")
+
+
+async def _run(args, host, port) -> Dict:
+    bodies = payloads(args.products, args.seed)
+    weights = zipf_weights(len(bodies), args.zipf)
+    await wait_ready(host, port)
+    start = time.perf_counter()
+    rec = Recorder(start + args.warmup)
+    end = start + args.warmup + args.duration
+    if args.rate:
+        await open_loop(host, port, args.path, bodies, weights, args.concurrency, end, rec,
+                        args.seed, args.rate)
+    else:
+        await closed_loop(host, port, args.path, bodies, weights, args.concurrency, end, rec,
+                          args.seed)
+    return summarize(rec, time.perf_counter() - rec.measure_from)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local /calculate load test")
+    parser.add_argument("--url", help="target a running server (http://host:port) instead")
+    parser.add_argument("--path", default="/calculate", help="/calculate or /calculate/lean")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--pool-workers", type=int, default=None,
+                        help="SFT_POOL_WORKERS per uvicorn worker (default: app default)")
+    parser.add_argument("--env", action="append", default=[],
+                        help="extra server env KEY=VALUE (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=16, help="connections")
+    parser.add_argument("--rate", type=float, default=None, help="open loop: requests/s")
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds first")
+    parser.add_argument("--products", type=int, default=200, help="distinct inputs in the mix")
+    parser.add_argument("--zipf", type=float, default=1.0, help="popularity skew (0 = uniform)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write the summary JSON here")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        host, _, port = args.url.split("://", 1)[-1].rstrip("/").partition(":")
+        port = int(port or 80)
+    else:
+        host, port = "127.0.0.1", _free_port()
+        env = dict(kv.split("=", 1) for kv in args.env)
+        if args.pool_workers is not None:
+            env["SFT_POOL_WORKERS"] = str(args.pool_workers)
+        server = start_server(port, args.workers, env)
+    try:
+        summary = asyncio.run(_run(args, host, port))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    summary["config"] = {
+        "path": args.path, "model": "open" if args.rate else "closed", "rate": args.rate,
+        "concurrency": args.concurrency, "workers": None if args.url else args.workers,
+        "pool_workers": args.pool_workers, "duration_s": args.duration,
+        "products": args.products, "zipf": args.zipf,
+    }
+    lat = summary["latency_ms"]
+    print(f"{summary['config']['model']} loop, {args.concurrency} connections: "
+          f"{summary['requests']} requests, {summary['throughput_rps']} req/s, "
+          f"errors {summary['error_rate']:.2%}")
+    print(f"latency ms  p50 {lat['p50']}  p90 {lat['p90']}  p99 {lat['p99']}  max {lat['max']}")
+    print(f"statuses    {summary['statuses']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
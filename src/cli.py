@@ -0,0 +1,204 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from .logic import EPSLogic
+from .models import EPSInput
+from .pricing import load_pricing_config, load_block_catalogue
+
+# Offline Bulk Quoting
+#   python -m src.cli catalogue.csv -o quotes.csv
+#   python -m src.cli - --format ndjson --workers 8 < catalogue.csv > quotes.ndjson
+#
+# Input CSV (header row; only the first four columns are required):
+#   boy, en, yukseklik, wall_thickness, req_boxes, dns, multi_block, id,
+#   parts = "name:count:thickness_cm;name:count:thickness_cm"
+# Rows are read as a stream and sent to a process pool in chunks; at most
+# 2 chunks per worker are in flight, and results are written chunk by chunk
+# in input order, so memory stays bounded for any catalogue size.
+# Every row gets the spec 8.1 fields (EPSLogic.calculate_lean); a row that
+# fails validation gets an error instead and does not stop the run.
+# Pricing, block catalogue, strategy and packing follow the API settings
+# (SFT_PRICING_CONFIG, SFT_BLOCK_CATALOGUE, ...; see main.py).
+#
+# Only the engine is imported (no FastAPI, no numpy unless guillotine
+# packing asks for it), so startup stays small.
+
+FORMATS = ("csv", "ndjson")
+CSV_COLUMNS = ["row", "id", "blocks_needed", "unit_price", "total_price",
+               "per_block", "total_produced", "required", "excess", "error"]
+INPUT_FIELDS = ("boy", "en", "yukseklik", "wall_thickness", "req_boxes", "dns", "multi_block")
+
+Row = Tuple[int, Dict[str, str]]  # (1-based row number, CSV record)
+
+_engine: Optional[EPSLogic] = None
+_format = "csv"
+_time_budget: Optional[float] = None
+
+
+def init(fmt: str, strategy: str, cache_size: int, packing: str,
+         time_budget: Optional[float]) -> None:
+    # Per process (pool initializer, or in-process with --workers 0)
+    global _engine, _format, _time_budget
+    _engine = EPSLogic(
+        strategy=strategy, cache_size=cache_size, pricing=load_pricing_config(), packing=packing,
+        packing_budget=float(os.environ.get("SFT_PACKING_BUDGET_MS", "500")) / 1000.0,
+        blocks=load_block_catalogue(),
+    )
+    _format = fmt
+    _time_budget = time_budget
+
+
+def parse_row(record: Dict[str, str]) -> EPSInput:
+    # CSV record -> EPSInput; blank cells are missing values
+    data = {}
+    for name in INPUT_FIELDS:
+        value = (record.get(name) or "").strip()
+        if value:
+            data[name] = value
+    parts = []
+    for spec in (record.get("parts") or "").split(";"):
+        if not spec.strip():
+            continue
+        try:
+            name, count, thickness = spec.rsplit(":", 2)
+        except ValueError:
+            raise ValueError(f"parts: expected name:count:thickness_cm, got {spec.strip()!r}")
+        parts.append({"name": name.strip(), "count": count, "thickness_cm": thickness})
+    data["extra_parts"] = parts
+    return EPSInput.model_validate(data)
+
+
+def _error(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}"
+                         for err in e.errors())
+    return str(e)
+
+
+def _cell(d: Optional[Dict[str, int]]) -> str:
+    return ";".join(f"{k}={v}" for k, v in d.items()) if d else ""
+
+
+def quote_chunk(rows: List[Row]) -> Tuple[str, int]:
+    # Formatted output of one chunk and its error count
+    out = io.StringIO()
+    writer = csv.writer(out) if _format == "csv" else None
+    errors = 0
+    for n, record in rows:
+        ident = record.get("id") or ""
+        try:
+            result = _engine.calculate_lean(parse_row(record), time_budget=_time_budget)
+            error = None
+        except (ValidationError, ValueError) as e:
+            result, error = None, _error(e)
+            errors += 1
+        if writer is None:
+            line = {"row": n, "id": ident}
+            line.update({"result": result} if error is None else {"error": error})
+            out.write(json.dumps(line, ensure_ascii=False) + "\n")
+        elif error is None:
+            writer.writerow([n, ident, result["blocks_needed"], result["pricing"]["unit_price"],
+                             result["pricing"]["total_price"], _cell(result["per_block"]),
+                             _cell(result["total_produced"]), _cell(result["required"]),
+                             _cell(result["excess"]), ""])
+        else:
+            writer.writerow([n, ident, "", "", "", "", "", "", "", error])
+    return out.getvalue(), errors
+
+
+def chunks(records: Iterable[Dict[str, str]], size: int) -> Iterator[List[Row]]:
+    chunk: List[Row] = []
+    for n, record in enumerate(records, 1):
+        chunk.append((n, record))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(records: Iterable[Dict[str, str]], out, fmt: str = "csv", workers: int = 0,
+        chunk_size: int = 500, strategy: str = "fast", cache_size: int = 4096,
+        packing: str = "grid", time_budget: Optional[float] = None) -> Tuple[int, int]:
+    # Quote every record into `out` in input order -> (rows, errors)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format: {fmt}")
+    if fmt == "csv":
+        csv.writer(out).writerow(CSV_COLUMNS)
+    settings = (fmt, strategy, cache_size, packing, time_budget)
+    rows = errors = 0
+
+    def write(chunk_rows: int, result: Tuple[str, int]):
+        nonlocal rows, errors
+        out.write(result[0])
+        rows += chunk_rows
+        errors += result[1]
+
+    if workers <= 0:
+        init(*settings)
+        for chunk in chunks(records, chunk_size):
+            write(len(chunk), quote_chunk(chunk))
+        return rows, errors
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    pending: deque = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init, initargs=settings) as pool:
+        for chunk in chunks(records, chunk_size):
+            pending.append((len(chunk), pool.submit(quote_chunk, chunk)))
+            if len(pending) >= 2 * workers:
+                n, future = pending.popleft()
+                write(n, future.result())
+        while pending:
+            n, future = pending.popleft()
+            write(n, future.result())
+    return rows, errors
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Bulk quoting from CSV")
+    parser.add_argument("input", help="input CSV ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="output file ('-' for stdout)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (0 -> this process)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="rows per pool task")
+    parser.add_argument("--strategy", default=os.environ.get("SFT_PLANNING_STRATEGY", "fast"))
+    parser.add_argument("--packing", default=os.environ.get("SFT_PACKING", "grid"))
+    parser.add_argument("--cache-size", type=int, default=4096, help="geometry cache per worker")
+    parser.add_argument("--time-budget-ms", type=float, default=None,
+                        help="planning budget per row (default: exact)")
+    args = parser.parse_args(argv)
+
+    src = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8-sig")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        rows, errors = run(
+            csv.DictReader(src), dst, fmt=args.format, workers=args.workers,
+            chunk_size=args.chunk_size, strategy=args.strategy, cache_size=args.cache_size,
+            packing=args.packing,
+            time_budget=args.time_budget_ms / 1000.0 if args.time_budget_ms else None,
+        )
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    elapsed = time.perf_counter() - start
+    print(f"{rows} rows ({errors} errors) in {elapsed:.2f}s, {rows / elapsed if elapsed else 0:.0f} rows/s",
+          file=sys.stderr)
+    return 1 if rows and errors == rows else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import math
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+from .logic import EPSLogic
+from .models import CutProgramInput
+
+# Cut Program (hot-wire passes per block)
+# The chosen layout becomes an ordered list of wire passes:
+#   1. "z" slicing planes, bottom to top. Every row (table cell) of a
+#      component needs a plane at each multiple of its cut height up to
+#      per_sira. Cells needing the same height are merged into rectangles
+#      (runs along x, then equal runs stacked along y), so one pass slices
+#      all collinear rows, even rows of different components sharing a height.
+#   2. "x" then "y" grid cuts: full-height planes along the cell edges;
+#      collinear edge segments are merged into one pass.
+# Rows are filled column by column in sira_plan order, so each component
+# occupies a contiguous run of cells and shares as many planes as possible.
+# Programs are built once per distinct block plan (in the calculation pool)
+# and streamed per block by main.py, at most MAX_BLOCKS blocks per quote.
+
+EPS = 1e-6
+MAX_BLOCKS = 10000
+
+Rect = Tuple[float, float, float, float]  # x0, y0, x1, y1 on the table (cm)
+
+
+def _key(v: float) -> float:
+    return round(v, 6)
+
+
+def cells(geometry: Dict) -> List[Rect]:
+    # Table cells ("sira") of the layout in fill order
+    layout = geometry['layout']
+    x, y = geometry['cut_x'], geometry['cut_y']
+    if layout.get('placements'):
+        out = [(px, py, px + (y if r else x), py + (x if r else y))
+               for px, py, r in layout['placements']]
+        return sorted(out)
+    if not layout['sira_adedi']:
+        return []
+    T1, T2 = layout['table_axes']
+    px, py = (y, x) if layout['rotation'] == "Rotated" else (x, y)
+    return [(c * px, r * py, (c + 1) * px, (r + 1) * py)
+            for c in range(math.floor(T1 / px)) for r in range(math.floor(T2 / py))]
+
+
+def _merge_intervals(spans: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    out: List[List[float]] = []
+    for a, b in sorted(spans):
+        if out and a <= out[-1][1] + EPS:
+            out[-1][1] = max(out[-1][1], b)
+        else:
+            out.append([a, b])
+    return [(a, b) for a, b in out]
+
+
+def _merge_rects(rects: List[Rect]) -> List[Rect]:
+    # Runs along x within equal y bands, then equal x runs stacked along y
+    bands: Dict[Tuple[float, float], List[Tuple[float, float]]] = {}
+    for x0, y0, x1, y1 in rects:
+        bands.setdefault((_key(y0), _key(y1)), []).append((x0, x1))
+    runs: Dict[Tuple[float, float], List[Tuple[float, float]]] = {}
+    for (y0, y1), spans in bands.items():
+        for x0, x1 in _merge_intervals(spans):
+            runs.setdefault((_key(x0), _key(x1)), []).append((y0, y1))
+    out = []
+    for (x0, x1), spans in runs.items():
+        for y0, y1 in _merge_intervals(spans):
+            out.append((x0, y0, x1, y1))
+    return sorted(out, key=lambda r: (r[1], r[0]))
+
+
+def block_program(geometry: Dict, sira_plan: Dict[str, int]) -> Tuple[List[Dict], int]:
+    # (ordered passes, pass count without merging) for one block plan
+    h_eff = geometry['config']['h_eff']
+    heights = {'Box': geometry['cut_box_h']}
+    heights.update(geometry['parts_h'])
+
+    table_cells = cells(geometry)
+    used = []
+    pos = 0
+    for name, rows in sira_plan.items():
+        for rect in table_cells[pos:pos + rows]:
+            used.append((rect, heights[name], geometry['per_sira'][name]))
+        pos += rows
+
+    # 1. Z planes
+    planes: Dict[float, List[Rect]] = {}
+    unmerged = 0
+    for rect, h, n in used:
+        for k in range(1, n + 1):
+            z = k * h
+            if z >= h_eff - EPS:
+                break
+            planes.setdefault(_key(z), []).append(rect)
+            unmerged += 1
+    passes = []
+    for z in sorted(planes):
+        for x0, y0, x1, y1 in _merge_rects(planes[z]):
+            passes.append({"axis": "z", "at": z, "region": [x0, y0, x1, y1]})
+
+    # 2. XY grid cuts along the cell edges
+    for axis, lo, hi, span_lo, span_hi in (("x", 0, 2, 1, 3), ("y", 1, 3, 0, 2)):
+        edges: Dict[float, List[Tuple[float, float]]] = {}
+        for rect, _, _ in used:
+            for at in (rect[lo], rect[hi]):
+                edges.setdefault(_key(at), []).append((rect[span_lo], rect[span_hi]))
+        for at in sorted(edges):
+            unmerged += len({(_key(a), _key(b)) for a, b in edges[at]})
+            for a, b in _merge_intervals(edges[at]):
+                passes.append({"axis": axis, "at": at, "span": [a, b]})
+    return passes, unmerged
+
+
+def machine_time(passes: List[Dict], h_eff: float, req: CutProgramInput) -> float:
+    # Wire travel: z passes cross their region along x, grid cuts the height
+    travel = sum(p["region"][2] - p["region"][0] if p["axis"] == "z" else h_eff for p in passes)
+    return len(passes) * req.pass_overhead_s + travel / req.wire_speed_cm_min * 60.0
+
+
+def programs(engine: EPSLogic, req: CutProgramInput, time_budget: Optional[float] = None
+             ) -> List[Tuple[int, Dict]]:
+    # (block count, program) per distinct block plan of the quote
+    deadline = time.monotonic() + time_budget if time_budget else None
+    geometry, plan = engine.select_block(req.product, deadline=deadline)
+    h_eff = geometry['config']['h_eff']
+    plans = plan['block_plans'] or [(plan['blocks_needed'], plan['sira_plan'])]
+
+    out = []
+    for index, (count, sira_plan) in enumerate(plans):
+        passes, unmerged = block_program(geometry, sira_plan)
+        out.append((count, {
+            "plan": index,
+            "pass_count": len(passes),
+            "unmerged_pass_count": unmerged,
+            "machine_time_s": round(machine_time(passes, h_eff, req), 1),
+            "passes": passes,
+        }))
+    return out
+
+
+def iter_blocks(plans: List[Tuple[int, Dict]]) -> Iterator[Dict]:
+    # One record per block (the program of its plan, shared, not copied)
+    block = 0
+    for count, program in plans:
+        for _ in range(count):
+            block += 1
+            yield {"block": block, **program}
@@ -1,11 +1,16 @@
+import hashlib
+import json
 import math
-import itertools
-from typing import List, Tuple, Dict, Optional
+import time
+from typing import List, Dict, Optional
 from .models import (
-    EPSInput, EPSOutput, DetailedReport, CutDims, Layout2D, 
-    Pricing, BLOCK_DIMS, TOLERANCE_202, EFFECTIVE_202, RULE_44_LIMIT,
-    WIRE_THICKNESS, SLICE_THICKNESS
+    EPSInput, EPSOutput, DetailedReport, CutDims, Pricing, PricingConfig, StoredPlan, BlockPlan,
+    BlockType, DEFAULT_BLOCK, PriceTier, PriceSheetOutput, EFFECTIVE_202
 )
+from .planning import STRATEGIES, MAX_SETS_SOLVERS, MIN_BLOCKS_SOLVERS, plan_for_sets, min_blocks_mixed
+from .cache import LRUCache
+from .pricing import price_totals, unit_divider, block_pricing
+from .metrics import stage
 
 # Checklist Constants
 # 3. Paylar & Toleranslar
@@ -15,8 +20,134 @@ from .models import (
 TOLERANCE_XY = 0.2  # cm
 TOLERANCE_Z = 0.5   # cm
 
+# 2. Axis Assignment (Eksen Atama)
+# Checklist 4: 202 Eksen Atama Kuralı
+# - En verimli olan atanır.
+# - 44 cm altı ASLA atanmaz.
+# - 3cm tolerance applied (EFFECTIVE_202 = 199)
+#
+# 'requires' names the cut axis that must be >= RULE_44_LIMIT for the
+# config to be allowed (None -> always allowed). Order matters: on equal
+# yield the first config wins.
+AXIS_CONFIGS = [
+    # Scenario 1: 202 is Height (Mod B / Default fallback)
+    # Table = 103, 122. Height = 199 (eff)
+    # The 44cm rule applies to the ITEM assigned to 202 axis.
+    # If 202 is Height, then the effective height of the block is 199.
+    {'table': [103, 122], 'h_eff': EFFECTIVE_202, 'role_202': 'height', 'requires': None},
+
+    # Scenario 2: 202 is on Table (Mod A)
+    # Only allowed if dimension >= 44cm
+    # 202 axis is X. Table becomes [199, 122] or [199, 103]
+    # Remaining dims assign to Height [103 or 122]
+    {'table': [EFFECTIVE_202, 122], 'h_eff': 103.0, 'role_202': 'table_x', 'requires': 'x'},
+    {'table': [EFFECTIVE_202, 103], 'h_eff': 122.0, 'role_202': 'table_x', 'requires': 'x'},
+    # 202 axis is Y.
+    {'table': [103, EFFECTIVE_202], 'h_eff': 122.0, 'role_202': 'table_y', 'requires': 'y'},
+    {'table': [122, EFFECTIVE_202], 'h_eff': 103.0, 'role_202': 'table_y', 'requires': 'y'},
+]
+
+
+# 2D layout engines: "grid" (one rotation per table, Checklist 6) or
+# "guillotine" (mixed rotations in sub-rectangles, see packing.py)
+PACKINGS = ("grid", "guillotine")
+
+
+def axis_configs(block: BlockType) -> List[Dict]:
+    # AXIS_CONFIGS for any block type: dims [a, b, L], L plays the 202 role
+    # (trimmed by long_tolerance, 'requires' the rule_limit on the cut axis).
+    a, b, long_axis = (float(v) for v in block.dims)
+    eff = long_axis - block.long_tolerance
+    return [
+        {'table': [a, b], 'h_eff': eff, 'role_202': 'height', 'requires': None},
+        {'table': [eff, b], 'h_eff': a, 'role_202': 'table_x', 'requires': 'x'},
+        {'table': [eff, a], 'h_eff': b, 'role_202': 'table_x', 'requires': 'x'},
+        {'table': [a, eff], 'h_eff': b, 'role_202': 'table_y', 'requires': 'y'},
+        {'table': [b, eff], 'h_eff': a, 'role_202': 'table_y', 'requires': 'y'},
+    ]
+
+
+def _config(cfg: Dict) -> Dict:
+    # Public view of an AXIS_CONFIGS entry (as reported in DetailedReport)
+    return {'table': cfg['table'], 'h_eff': cfg['h_eff'], 'role_202': cfg['role_202']}
+
+
 class EPSLogic:
-    def calculate(self, data: EPSInput) -> EPSOutput:
+    # Stages (separately callable):
+    #   geometry(data)          -> cut dims, axis config, 2D layout, per_sira
+    #   plan(data, geometry)    -> blocks_needed, sira_plan, produced/required/excess
+    #   price(data, plan)       -> Pricing (from self.pricing)
+    #   report(geometry, plan)  -> DetailedReport
+    # calculate() runs all four; reprice_many() reprices stored plans only.
+    # Stage timings are recorded when a metrics.StageTimer is active.
+    # With a block catalogue, calculate() picks the cheapest block type
+    # (select_block); the other stages use blocks[0] unless told otherwise.
+    def __init__(self, strategy: str = "fast", cache_size: int = 1024,
+                 pricing: Optional[PricingConfig] = None,
+                 packing: str = "grid", packing_budget: float = 0.5,
+                 blocks: Optional[List[BlockType]] = None):
+        # Row planning strategy: "fast" (polynomial solvers) or
+        # "exhaustive" (reference enumeration of every partition).
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown planning strategy: {strategy}")
+        self.strategy = strategy
+        # 2D layout engine; packing_budget (seconds) bounds the guillotine
+        # search per geometry, after which its best layout so far is used.
+        if packing not in PACKINGS:
+            raise ValueError(f"Unknown packing engine: {packing}")
+        self.packing = packing
+        self.packing_budget = packing_budget
+        # Geometry-keyed LRU cache of layout + per_sira + max-set plan (0 = off)
+        self._cache = LRUCache(cache_size)
+        self.pricing = pricing or PricingConfig()
+        # Block catalogue (default: the 103x122x202 block of the spec)
+        self.blocks = list(blocks) if blocks else [DEFAULT_BLOCK]
+        self._axis_configs = [AXIS_CONFIGS if b == DEFAULT_BLOCK else axis_configs(b)
+                              for b in self.blocks]
+
+    def calculate(self, data: EPSInput, time_budget: Optional[float] = None) -> EPSOutput:
+        # time_budget (seconds): planning returns its best plan so far when the
+        # budget runs out, flagged with optimal=False in the output.
+        deadline = time.monotonic() + time_budget if time_budget else None
+        geometry, plan = self.select_block(data, deadline=deadline)
+        return self.build_output(data, geometry, plan)
+
+    def calculate_lean(self, data: EPSInput, time_budget: Optional[float] = None) -> Dict:
+        # Spec 8.1 fields as plain dicts (same values as calculate()); skips
+        # the internal report and every Pydantic model.
+        deadline = time.monotonic() + time_budget if time_budget else None
+        geometry, plan = self.select_block(data, deadline=deadline)
+        unit_price, total_price = self._price_totals(data, plan, geometry['block'])
+        with stage("report"):
+            return {
+                'blocks_needed': plan['blocks_needed'],
+                'per_block': plan['per_block'],
+                'total_produced': plan['total_produced'],
+                'required': plan['required'],
+                'excess': plan['excess'],
+                'pricing': {'unit_price': round(unit_price, 2), 'total_price': round(total_price, 2)},
+            }
+
+    def config_version(self) -> str:
+        # Hash of every engine setting that can change a quote (pricing values,
+        # block catalogue, planning strategy, packing engine and budget);
+        # keys quotes persisted across restarts (see store.py)
+        config = {
+            'pricing': self.pricing.model_dump(mode='json'),
+            'blocks': [b.model_dump(mode='json') for b in self.blocks],
+            'strategy': self.strategy,
+            'packing': self.packing,
+            'packing_budget': self.packing_budget if self.packing == 'guillotine' else None,
+        }
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+    def cache_info(self) -> Dict[str, int]:
+        # Geometry cache counters (hits / misses / evictions) for sizing
+        return self._cache.info()
+
+    # --- Stage 1: Geometry / Layout ---
+
+    def _cut_dims(self, data: EPSInput):
         # 1. Calculate Cutting Dimensions (Paylar)
         # Checklist: En + Boy için toplam 2 mm (1+1)
         # Assumption: Inputs are OUTER dimensions. Wall thickness describes the product, not the footprint.
@@ -31,46 +162,78 @@ class EPSLogic:
         for p in data.extra_parts:
             # Apply Z tolerance to each part
             parts_h[p.name] = p.thickness_cm + TOLERANCE_Z
-        
-        # 2. Axis Assignment (Eksen Atama)
-        # Checklist 4: 202 Eksen Atama Kuralı
-        # - En verimli olan atanır.
-        # - 44 cm altı ASLA atanmaz.
-        # - 3cm tolerance applied (EFFECTIVE_202 = 199)
-        
-        candidates_for_202 = []
-        if cut_x >= RULE_44_LIMIT: candidates_for_202.append('x')
-        if cut_y >= RULE_44_LIMIT: candidates_for_202.append('y')
-        
-        configs = []
-        
-        # Scenario 1: 202 is Height (Mod B / Default fallback)
-        # Table = 103, 122. Height = 199 (eff)
-        # This is valid ONLY if we don't violate ANY logic constraints?
-        # The 44cm rule applies to the ITEM assigned to 202 axis. 
-        # If 202 is Height, then the effective height of the block is 199. 
-        # Items are stacked vertically. Is there a min height constraint? Not strictly 44.
-        
-        configs.append({
-            'table': [103, 122],
-            'h_eff': EFFECTIVE_202,
-            'role_202': 'height',
-        })
-        
-        # Scenario 2: 202 is on Table (Mod A)
-        # Only allowed if dimension >= 44cm
-        
-        if cut_x >= RULE_44_LIMIT:
-             # 202 axis is X. 
-             # Table becomes [199, 122] or [199, 103]
-             # Remaining dims assign to Height [103 or 122]
-             configs.append({'table': [EFFECTIVE_202, 122], 'h_eff': 103.0, 'role_202': 'table_x'})
-             configs.append({'table': [EFFECTIVE_202, 103], 'h_eff': 122.0, 'role_202': 'table_x'})
-             
-        if cut_y >= RULE_44_LIMIT:
-             # 202 axis is Y.
-             configs.append({'table': [103, EFFECTIVE_202], 'h_eff': 122.0, 'role_202': 'table_y'})
-             configs.append({'table': [122, EFFECTIVE_202], 'h_eff': 103.0, 'role_202': 'table_y'})
+
+        return cut_x, cut_y, cut_box_h, parts_h
+
+    def geometry(self, data: EPSInput, deadline: Optional[float] = None, block: int = 0) -> Dict:
+        # block: index into self.blocks
+        with stage("cut_dims"):
+            cut_x, cut_y, cut_box_h, parts_h = self._cut_dims(data)
+        with stage("axis_selection"):
+            return self._cached_geometry(data, cut_x, cut_y, cut_box_h, parts_h, deadline, block)
+
+    def _cached_geometry(self, data: EPSInput, cut_x: float, cut_y: float, cut_box_h: float,
+                         parts_h: Dict[str, float], deadline: Optional[float], block: int) -> Dict:
+
+        # Layout depends only on the cut geometry -> geometry cache.
+        # Parts are keyed in canonical (height, count) order so that renamed or
+        # reordered parts share an entry; per_sira is mapped back by position.
+        parts = data.extra_parts
+        order = sorted(range(len(parts)), key=lambda i: (parts_h[parts[i].name], parts[i].count))
+        key = (block, cut_x, cut_y, cut_box_h,
+               tuple((parts_h[parts[i].name], parts[i].count) for i in order))
+
+        entry = self._cache.get(key)
+        if entry is None:
+            selected_config, selected_layout, per_sira_map, complete = self._select_layout(
+                data, cut_x, cut_y, cut_box_h, parts_h, deadline, block
+            )
+            entry = {
+                'config': selected_config,
+                'layout': selected_layout,
+                'box_per_sira': per_sira_map['Box'],
+                'parts_per_sira': [per_sira_map[parts[i].name] for i in order],
+                'max_sets': None,  # filled by the first no-order plan
+                'complete': complete,
+            }
+            if complete:
+                # A layout cut short by the packing budget is not cached
+                self._cache.put(key, entry)
+        else:
+            canonical = [0] * len(parts)
+            for pos, i in enumerate(order):
+                canonical[i] = entry['parts_per_sira'][pos]
+            per_sira_map = {'Box': entry['box_per_sira']}
+            for i, p in enumerate(parts):
+                per_sira_map[p.name] = canonical[i]
+
+        return self._geometry(cut_x, cut_y, cut_box_h, parts_h, entry['config'],
+                              entry['layout'], per_sira_map, entry, block)
+
+    def _geometry(self, cut_x, cut_y, cut_box_h, parts_h, selected_config, selected_layout,
+                  per_sira_map, entry=None, block: int = 0) -> Dict:
+        # Geometry stage result. 'entry' is the cache entry (None when uncached)
+        # and lets the planning stage reuse the max-set optimum; 'complete' is
+        # False when the packing search ran out of budget.
+        return {
+            'cut_x': cut_x,
+            'cut_y': cut_y,
+            'cut_box_h': cut_box_h,
+            'parts_h': parts_h,
+            'config': selected_config,
+            'layout': selected_layout,
+            'per_sira': per_sira_map,
+            'entry': entry,
+            'complete': entry['complete'] if entry is not None else True,
+            'block': block,
+        }
+
+    def _select_layout(self, data: EPSInput, cut_x: float, cut_y: float, cut_box_h: float,
+                       parts_h: Dict[str, float], deadline: Optional[float] = None, block: int = 0):
+        # 2. Axis Assignment (see AXIS_CONFIGS / axis_configs)
+        limit = self.blocks[block].rule_limit
+        allowed = {None: True, 'x': cut_x >= limit, 'y': cut_y >= limit}
+        configs = [cfg for cfg in self._axis_configs[block] if allowed[cfg['requires']]]
 
         # Checklist 6: Maksimim Verim Hesabı
         # "En yüksek adet veren yerleşim seçiliyor mu?"
@@ -78,6 +241,11 @@ class EPSLogic:
         selected_config = None
         selected_layout = None
         current_max_items_per_block = -1
+
+        packings = {}
+        if self.packing == "guillotine":
+            budget_end = time.monotonic() + self.packing_budget
+            deadline = min(deadline, budget_end) if deadline else budget_end
         
         for cfg in configs:
             T1, T2 = cfg['table']
@@ -87,9 +255,14 @@ class EPSLogic:
             r1 = math.floor(T1 / cut_x) * math.floor(T2 / cut_y)
             # R2: X->T2, Y->T1
             r2 = math.floor(T2 / cut_x) * math.floor(T1 / cut_y)
-            
+
             sira = max(r1, r2)
             rot_desc = "Normal" if r1 >= r2 else "Rotated"
+
+            placements = None
+            if self.packing == "guillotine":
+                sira, rot_desc, placements = self._pack(cfg['table'], cut_x, cut_y, sira, rot_desc,
+                                                        packings, deadline)
             
             h_eff = cfg['h_eff']
             
@@ -100,17 +273,20 @@ class EPSLogic:
             
             if total_boxes_theoretical > current_max_items_per_block:
                 current_max_items_per_block = total_boxes_theoretical
-                selected_config = cfg
+                selected_config = _config(cfg)
                 selected_layout = {
                     'sira_adedi': sira,
                     'rotation': rot_desc,
                     'table_axes': cfg['table']
                 }
+                if placements is not None:
+                    selected_layout['placements'] = placements
 
         # Fallback (Scenario: dimensions > block)
         if not selected_config:
-            selected_config = {'table': [103, 122], 'h_eff': EFFECTIVE_202, 'role_202': 'height'}
-            selected_layout = {'sira_adedi': 0, 'rotation': 'N/A', 'table_axes': [103, 122]}
+            fallback = self._axis_configs[block][0]
+            selected_config = _config(fallback)
+            selected_layout = {'sira_adedi': 0, 'rotation': 'N/A', 'table_axes': fallback['table']}
             
         # 3. Calculate Per Sira (Items per row for Box and Parts)
         h_eff = selected_config['h_eff']
@@ -118,9 +294,167 @@ class EPSLogic:
         per_sira_map['Box'] = math.floor(h_eff / cut_box_h)
         for p in data.extra_parts:
             per_sira_map[p.name] = math.floor(h_eff / parts_h[p.name])
-        
+
+        complete = all(done for _, _, done in packings.values())
+        return selected_config, selected_layout, per_sira_map, complete
+
+    def _pack(self, table, cut_x: float, cut_y: float, sira: int, rot_desc: str,
+              packings: Dict, deadline: Optional[float]):
+        # Guillotine layout for one table (see packing.py). A swapped table
+        # reuses the transposed layout; the grid layout is kept unless the
+        # mixed layout places more pieces.
+        from .packing import pack, grid_placements, transpose
+
+        T1, T2 = table
+        if (T1, T2) not in packings:
+            if (T2, T1) in packings:
+                count, placements, done = packings[(T2, T1)]
+                packings[(T1, T2)] = (count, transpose(placements), done)
+            else:
+                packings[(T1, T2)] = pack(T1, T2, cut_x, cut_y, deadline)
+        count, placements, _ = packings[(T1, T2)]
+        if count <= sira:
+            return sira, rot_desc, grid_placements(T1, T2, cut_x, cut_y, rot_desc == "Rotated")
+        rotations = {rotated for _, _, rotated in placements}
+        if len(rotations) > 1:
+            rot_desc = "Mixed"
+        else:
+            rot_desc = "Rotated" if rotations.pop() else "Normal"
+        return count, rot_desc, placements
+
+    def calculate_many(self, items: List[EPSInput], time_budget: Optional[float] = None
+                       ) -> List[EPSOutput]:
+        # Batch quoting: axis configs, both rotations and per_sira floors are
+        # evaluated as NumPy arrays across the whole batch; planning and
+        # pricing then run per item. Results match calculate() item by item.
+        # time_budget: planning budget of each item (as calculate()).
+        # NumPy is imported here so single quotes don't pay for it.
+        from .vectorized import select_axes
+
+        if not items:
+            return []
+        if self.packing != "grid" or len(self.blocks) > 1:
+            # Mixed layouts are searched per geometry (and cached)
+            return [self.calculate(data, time_budget=time_budget) for data in items]
+
+        cuts = [self._cut_dims(data) for data in items]
+        part_h = [[c[3][p.name] for p in data.extra_parts] for data, c in zip(items, cuts)]
+        axes = select_axes(
+            [c[0] for c in cuts], [c[1] for c in cuts], [c[2] for c in cuts],
+            part_h, self._axis_configs[0], self.blocks[0].rule_limit
+        )
+
+        results = []
+        for i, data in enumerate(items):
+            cut_x, cut_y, cut_box_h, parts_h = cuts[i]
+            cfg_idx, sira, rot_desc, box_per_sira, parts_per_sira = axes[i]
+            cfg = self._axis_configs[0][cfg_idx]
+            selected_layout = {'sira_adedi': sira, 'rotation': rot_desc, 'table_axes': cfg['table']}
+
+            per_sira_map = {'Box': box_per_sira}
+            for p, n in zip(data.extra_parts, parts_per_sira):
+                per_sira_map[p.name] = n
+
+            geometry = self._geometry(cut_x, cut_y, cut_box_h, parts_h, _config(cfg),
+                                      selected_layout, per_sira_map)
+            deadline = time.monotonic() + time_budget if time_budget else None
+            plan = self.plan(data, geometry, deadline=deadline)
+            results.append(self.build_output(data, geometry, plan))
+        return results
+
+    # --- Block Catalogue ---
+
+    def select_block(self, data: EPSInput, deadline: Optional[float] = None):
+        # Cheapest block type for the quote -> (geometry, plan).
+        # Orders compare the total price, 1-block plans the unit price; ties
+        # go to the earlier catalogue entry. Each type first gets a cheap
+        # price lower bound (area / height bound on its yield) and types
+        # whose bound can not beat the best so far skip the full row search.
+        if len(self.blocks) == 1:
+            geometry = self.geometry(data, deadline=deadline)
+            return geometry, self.plan(data, geometry, deadline=deadline)
+
+        unit = not data.req_boxes
+        eligible = [b for b, block in enumerate(self.blocks)
+                    if block.dns is None or data.dns is None or block.dns == data.dns]
+        bounds = sorted((self._price_bound(data, b), b) for b in eligible)
+        best = None
+        for bound, b in bounds:
+            if best is not None and (bound, b) >= best[0]:
+                break
+            geometry = self.geometry(data, deadline=deadline, block=b)
+            plan = self.plan(data, geometry, deadline=deadline)
+            if plan['blocks_needed'] == 0 or not any(plan['total_produced'].values()):
+                continue  # this block type can not produce the quote
+            unit_price, total_price = self._price_totals(data, plan, b)
+            key = (unit_price if unit else total_price, b)
+            if best is None or key < best[0]:
+                best = (key, geometry, plan)
+        if best is None:
+            # Nothing fits: report against the first catalogue entry
+            geometry = self.geometry(data, deadline=deadline)
+            return geometry, self.plan(data, geometry, deadline=deadline)
+        return best[1], best[2]
+
+    def _price_bound(self, data: EPSInput, block: int) -> float:
+        # Lower bound on the selection key of a block type (inf -> can not fit).
+        # Any layout holds at most floor(T1*T2 / (x*y)) rows and a row at most
+        # floor(h_eff / h) items, so an order needs at least
+        # ceil(sum(ceil(req_i / per_sira_i)) / rows) blocks and one block makes
+        # at most rows * per_sira(Box) boxes.
+        cut_x, cut_y, cut_box_h, parts_h = self._cut_dims(data)
+        limit = self.blocks[block].rule_limit
+        allowed = {None: True, 'x': cut_x >= limit, 'y': cut_y >= limit}
+        required = {'Box': (cut_box_h, data.req_boxes or 0)}
+        for p in data.extra_parts:
+            required[p.name] = (parts_h[p.name], (data.req_boxes or 0) * p.count)
+
+        best_blocks = math.inf
+        best_boxes = 0
+        for cfg in self._axis_configs[block]:
+            if not allowed[cfg['requires']]:
+                continue
+            T1, T2 = cfg['table']
+            rows = math.floor(T1 * T2 / (cut_x * cut_y))
+            per_box = math.floor(cfg['h_eff'] / cut_box_h)
+            if rows == 0:
+                continue
+            best_boxes = max(best_boxes, rows * per_box)
+            need = 0
+            for h, amount in required.values():
+                per = math.floor(cfg['h_eff'] / h)
+                if per == 0:
+                    need = None
+                    break
+                need += -(-amount // per)
+            if need is not None:
+                best_blocks = min(best_blocks, max(1, -(-need // rows)))
+
+        config = block_pricing(self.pricing, self.blocks[block])
+        if data.req_boxes:
+            if best_blocks == math.inf:
+                return math.inf
+            pieces = sum(amount for _, amount in required.values())
+            return price_totals(config, best_blocks, pieces, data.req_boxes, data.dns)[1]
+        if best_boxes == 0:
+            return math.inf
+        return price_totals(config, 1, 0, best_boxes, data.dns)[0]
+
+    # --- Stage 2: Production Plan ---
+
+    def plan(self, data: EPSInput, geometry: Dict, deadline: Optional[float] = None,
+             min_blocks: int = 1) -> Dict:
         # 4. Plan Production
-        sira_max = selected_layout['sira_adedi']
+        # deadline: time.monotonic() value after which the search stops early
+        # min_blocks: known lower bound on blocks_needed (order mode)
+        with stage("planning"):
+            return self._plan(data, geometry, deadline, min_blocks)
+
+    def _plan(self, data: EPSInput, geometry: Dict, deadline: Optional[float],
+              min_blocks: int) -> Dict:
+        per_sira_map = geometry['per_sira']
+        entry = geometry['entry']
+        sira_max = geometry['layout']['sira_adedi']
         req_boxes = data.req_boxes
         
         is_order = req_boxes is not None and req_boxes > 0
@@ -129,85 +463,26 @@ class EPSLogic:
         
         per_block_counts = {}
         blocks_needed = 0
+        optimal = True
+        block_plans = None  # [(blocks, sira_plan)] for mixed multi-block orders
         
         if not is_order:
              # Strategy: Report MAX SET capability in 1 Block
-             # Similar to previous logic: Find mix of rows maximizing full sets.
-             best_sets = -1
-             best_plan_rows = {'Box': sira_max}
-             for name in part_names: best_plan_rows[name] = 0
-             
-             # Brute force valid row combinations
-             # Optimization scope limiter: If N parts is large this is slow. 
-             # For N=1..3 it's instant.
-             
-             def generate_plans_iter(remaining, index, current_plan):
-                 if index == len(part_names):
-                     # Last is Box
-                     yield current_plan + [remaining]
-                     # Also allow not using all rows? Checklist says max verim -> use all rows usually.
-                     # But maybe optimal set ratio requires wasted rows.
-                     # We only iterate "used all rows" or "up to"?
-                     # Strict partitions is faster.
-                     pass 
-                 # Iterative refactor for simplicity:
-                 
-             # Simple 3-nested loop for typical Box + 2 caps case
-             # Generic approach:
-             import itertools
-             
-             # Valid combinations of rows summing to <= sira_max
-             # We want to Maximize min(out_box, out_p1/k, out_p2/k...)
-             
-             valid_range = range(sira_max + 1)
-             
-             # Limit search space: Box rows usually dominant if parts are thin?
-             # Or Parts are thin so fewer rows needed?
-             # Let's use a smarter generator
-             
-             def partitions(n, k):
-                 # Generate all partitions of n items into k bins
-                 if k == 1:
-                     yield [n]
-                     return
-                 for i in range(n + 1):
-                     for p in partitions(n - i, k - 1):
-                         yield [i] + p
-                         
-             # We apply partition to "Used Rows". 
-             # We might not use all rows if ratio is perfect with fewer? 
-             # No, usually using more rows = more items.
-             # So we iterate partitions of sira_max
-             
-             # Map indices to components: 0->Box, 1..N->Parts
+             # Find mix of rows maximizing full sets (see planning.py).
              comps = ['Box'] + part_names
-             
-             for p in partitions(sira_max, len(comps)):
-                 # p is list of row counts
-                 # Calc yield
-                 current_yield = {}
-                 for i, name in enumerate(comps):
-                     current_yield[name] = p[i] * per_sira_map[name]
-                 
-                 # Calc sets
-                 limit = current_yield['Box']
-                 valid = True
-                 for name in part_names:
-                     req = part_ratios[name]
-                     if req > 0:
-                         limit = min(limit, current_yield[name] // req)
-                     else:
-                         # 0 requirement? Just ignore
-                         pass
-                 
-                 if limit > best_sets:
-                     best_sets = limit
-                     # Store plan
-                     plan = {}
-                     for i, name in enumerate(comps):
-                         plan[name] = p[i]
-                     best_plan_rows = plan
-                     
+             ratios = {'Box': 1}
+             ratios.update(part_ratios)
+
+             if entry is not None and entry['max_sets'] is not None:
+                 # Cached optimum: rebuild the plan for this part order in O(N)
+                 best_plan_rows = plan_for_sets(entry['max_sets'], sira_max, comps, per_sira_map, ratios)
+             else:
+                 solver = MAX_SETS_SOLVERS[self.strategy]
+                 best_sets, best_plan_rows, optimal = solver(sira_max, comps, per_sira_map, ratios,
+                                                             deadline=deadline)
+                 if entry is not None and optimal:
+                     entry['max_sets'] = best_sets
+
              blocks_needed = 1
              for k, v in best_plan_rows.items():
                  per_block_counts[k] = v * per_sira_map[k]
@@ -230,66 +505,38 @@ class EPSLogic:
             for p in data.extra_parts:
                 req_vals_abs[p.name] = req_boxes * p.count
                 
-            # Iterate all row permutations again.
-            # For each permutation, calc output vector V.
-            # We need K * V >= Req.
-            # K = ceil( max(Req_i / V_i) ) for all i.
-            # Minimize K * Cost? Or Minimize Excess?
-            # Goal is likely Minimum Blocks (Cost).
-            
-            best_blocks_needed = 999999
-            best_plan_rows = None
-            best_excess_score = 99999999 # Secondary optimization
-            
+            # Search over block count K (see planning.py):
+            # smallest feasible K first, then the minimum-excess plan for it.
             comps = ['Box'] + part_names
-            
-            # Helper to generator partitions
-            def partitions(n, k):
-                 if k == 1:
-                     yield [n]
-                     return
-                 for i in range(n + 1):
-                     for p in partitions(n - i, k - 1):
-                         yield [i] + p
-
-            for p in partitions(sira_max, len(comps)):
-                 current_yield = {}
-                 for i, name in enumerate(comps):
-                     current_yield[name] = p[i] * per_sira_map[name]
-                     
-                 # Check if this valid plan produces ANYTHING (prevent div/0)
-                 if any(v > 0 for v in current_yield.values()):
-                     # Calc needed blocks for this pattern
-                     k_needed = 0
-                     for cat, req_amt in req_vals_abs.items():
-                         prod = current_yield.get(cat, 0)
-                         if req_amt > 0:
-                             if prod == 0:
-                                 k_needed = 999999 # Impossible plan
-                                 break
-                             needed = math.ceil(req_amt / prod)
-                             k_needed = max(k_needed, needed)
-                     
-                     if k_needed < best_blocks_needed:
-                         best_blocks_needed = k_needed
-                         # Store
-                         plan = {}
-                         for i, name in enumerate(comps): plan[name] = p[i]
-                         best_plan_rows = plan
-                         
-                         # Note: Could calculate excess here to break ties
-            
-            if best_blocks_needed > 900000:
-                # Fallback?
+
+            solver = MIN_BLOCKS_SOLVERS[self.strategy]
+            best_blocks_needed, best_plan_rows, optimal = solver(sira_max, comps, per_sira_map,
+                                                                 req_vals_abs, deadline=deadline,
+                                                                 min_blocks=min_blocks)
+
+            if best_plan_rows is None:
+                # Fallback? Order can not be produced with this layout
                 blocks_needed = 0
                 per_block_counts = {c: 0 for c in comps}
             else:
                 blocks_needed = best_blocks_needed
+                if data.multi_block == "mixed":
+                    # Main plan x (B-1) + tail plan; the uniform result bounds it
+                    blocks_needed, block_plans, mixed_optimal = min_blocks_mixed(
+                        sira_max, comps, per_sira_map, req_vals_abs, best_blocks_needed,
+                        best_plan_rows, deadline=deadline
+                    )
+                    optimal = optimal and mixed_optimal
+                    best_plan_rows = block_plans[0][1]
                 for k, v in best_plan_rows.items():
                     per_block_counts[k] = v * per_sira_map[k]
 
         # 5. Compile Results
-        total_produced = {k: v * blocks_needed for k, v in per_block_counts.items()}
+        if block_plans:
+            total_produced = {k: sum(n * rows[k] * per_sira_map[k] for n, rows in block_plans)
+                              for k in per_block_counts}
+        else:
+            total_produced = {k: v * blocks_needed for k, v in per_block_counts.items()}
         
         req_vals = None
         excess = None
@@ -306,79 +553,133 @@ class EPSLogic:
                 excess[k] = total_produced[k] - req
         else:
             excess = total_produced.copy()
-            
-        # 6. Pricing Engine (Checklist 10)
-        # - USD Kuru
-        # - Kur Risk Payı (%30)
-        # - Ticari Çarpan (%20)
-        # - Blok Fiyatı (Ham vs Karlı?)
-        # - KDV (%20)
-        
-        # Hardcoded Settings (Should be in config)
-        USD_RATE = 32.0 
-        RISK_MARGIN = 1.30
-        TRADE_MARGIN = 1.20
-        VAT_RATE = 1.20
-        
-        # Block Base Price
-        # Checklist 11: Adet Aralığı Fiyatı Logic can be added here
-        base_block_usd = 120.0 
-        if data.dns:
-            base_block_usd += (data.dns - 10) * 5
-            
-        block_cost_tl = base_block_usd * USD_RATE
-        
-        # Apply Multipliers
-        # Base -> Risk -> Trade
-        # Price = Cost * 1.30 * 1.20
-        sell_price_block = block_cost_tl * RISK_MARGIN * TRADE_MARGIN
-        
-        # Processing Cost (Kesim İşçiliği)
-        # Checklist 12: İşlem Tipi Fiyatı
-        # Assuming Standard Cut
-        proc_cost_total = sum(total_produced.values()) * 0.5 # 0.5 TL per piece
-        
-        # Total Excl VAT
-        total_price_ex_vat = (blocks_needed * sell_price_block) + proc_cost_total
-        
-        # Shipping (Checklist 10)
-        shipping = 0 # Default 0
-        total_price_ex_vat += shipping
-        
-        # VAT
-        total_price_inc_vat = total_price_ex_vat * VAT_RATE
-        
-        # Unit Price
-        divider = req_boxes if req_boxes else total_produced.get('Box', 1)
-        if divider == 0: divider = 1
-        unit_price = total_price_inc_vat / divider
 
+        return {
+            'blocks_needed': blocks_needed,
+            'per_block': per_block_counts,
+            'sira_plan': best_plan_rows if best_plan_rows else {},
+            'total_produced': total_produced,
+            'required': req_vals,
+            'excess': excess,
+            'optimal': optimal,
+            'block_plans': block_plans,
+        }
+
+    def price_sheet(self, data: EPSInput, quantities) -> PriceSheetOutput:
+        # Checklist 11: Adet Aralığı Fiyatı
+        # Geometry and axis selection run once; each quantity only re-plans.
+        # The minimal block count is monotonic in quantity, so every tier's
+        # search starts from the previous tier's block count. With a block
+        # catalogue each tier picks its block type like calculate() does.
+        catalogue = len(self.blocks) > 1
+        geometry = None if catalogue else self.geometry(data)
+        tiers = []
+        plan = None
+        min_blocks = 1
+        for qty in sorted(set(quantities)):
+            tier_data = data.model_copy(update={'req_boxes': qty})
+            if catalogue:
+                geometry, plan = self.select_block(tier_data)
+            else:
+                plan = self.plan(tier_data, geometry, min_blocks=min_blocks)
+                min_blocks = max(min_blocks, plan['blocks_needed'])
+            tiers.append(PriceTier(
+                req_boxes=qty,
+                blocks_needed=plan['blocks_needed'],
+                per_block=plan['per_block'],
+                excess=plan['excess'],
+                pricing=self.price(tier_data, plan, block=geometry['block']),
+            ))
+        if plan is None:
+            no_order = data.model_copy(update={'req_boxes': None})
+            if catalogue:
+                geometry, plan = self.select_block(no_order)
+            else:
+                plan = self.plan(no_order, geometry)
+        return PriceSheetOutput(details=self.report(geometry, plan), tiers=tiers)
+
+    # --- Stage 3: Pricing ---
+
+    def price(self, data: EPSInput, plan: Dict, config: Optional[PricingConfig] = None,
+              block: int = 0) -> Pricing:
+        # 6. Pricing Engine (Checklist 10) - settings from PricingConfig,
+        # block cost from the block type
+        unit_price, total_price = self._price_totals(data, plan, block, config)
+        return Pricing(unit_price=round(unit_price, 2), total_price=round(total_price, 2))
+
+    def _price_totals(self, data: EPSInput, plan: Dict, block: int = 0,
+                      config: Optional[PricingConfig] = None):
+        total_produced = plan['total_produced']
+        with stage("pricing"):
+            return price_totals(
+                block_pricing(config or self.pricing, self.blocks[block]), plan['blocks_needed'],
+                sum(total_produced.values()), unit_divider(data.req_boxes, total_produced), data.dns
+            )
+
+    def reprice_many(self, plans: List[StoredPlan], usd_rate: Optional[float] = None,
+                     config: Optional[PricingConfig] = None) -> List[Pricing]:
+        # Bulk repricing of stored plans in one vectorized pass (no layout work).
+        from .vectorized import reprice
+
+        config = config or self.pricing
+        if usd_rate is not None:
+            config = config.model_copy(update={'usd_rate': usd_rate})
+        if not plans:
+            return []
+
+        unit, total = reprice(
+            config,
+            [p.blocks_needed for p in plans],
+            [sum(p.total_produced.values()) for p in plans],
+            [unit_divider(p.req_boxes, p.total_produced) for p in plans],
+            [p.dns or 0 for p in plans],
+            [p.block_usd for p in plans] if any(p.block_usd for p in plans) else None,
+        )
+        return [Pricing(unit_price=round(u, 2), total_price=round(t, 2)) for u, t in zip(unit, total)]
+
+    # --- Stage 4: Report ---
+
+    def report(self, geometry: Dict, plan: Dict) -> DetailedReport:
         # Details Report
-        details = DetailedReport(
-            block_cm=BLOCK_DIMS,
+        selected_config = geometry['config']
+        block = self.blocks[geometry['block']]
+        return DetailedReport(
+            block_cm=block.dims,
+            block_type=block.name,
             rule_44cm={
                 "applied": True,
                 "axis_202_role": selected_config.get('role_202', 'N/A'),
                 "h_eff": selected_config.get('h_eff', 0)
             },
             cut_dims_cm=CutDims(
-                footprint=[cut_x, cut_y],
-                box_h=cut_box_h,
-                parts_h=parts_h
+                footprint=[geometry['cut_x'], geometry['cut_y']],
+                box_h=geometry['cut_box_h'],
+                parts_h=geometry['parts_h']
             ),
-            layout_2d=selected_layout,
-            per_sira=per_sira_map,
-            sira_plan=best_plan_rows if best_plan_rows else {}
+            layout_2d=geometry['layout'],
+            per_sira=geometry['per_sira'],
+            sira_plan=plan['sira_plan']
         )
 
-        return EPSOutput(
-            blocks_needed=blocks_needed,
-            per_block=per_block_counts,
-            required=req_vals,
-            excess=excess,
-            pricing=Pricing(
-                unit_price=round(unit_price, 2), 
-                total_price=round(total_price_inc_vat, 2)
-            ),
-            details=details
-        )
+    def build_output(self, data: EPSInput, geometry: Dict, plan: Dict) -> EPSOutput:
+        # Assemble the API response from the stage results
+        pricing = self.price(data, plan, block=geometry['block'])
+        with stage("report"):
+            return EPSOutput(
+                blocks_needed=plan['blocks_needed'],
+                per_block=plan['per_block'],
+                required=plan['required'],
+                excess=plan['excess'],
+                pricing=pricing,
+                details=self.report(geometry, plan),
+                optimal=plan['optimal'] and geometry['complete'],
+                block_plans=self._block_plans(plan, geometry['per_sira'])
+            )
+
+    @staticmethod
+    def _block_plans(plan: Dict, per_sira_map: Dict[str, int]) -> Optional[List[BlockPlan]]:
+        if not plan['block_plans']:
+            return None
+        return [BlockPlan(blocks=n, sira_plan=rows,
+                          per_block={k: v * per_sira_map[k] for k, v in rows.items()})
+                for n, rows in plan['block_plans']]
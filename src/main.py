@@ -1,12 +1,148 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+from fastapi import Body, FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from .models import EPSInput, EPSOutput
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from .models import (
+    EPSInput, EPSOutput, Pricing, RepriceRequest, SweepInput, PriceSheetInput, PriceSheetOutput,
+    NestingInput, NestingOutput, ScheduleInput, ScheduleOutput, CutProgramInput, StageProfile,
+    LeanOutput, SensitivityInput, SensitivityOutput, MAX_BATCH_ITEMS, canonical_hash
+)
 from .logic import EPSLogic
+from .pricing import load_pricing_config, load_block_catalogue
+from .coalesce import SingleFlight
+from .store import QuoteStore
+from .sweep import chunks, sweep_lines
+from .nesting import nest
+from .scheduling import schedule
+from .cutprogram import MAX_BLOCKS, iter_blocks, programs
+from .sensitivity import sensitivity
+from .shadow import ShadowVerifier
+from .session import SessionStore, Superseded, recompute
+from .metrics import Registry, RequestTimer, profiled
+from . import worker
 import os
 
 app = FastAPI(title="SFT EPS Automation", version="1.0.0")
-engine = EPSLogic()
+
+# Metrics
+# Stage histograms of every computed /calculate quote and request durations
+# per route, served as Prometheus text at /metrics (see metrics.py).
+_metrics = Registry()
+app.add_middleware(RequestTimer, registry=_metrics)
+# SFT_LAYOUT_CACHE_SIZE: geometry cache entries (0 disables the cache)
+# SFT_PRICING_CONFIG: JSON pricing settings (see pricing.py)
+# SFT_PLANNING_STRATEGY: "fast" (default) or "exhaustive"
+# SFT_PACKING: "grid" (default) or "guillotine" (mixed rotations, see packing.py)
+# SFT_PACKING_BUDGET_MS: guillotine search budget per geometry
+# SFT_BLOCK_CATALOGUE: JSON list of block types (see pricing.py); the
+#                      cheapest type is picked per quote
+CACHE_SIZE = int(os.environ.get("SFT_LAYOUT_CACHE_SIZE", "1024"))
+STRATEGY = os.environ.get("SFT_PLANNING_STRATEGY", "fast")
+PACKING = os.environ.get("SFT_PACKING", "grid")
+PACKING_BUDGET = float(os.environ.get("SFT_PACKING_BUDGET_MS", "500")) / 1000.0
+engine = EPSLogic(strategy=STRATEGY, cache_size=CACHE_SIZE, pricing=load_pricing_config(),
+                  packing=PACKING, packing_budget=PACKING_BUDGET, blocks=load_block_catalogue())
+
+# Calculation Pool
+# CPU-bound work runs in worker processes so the event loop (and /health)
+# never stalls behind a heavy quote.
+# SFT_POOL_WORKERS: worker processes (default: CPU count, 0 -> API process thread)
+# SFT_TIME_BUDGET_MS: per-request planning budget; when it runs out the best
+#                     plan so far is returned with optimal=false
+POOL_WORKERS = int(os.environ.get("SFT_POOL_WORKERS", str(os.cpu_count() or 1)))
+TIME_BUDGET = float(os.environ.get("SFT_TIME_BUDGET_MS", "2000")) / 1000.0
+
+_pool = None
+_worker_cache = {}  # pid -> latest cache counters of that worker
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=POOL_WORKERS,
+            initializer=worker.init_worker,
+            initargs=(STRATEGY, CACHE_SIZE, engine.pricing, PACKING, PACKING_BUDGET,
+                      engine.blocks),
+        )
+    return _pool
+
+async def _offload(pool_fn, local_fn, *args):
+    # Run pool_fn in a worker process (local_fn on a thread when the pool is off)
+    global _pool
+    loop = asyncio.get_running_loop()
+    if POOL_WORKERS <= 0:
+        return await loop.run_in_executor(None, local_fn, *args)
+    try:
+        result, pid, cache = await loop.run_in_executor(_get_pool(), pool_fn, *args)
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool for the next request
+        _pool = None
+        raise
+    _worker_cache[pid] = cache
+    return result
+
+# Request Coalescing
+# Byte-identical /calculate bursts (shared links, UI re-submits) wait on one
+# in-flight computation and share its EPSOutput.
+_single_flight = SingleFlight()
+
+# Quote Store (optional)
+# SFT_QUOTE_STORE: SQLite file shared by all workers/containers (unset -> off)
+# SFT_QUOTE_TTL_S / SFT_QUOTE_MAX_ROWS: pruning limits
+# Lookups run on a thread; writes are buffered and flushed by the store's
+# writer thread (batch full or every second).
+# Entries are keyed on the input hash plus STORE_VERSION, a hash of the
+# engine settings (pricing values, block catalogue, strategy, packing), so
+# a restart with another config never serves stale quotes.
+STORE_VERSION = engine.config_version()
+_store = None
+if os.environ.get("SFT_QUOTE_STORE"):
+    _store = QuoteStore(
+        os.environ["SFT_QUOTE_STORE"],
+        ttl=float(os.environ.get("SFT_QUOTE_TTL_S", str(7 * 24 * 3600))),
+        max_rows=int(os.environ.get("SFT_QUOTE_MAX_ROWS", "100000")),
+    )
+
+# Shadow Verification (see shadow.py)
+# SFT_SHADOW_RATE: fraction of computed /calculate quotes re-run with the
+#                  exhaustive strategy in a low-priority process (0 -> off)
+# SFT_SHADOW_DIR: divergence fixtures; SFT_SHADOW_BUDGET_MS: reference cap
+# SFT_SHADOW_MAX_PENDING: queued checks before samples are dropped
+_shadow = ShadowVerifier(
+    rate=float(os.environ.get("SFT_SHADOW_RATE", "0")),
+    directory=os.environ.get("SFT_SHADOW_DIR", "shadow_fixtures"),
+    budget=float(os.environ.get("SFT_SHADOW_BUDGET_MS", "5000")) / 1000.0,
+    max_pending=int(os.environ.get("SFT_SHADOW_MAX_PENDING", "64")),
+    pricing=engine.pricing, packing=PACKING,
+    packing_budget=PACKING_BUDGET, blocks=engine.blocks,
+)
+
+# Interactive Sessions (see session.py)
+# SFT_SESSION_MAX: form sessions kept in this API process (LRU); the stage
+#                  recompute runs in the calculation pool
+def _recompute_local(state, data: EPSInput, time_budget: float):
+    return profiled(recompute, engine, state, data, time_budget)
+
+async def _recompute_session(state, data: EPSInput, time_budget: float):
+    return await _offload(worker.recompute, _recompute_local, state, data, time_budget)
+
+_sessions = SessionStore(engine, max_sessions=int(os.environ.get("SFT_SESSION_MAX", "1024")),
+                         offload=_recompute_session)
+
+def _cache_stats():
+    if POOL_WORKERS <= 0:
+        return engine.cache_info()
+    total = {"size": 0, "maxsize": 0, "hits": 0, "misses": 0, "evictions": 0}
+    for info in _worker_cache.values():
+        for k in total:
+            total[k] += info[k]
+    return total
 
 # Mount Static
 app.mount("/static", StaticFiles(directory="src/static"), name="static")
@@ -15,14 +151,240 @@ app.mount("/static", StaticFiles(directory="src/static"), name="static")
 async def read_index():
     return FileResponse('src/static/index.html')
 
+def _calculate_local(data: EPSInput, time_budget: float):
+    return profiled(engine.calculate, data, time_budget=time_budget)
+
+def _with_profile(result: EPSOutput, timings) -> EPSOutput:
+    # Copy with details.profile set (results may be shared by coalesced requests)
+    profile = StageProfile(
+        stages_ms={k: round(v * 1000, 3) for k, v in timings["seconds"].items()},
+        total_ms=round(timings["total"] * 1000, 3),
+        partitions_explored=timings["partitions"],
+    )
+    details = result.details.model_copy(update={"profile": profile})
+    return result.model_copy(update={"details": details})
+
 @app.post("/calculate", response_model=EPSOutput)
-async def calculate_layout(data: EPSInput):
+async def calculate_layout(data: EPSInput, request: Request, profile: bool = False):
+    # profile=1: always computed (no store / coalescing), stage breakdown in
+    # details.profile
     try:
-        result = engine.calculate(data)
+        key = canonical_hash(data)
+        if _store is not None and not profile:
+            # Stored payload is an already validated EPSOutput -> send as is.
+            # SQLite read on a thread: the loop never waits on the file lock.
+            payload = await run_in_threadpool(_store.get, key, STORE_VERSION)
+            if payload is not None:
+                return Response(content=payload, media_type="application/json")
+
+        async def compute():
+            result, timings = await _offload(worker.calculate, _calculate_local, data, TIME_BUDGET)
+            _metrics.observe_timings(timings)
+            request.state.engine_s = timings["total"]
+            if _store is not None and result.optimal:
+                _store.put(key, STORE_VERSION, result.model_dump_json())
+            if STRATEGY != "exhaustive" and result.optimal:
+                _shadow.maybe_submit(data, result)
+            return result, timings
+
+        if profile:
+            return _with_profile(*await compute())
+        result, _ = await _single_flight.do(key, compute)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Lean responses: orjson when installed (see requirements.txt), else compact json
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+def _calculate_lean_local(data: EPSInput, time_budget: float):
+    return profiled(engine.calculate_lean, data, time_budget=time_budget)
+
+@app.post("/calculate/lean", response_model=LeanOutput)
+async def calculate_lean(data: EPSInput, request: Request):
+    # Spec 8.1 fields only, for high-volume external callers. The engine
+    # returns plain dicts that are serialized directly: no report, no
+    # response_model validation. Coalesced, but not served from the quote
+    # store (it holds full responses).
+    try:
+        async def compute():
+            result, timings = await _offload(worker.calculate_lean, _calculate_lean_local,
+                                             data, TIME_BUDGET)
+            _metrics.observe_timings(timings)
+            request.state.engine_s = timings["total"]
+            return _dumps(result)
+
+        payload = await _single_flight.do("lean:" + canonical_hash(data), compute)
+        return Response(content=payload, media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/session/{session_id}/calculate", response_model=EPSOutput)
+async def calculate_session(session_id: str, data: EPSInput, request: Request, response: Response,
+                            seq: Optional[int] = None):
+    # Form edits of one UI session: only the stages behind the changed fields
+    # are re-run (X-SFT-Stages lists them). 409 -> a newer edit (higher seq)
+    # superseded this one; the client drops the response.
+    try:
+        result, stages, timings = await _sessions.calculate(session_id, data, seq, TIME_BUDGET)
+    except Superseded:
+        raise HTTPException(status_code=409, detail="superseded")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    _metrics.observe_timings(timings)
+    request.state.engine_s = timings["total"]
+    response.headers["X-SFT-Stages"] = ",".join(stages)
+    return result
+
+@app.delete("/session/{session_id}")
+async def drop_session(session_id: str):
+    return {"dropped": _sessions.drop(session_id)}
+
+def _calculate_many_local(items: List[EPSInput], time_budget: float):
+    return engine.calculate_many(items, time_budget=time_budget)
+
+@app.post("/calculate/batch", response_model=List[EPSOutput])
+async def calculate_batch(items: List[EPSInput] = Body(..., max_length=MAX_BATCH_ITEMS)):
+    # Price lists: many box sizes in one call (vectorized axis selection), at
+    # most MAX_BATCH_ITEMS (422 above), each planned within the time budget
+    try:
+        return await _offload(worker.calculate_many, _calculate_many_local, items, TIME_BUDGET)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Streamed Responses
+# SFT_STREAM_TIME_LIMIT_S: wall-clock limit of one streamed response; no
+#                          more work starts after it and a last
+#                          {"error": ...} line marks the cut
+STREAM_TIME_LIMIT = float(os.environ.get("SFT_STREAM_TIME_LIMIT_S", "60"))
+
+def _time_limit_line(lines: int) -> str:
+    return json.dumps({"error": "time limit exceeded", "lines": lines}) + "\n"
+
+def _sweep_local(sweep: SweepInput, points, time_budget: float) -> str:
+    return sweep_lines(engine, sweep, points, time_budget)
+
+@app.post("/calculate/sweep")
+async def calculate_sweep(sweep: SweepInput):
+    # Catalogue grid as NDJSON, one line per (dimensions, quantity), at most
+    # MAX_SWEEP_POINTS lines (422 above). Chunks are computed in the pool one
+    # at a time, so a slow reader holds back the grid instead of buffering it.
+    deadline = time.monotonic() + STREAM_TIME_LIMIT
+
+    async def lines():
+        sent = 0
+        for points in chunks(sweep):
+            if time.monotonic() > deadline:
+                yield _time_limit_line(sent)
+                return
+            yield await _offload(worker.sweep, _sweep_local, sweep, points, TIME_BUDGET)
+            sent += len(points) * len(sweep.quantities)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def _cut_program_local(req: CutProgramInput, time_budget: float):
+    return programs(engine, req, time_budget)
+
+@app.post("/cut-program")
+async def cut_program(req: CutProgramInput):
+    # Wire passes per block as NDJSON (one line per block, streamed), at
+    # most MAX_BLOCKS blocks (422 above). The programs are built in the pool;
+    # the sync generator serializes the lines on a Starlette thread.
+    deadline = time.monotonic() + STREAM_TIME_LIMIT
+    try:
+        plans = await _offload(worker.cut_program, _cut_program_local, req, TIME_BUDGET)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    blocks = sum(count for count, _ in plans)
+    if blocks > MAX_BLOCKS:
+        raise HTTPException(status_code=422,
+                            detail=f"{blocks} blocks, at most {MAX_BLOCKS} per cut program")
+
+    def lines():
+        for sent, line in enumerate(iter_blocks(plans)):
+            if time.monotonic() > deadline:
+                yield _time_limit_line(sent)
+                return
+            yield _dumps(line) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/price-sheet", response_model=PriceSheetOutput)
+async def price_sheet(sheet: PriceSheetInput):
+    # Checklist 11: quantity-tier table for one product in one call
+    try:
+        return await _offload(
+            worker.price_sheet,
+            lambda s: engine.price_sheet(s.product, s.breakpoints()),
+            sheet,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/nesting", response_model=NestingOutput)
+async def nesting(req: NestingInput):
+    # Same-day orders packed into shared blocks (see nesting.py)
+    try:
+        return await _offload(worker.nest, lambda r: nest(engine, r.orders), req)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/schedule", response_model=ScheduleOutput)
+async def schedule_machines(req: ScheduleInput):
+    # Block-by-block CNC schedule for computed plans (see scheduling.py)
+    try:
+        return await _offload(worker.schedule, schedule, req)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/sensitivity", response_model=SensitivityOutput)
+async def yield_sensitivity(req: SensitivityInput):
+    # Nearest dimension changes that alter the quote (see sensitivity.py)
+    try:
+        return await _offload(worker.sensitivity, lambda r: sensitivity(engine, r), req)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/reprice", response_model=List[Pricing])
+async def reprice(req: RepriceRequest):
+    # Reprice stored plans (e.g. after a USD rate change) without layout work
+    try:
+        return engine.reprice_many(req.plans, usd_rate=req.usd_rate)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text exposition format
+    return Response(content=_metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+async def stats():
+    # Internal counters for capacity planning
+    return {
+        "layout_cache": _cache_stats(),
+        "coalescing": _single_flight.info(),
+        "quote_store": await run_in_threadpool(_store.info) if _store is not None else None,
+        "pool": {"workers": POOL_WORKERS, "time_budget_ms": TIME_BUDGET * 1000},
+        "shadow": _shadow.info(),
+        "sessions": _sessions.info(),
+    }
+
+@app.on_event("shutdown")
+def shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    if _store is not None:
+        _store.close()
+    _shadow.shutdown()
@@ -0,0 +1,172 @@
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Stage Metrics
+# EPSLogic marks its stages with `with stage("planning"):` and the planning
+# solvers report explored partitions with count_partitions(n). Both are
+# no-ops unless a StageTimer is active in the current context, so the
+# engine pays one ContextVar read per stage when nobody is measuring.
+#
+# profiled(fn, ...) runs one call under a fresh StageTimer and returns its
+# timings; the API process feeds them into the Prometheus-text histograms
+# served at /metrics (see main.py).
+
+STAGES = ("cut_dims", "axis_selection", "planning", "pricing", "report")
+
+# Seconds; quotes range from ~0.1 ms (cache hit) to the planning time budget
+SECONDS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PARTITION_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+_current: ContextVar[Optional["StageTimer"]] = ContextVar("sft_stage_timer", default=None)
+
+
+class StageTimer:
+    # Accumulated seconds per stage and partitions explored for one request
+    def __init__(self):
+        self.seconds = {name: 0.0 for name in STAGES}
+        self.partitions = 0
+
+    def snapshot(self) -> Dict:
+        # Picklable result (returned from worker processes)
+        return {"seconds": dict(self.seconds), "partitions": self.partitions}
+
+
+class stage:
+    # Context manager adding the elapsed time of its block to a stage
+    __slots__ = ("name", "timer", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.timer = _current.get()
+        if self.timer is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.timer is not None:
+            self.timer.seconds[self.name] += time.perf_counter() - self.start
+        return False
+
+
+def count_partitions(n: int) -> None:
+    timer = _current.get()
+    if timer is not None:
+        timer.partitions += n
+
+
+def profiled(fn: Callable, *args, **kwargs) -> Tuple[object, Dict]:
+    # (fn(*args, **kwargs), timings) with timings = StageTimer.snapshot()
+    # plus the wall time of the whole call under "total".
+    timer = StageTimer()
+    token = _current.set(timer)
+    start = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        _current.reset(token)
+    timings = timer.snapshot()
+    timings["total"] = time.perf_counter() - start
+    return result, timings
+
+
+# --- Prometheus text exposition ---
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v))
+
+
+class Histogram:
+    # Cumulative-bucket histogram with one optional label
+    def __init__(self, name: str, help: str, buckets, label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series: Dict[str, List] = {}  # label value -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label: str = "") -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+        for value in sorted(series):
+            counts, total, n = series[value]
+            labels = f'{self.label}="{value}"' if self.label else ""
+            sep = "," if labels else ""
+            cumulative = 0
+            for bound, c in zip(self.buckets + (math.inf,), counts):
+                cumulative += c
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{_fmt(bound)}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total!r}")
+            lines.append(f"{self.name}_count{suffix} {n}")
+        return lines
+
+
+class Registry:
+    # Histograms of the API process: engine stages, partitions, HTTP requests
+    def __init__(self):
+        self.stage_seconds = Histogram(
+            "sft_stage_seconds", "Time per calculation stage (http = parsing, validation, "
+            "serialization and pool hand-off)", SECONDS_BUCKETS, label="stage")
+        self.partitions = Histogram(
+            "sft_partitions_explored", "Row partitions explored per calculation", PARTITION_BUCKETS)
+        self.request_seconds = Histogram(
+            "sft_request_seconds", "HTTP request duration per route", SECONDS_BUCKETS, label="path")
+
+    def observe_timings(self, timings: Dict) -> None:
+        for name, seconds in timings["seconds"].items():
+            self.stage_seconds.observe(seconds, name)
+        self.partitions.observe(timings["partitions"])
+
+    def render(self) -> str:
+        lines = []
+        for h in (self.stage_seconds, self.partitions, self.request_seconds):
+            lines.extend(h.render())
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimer:
+    # Pure ASGI middleware: request duration per route template of the app
+    # (/session/{session_id}/calculate, not one label per session id);
+    # anything else, e.g. static files or 404s, is labelled "other". When
+    # the endpoint leaves the engine time in scope["state"]["engine_s"], the
+    # rest of the request is observed as the "http" stage.
+    def __init__(self, app, registry: Registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        scope.setdefault("state", {})
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = time.perf_counter() - start
+            # The router leaves the matched route in the scope
+            path = getattr(scope.get("route"), "path", None) or "other"
+            self.registry.request_seconds.observe(elapsed, path)
+            engine_s = scope["state"].get("engine_s")
+            if engine_s is not None:
+                self.registry.stage_seconds.observe(max(0.0, elapsed - engine_s), "http")
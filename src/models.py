@@ -1,5 +1,7 @@
-from typing import List, Optional, Dict, Literal, Any
-from pydantic import BaseModel, Field
+import hashlib
+from typing import List, Optional, Dict, Literal, Any, Tuple
+import pydantic
+from pydantic import ConfigDict, Field, PositiveInt, model_validator
 
 # Constants from Spec
 BLOCK_DIMS = [103, 122, 202]  # cm
@@ -9,6 +11,25 @@ RULE_44_LIMIT = 44.0  # cm
 WIRE_THICKNESS = 0.5  # cm
 SLICE_THICKNESS = 0.2  # cm
 
+class BaseModel(pydantic.BaseModel):
+    # Validators are built on first use instead of at import, so one-off
+    # tools (cli.py) only pay for the models they touch.
+    model_config = ConfigDict(defer_build=True)
+
+class BlockType(BaseModel):
+    # One entry of the block catalogue (see pricing.load_block_catalogue).
+    # dims: [short, short, long]; the long axis plays the 202 role
+    # (tolerance and 44 cm rule) for every block size.
+    name: str
+    dims: List[float] = Field(..., min_length=3, max_length=3)
+    long_tolerance: float = Field(TOLERANCE_202, ge=0, description="202-style trim on the long axis")
+    rule_limit: float = Field(RULE_44_LIMIT, ge=0, description="Min cut size on the long axis")
+    block_usd: Optional[float] = Field(None, gt=0, description="Block cost (default: PricingConfig.base_block_usd)")
+    dns: Optional[int] = Field(None, description="Only quotes with this density (None -> any)")
+
+# Trusted constant: model_construct keeps the BlockType validator unbuilt at import
+DEFAULT_BLOCK = BlockType.model_construct(name="103x122x202", dims=[float(v) for v in BLOCK_DIMS])
+
 class ExtraPart(BaseModel):
     name: str
     count: int = Field(..., ge=1, description="Quantity per box")
@@ -29,11 +50,43 @@ class EPSInput(BaseModel):
     req_boxes: Optional[int] = Field(None, gt=0, description="Requested box count")
     dns: Optional[int] = Field(None, description="Density")
     start_time_unix: Optional[int] = None 
+    # Order planning: "uniform" repeats one block plan (Spec 7), "mixed"
+    # allows a main plan x (B-1) plus one tail plan (see planning.py)
+    multi_block: Literal["uniform", "mixed"] = "uniform"
+
+def canonical_hash(data: BaseModel) -> str:
+    # Stable key for identical inputs (field order fixed by the model, numbers normalized)
+    return hashlib.sha256(data.model_dump_json().encode()).hexdigest()
 
 class Pricing(BaseModel):
     unit_price: float
     total_price: float
 
+class PricingConfig(BaseModel):
+    # Checklist 10: Fiyatlandırma ayarları (loaded from JSON, see pricing.py)
+    version: str = "v1"  # bump when prices change (keys stored quotes)
+    usd_rate: float = Field(32.0, gt=0, description="USD Kuru (TL)")
+    risk_margin: float = Field(1.30, description="Kur Risk Payı (%30)")
+    trade_margin: float = Field(1.20, description="Ticari Çarpan (%20)")
+    vat_rate: float = Field(1.20, description="KDV (%20)")
+    base_block_usd: float = Field(120.0, description="Block base price at dns_base")
+    dns_base: int = 10
+    dns_step_usd: float = Field(5.0, description="USD per density step above dns_base")
+    processing_fee: float = Field(0.5, description="TL per cut piece (Kesim İşçiliği)")
+    shipping: float = 0.0
+
+class StoredPlan(BaseModel):
+    # Minimal production plan needed to reprice a stored quote
+    blocks_needed: int = Field(..., ge=0)
+    total_produced: Dict[str, int]
+    req_boxes: Optional[int] = Field(None, gt=0)
+    dns: Optional[int] = None
+    block_usd: Optional[float] = Field(None, gt=0)  # block type cost, None -> config base
+
+class RepriceRequest(BaseModel):
+    usd_rate: Optional[float] = Field(None, gt=0, description="New USD rate (default: current config)")
+    plans: List[StoredPlan]
+
 class CutDims(BaseModel):
     footprint: List[float] # [x, y]
     box_h: float
@@ -41,16 +94,31 @@ class CutDims(BaseModel):
 
 class Layout2D(BaseModel):
     table_axes: List[float] # [103, 122] usually
-    rotation: str # description
+    rotation: str # description ("Mixed" for guillotine layouts with both rotations)
     sira_adedi: int
+    # Guillotine packing only: piece corners [x_cm, y_cm, rotated] on the table
+    placements: Optional[List[Tuple[float, float, bool]]] = None
+
+class StageProfile(BaseModel):
+    # Per-request stage breakdown (POST /calculate?profile=1)
+    stages_ms: Dict[str, float]  # cut_dims, axis_selection, planning, pricing, report
+    total_ms: float              # whole engine call
+    partitions_explored: int
 
 class DetailedReport(BaseModel):
     block_cm: List[float]
+    block_type: str = DEFAULT_BLOCK.name
     rule_44cm: Dict
     cut_dims_cm: CutDims
     layout_2d: Layout2D
     per_sira: Dict[str, int] # "box" -> quantity, "part_name" -> quantity
     sira_plan: Dict[str, int] # "box" -> rows, "part_name" -> rows
+    profile: Optional[StageProfile] = None
+
+class BlockPlan(BaseModel):
+    blocks: int
+    sira_plan: Dict[str, int]
+    per_block: Dict[str, int]
 
 class EPSOutput(BaseModel):
     blocks_needed: int
@@ -59,3 +127,197 @@ class EPSOutput(BaseModel):
     excess: Optional[Dict[str, int]] = None
     pricing: Pricing
     details: DetailedReport
+    optimal: bool = True  # False -> planning cut short by the time budget
+    block_plans: Optional[List[BlockPlan]] = None  # multi_block="mixed" orders only
+
+class LeanOutput(BaseModel):
+    # Spec 8.1 external response (POST /calculate/lean). Documents the schema
+    # only: the endpoint builds plain dicts and skips response validation.
+    blocks_needed: int
+    per_block: Dict[str, int]
+    total_produced: Dict[str, int]
+    required: Optional[Dict[str, int]] = None
+    excess: Optional[Dict[str, int]] = None
+    pricing: Pricing
+
+class SensitivityInput(BaseModel):
+    # Yield cliffs around one product (see sensitivity.py)
+    product: EPSInput
+    step_cm: float = Field(0.1, ge=0.01, description="Dimension resolution (0.1 = 1 mm)")
+    max_change_cm: float = Field(10.0, gt=0, le=100, description="Search window per direction")
+    # en, boy, yukseklik, "part:<name>"; None -> all
+    dimensions: Optional[List[str]] = None
+
+class YieldCliff(LeanOutput):
+    # Nearest dimension value whose quote differs, with that quote
+    value: float
+    change_cm: float
+
+class DimensionSensitivity(BaseModel):
+    dimension: str
+    value: float
+    decrease: Optional[YieldCliff] = None  # None -> no change within the window
+    increase: Optional[YieldCliff] = None
+    evaluated: int  # breakpoints the engine was run at
+
+class SensitivityOutput(BaseModel):
+    base: LeanOutput
+    exact: bool  # False with guillotine packing (grid breakpoints only)
+    dimensions: List[DimensionSensitivity]
+
+class DimRange(BaseModel):
+    # Inclusive range of a dimension in cm, e.g. 20..60 every 0.5 (5 mm)
+    start: float = Field(..., gt=0)
+    stop: float = Field(..., gt=0)
+    step: float = Field(..., gt=0)
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.stop < self.start:
+            raise ValueError("stop must be >= start")
+        return self
+
+    def count(self) -> int:
+        return int((self.stop - self.start) / self.step + 1e-9) + 1
+
+    def values(self):
+        # Lazy; rounded to 0.001 mm so 20 + 8 * 0.5 is exactly 24.0
+        for i in range(self.count()):
+            yield round(self.start + i * self.step, 4)
+
+MAX_SWEEP_POINTS = 50000
+
+class SweepInput(BaseModel):
+    # Catalogue sweep: dimension ranges x order quantities
+    boy: DimRange
+    en: DimRange
+    yukseklik: DimRange
+    wall_thickness: float = Field(..., gt=0, description="Wall thickness in cm")
+    extra_parts: List[ExtraPart] = []
+    quantities: List[Optional[PositiveInt]] = Field([None], min_length=1, description="req_boxes values (null -> 1 block plan)")
+    dns: Optional[int] = Field(None, description="Density")
+
+    @model_validator(mode="after")
+    def check_size(self):
+        if self.points() > MAX_SWEEP_POINTS:
+            raise ValueError(f"at most {MAX_SWEEP_POINTS} points per sweep")
+        return self
+
+    def points(self) -> int:
+        # NDJSON lines of the sweep
+        return self.boy.count() * self.en.count() * self.yukseklik.count() * len(self.quantities)
+
+MAX_PRICE_TIERS = 10000
+
+class QuantityRange(BaseModel):
+    # Inclusive req_boxes range, e.g. 100..5000 every 100
+    start: int = Field(..., ge=1)
+    stop: int = Field(..., ge=1)
+    step: int = Field(1, ge=1)
+
+class PriceSheetInput(BaseModel):
+    # Checklist 11: Adet Aralığı Fiyatı - one product, many quantities
+    product: EPSInput  # req_boxes is ignored
+    quantities: Optional[List[int]] = None
+    quantity_range: Optional[QuantityRange] = None
+
+    @model_validator(mode="after")
+    def check_quantities(self):
+        if (self.quantities is None) == (self.quantity_range is None):
+            raise ValueError("give exactly one of quantities or quantity_range")
+        if self.quantities is not None and any(q < 1 for q in self.quantities):
+            raise ValueError("quantities must be >= 1")
+        if len(self.breakpoints()) > MAX_PRICE_TIERS:
+            raise ValueError(f"at most {MAX_PRICE_TIERS} quantities per sheet")
+        return self
+
+    def breakpoints(self):
+        if self.quantities is not None:
+            return self.quantities
+        r = self.quantity_range
+        return range(r.start, r.stop + 1, r.step)
+
+class PriceTier(BaseModel):
+    req_boxes: int
+    blocks_needed: int
+    per_block: Dict[str, int]
+    excess: Dict[str, int]
+    pricing: Pricing
+
+class PriceSheetOutput(BaseModel):
+    details: DetailedReport  # shared layout (sira_plan of the largest tier)
+    tiers: List[PriceTier]   # ascending req_boxes
+
+MAX_BATCH_ITEMS = 2000  # POST /calculate/batch
+
+MAX_NESTING_ORDERS = 2000
+
+class NestingInput(BaseModel):
+    # Multi-order nesting: several orders cut from shared blocks
+    orders: List[EPSInput] = Field(..., min_length=1, max_length=MAX_NESTING_ORDERS)
+
+    @model_validator(mode="after")
+    def check_orders(self):
+        if any(o.req_boxes is None for o in self.orders):
+            raise ValueError("every order needs req_boxes")
+        return self
+
+class NestedOrder(BaseModel):
+    order: int                # index into NestingInput.orders
+    strips: int               # table strips of this order in the block
+    sira_plan: Dict[str, int] # component -> rows
+
+class NestedBlock(BaseModel):
+    block_type: str = DEFAULT_BLOCK.name
+    table_axes: List[float]
+    h_eff: float
+    used_width_cm: float      # along table_axes[0]
+    orders: List[NestedOrder]
+
+class NestingOutput(BaseModel):
+    blocks_needed: int
+    standalone_blocks: int    # sum of blocks_needed quoting each order alone
+    blocks_saved: int
+    blocks: List[NestedBlock]
+    unplaced: List[int] = []  # orders no layout can produce
+
+class Machine(BaseModel):
+    name: str
+    speed: float = Field(1.0, gt=0, description="Relative to the reference machine")
+
+class ScheduleJob(BaseModel):
+    job_id: str
+    plan: EPSOutput                 # computed quote (see /calculate)
+    due_s: Optional[float] = None   # due time, seconds from schedule start
+
+class ScheduleInput(BaseModel):
+    jobs: List[ScheduleJob]
+    machines: List[Machine] = Field(..., min_length=1)
+    objective: Literal["makespan", "lateness"] = "makespan"
+    # Machine time estimate per block (reference machine, see scheduling.py)
+    setup_s: float = Field(120.0, ge=0, description="Block load / unload")
+    xy_cut_s: float = Field(30.0, ge=0, description="Per table grid line")
+    z_cut_s: float = Field(2.0, ge=0, description="Per slice in a row")
+
+class ScheduledBlock(BaseModel):
+    job_id: str
+    block: int      # 1-based block number within the job
+    start_s: float
+    end_s: float
+
+class MachineSchedule(BaseModel):
+    machine: str
+    busy_s: float
+    blocks: List[ScheduledBlock]
+
+class ScheduleOutput(BaseModel):
+    makespan_s: float
+    max_lateness_s: Optional[float] = None  # only jobs with due_s
+    late_jobs: List[str]
+    machines: List[MachineSchedule]
+
+class CutProgramInput(BaseModel):
+    # Wire-pass program for every block of one quote (see cutprogram.py)
+    product: EPSInput
+    wire_speed_cm_min: float = Field(60.0, gt=0, description="Hot-wire feed rate")
+    pass_overhead_s: float = Field(10.0, ge=0, description="Positioning per pass")
@@ -0,0 +1,151 @@
+import math
+from typing import Dict, List, Tuple
+from .logic import EPSLogic
+from .models import EPSInput, NestedBlock, NestedOrder, NestingOutput
+
+# Multi-Order Nesting
+# Orders quoted one by one each leave a partly used last block. Here orders
+# that share a block type and axis config (same table axes and h_eff, i.e.
+# the same block orientation) are packed into shared blocks. Each order
+# gets the block type its own quote would use (select_block).
+#
+# Strip model: the table T1 x T2 is cut across T1 into full-length strips.
+# A strip of one product is one piece wide and holds floor(T2 / length)
+# rows ("sira"); every row still holds one item type only (Spec 2). For a
+# single order this is exactly its grid layout, so nesting an order on its
+# own never needs more blocks than quoting it. Strips of different orders
+# then share a block as long as their widths fit in T1: a 1D bin packing
+# solved with first-fit decreasing plus a bin-emptying improvement pass.
+
+EPS = 1e-9
+IMPROVE_TRIES = 8  # least used bins tried per improvement round
+
+
+def _strip(table, cut_x: float, cut_y: float) -> Tuple[float, int]:
+    # (strip width, rows per strip) of the better grid orientation
+    T1, T2 = table
+    normal = (cut_x, math.floor(T2 / cut_y))
+    rotated = (cut_y, math.floor(T2 / cut_x))
+    if math.floor(T1 / rotated[0]) * rotated[1] > math.floor(T1 / normal[0]) * normal[1]:
+        return rotated
+    return normal
+
+
+def first_fit_decreasing(items: List[Tuple[int, float, int]], capacity: float) -> List[List]:
+    # items: (order, width, strips) -> bins [free width, {order: strips}].
+    # Strips of one order are identical, so each bin takes as many as fit.
+    bins: List[List] = []
+    for order, width, count in items:
+        for b in bins:
+            if count == 0:
+                break
+            fit = min(count, int((b[0] + EPS) // width))
+            if fit:
+                b[0] -= fit * width
+                b[1][order] = b[1].get(order, 0) + fit
+                count -= fit
+        while count:
+            fit = min(count, int((capacity + EPS) // width))
+            bins.append([capacity - fit * width, {order: fit}])
+            count -= fit
+    return bins
+
+
+def improve(bins: List[List], widths: Dict[int, float]) -> List[List]:
+    # Try to empty one of the least used bins into the free space of the
+    # others; repeat until no bin can be removed.
+    while len(bins) > 1:
+        bins.sort(key=lambda b: b[0])
+        for victim in range(len(bins) - 1, max(len(bins) - 1 - IMPROVE_TRIES, -1), -1):
+            free = [b[0] for b in bins]
+            moves = []
+            ok = True
+            for order, count in sorted(bins[victim][1].items(), key=lambda kv: -widths[kv[0]]):
+                w = widths[order]
+                for i in range(len(bins)):
+                    if i == victim or count == 0:
+                        continue
+                    fit = min(count, int((free[i] + EPS) // w))
+                    if fit:
+                        free[i] -= fit * w
+                        moves.append((i, order, fit))
+                        count -= fit
+                if count:
+                    ok = False
+                    break
+            if ok:
+                for i, order, fit in moves:
+                    bins[i][0] -= fit * widths[order]
+                    bins[i][1][order] = bins[i][1].get(order, 0) + fit
+                del bins[victim]
+                break
+        else:
+            return bins
+    return bins
+
+
+def _rows_in(plan: List[Tuple[str, int]], start: int, stop: int) -> Dict[str, int]:
+    # Component rows in positions [start, stop) of an order's row sequence
+    out = {}
+    pos = 0
+    for name, rows in plan:
+        lo, hi = max(start, pos), min(stop, pos + rows)
+        if hi > lo:
+            out[name] = hi - lo
+        pos += rows
+    return out
+
+
+def nest(engine: EPSLogic, orders: List[EPSInput]) -> NestingOutput:
+    groups: Dict[Tuple, List[int]] = {}
+    info = {}
+    standalone = 0
+    unplaced = []
+    for idx, data in enumerate(orders):
+        geometry, plan = engine.select_block(data)
+        table = tuple(geometry['layout']['table_axes'])
+        width, per_strip = _strip(table, geometry['cut_x'], geometry['cut_y'])
+        rows = []
+        for name, amount in plan['required'].items():
+            per_sira = geometry['per_sira'][name]
+            rows.append((name, -(-amount // per_sira) if per_sira > 0 else None))
+        if plan['blocks_needed'] == 0 or per_strip == 0 or any(r is None for _, r in rows):
+            unplaced.append(idx)  # no layout can produce this order
+            continue
+        standalone += plan['blocks_needed']
+        strips = -(-sum(r for _, r in rows) // per_strip)
+        info[idx] = {'width': width, 'per_strip': per_strip, 'rows': rows, 'strips': strips,
+                     'next': 0}
+        groups.setdefault((geometry['block'], table, geometry['config']['h_eff']), []).append(idx)
+
+    blocks = []
+    for (block, table, h_eff), members in groups.items():
+        # Widest strips first, larger orders first on ties
+        items = sorted(((i, info[i]['width'], info[i]['strips']) for i in members),
+                       key=lambda it: (-it[1], -it[1] * it[2], it[0]))
+        bins = improve(first_fit_decreasing(items, table[0]), {i: info[i]['width'] for i in members})
+        alone = [b for it in items for b in first_fit_decreasing([it], table[0])]
+        if len(alone) < len(bins):
+            bins = alone  # heuristics lost to per-order blocks: keep those
+        for free, content in bins:
+            nested = []
+            for order in sorted(content):
+                o = info[order]
+                start = o['next'] * o['per_strip']
+                o['next'] += content[order]
+                nested.append(NestedOrder(
+                    order=order,
+                    strips=content[order],
+                    sira_plan=_rows_in(o['rows'], start, o['next'] * o['per_strip']),
+                ))
+            blocks.append(NestedBlock(block_type=engine.blocks[block].name, table_axes=list(table),
+                                      h_eff=h_eff, used_width_cm=round(table[0] - free, 4),
+                                      orders=nested))
+
+    return NestingOutput(
+        blocks_needed=len(blocks),
+        standalone_blocks=standalone,
+        blocks_saved=standalone - len(blocks),
+        blocks=blocks,
+        unplaced=unplaced,
+    )
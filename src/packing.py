@@ -0,0 +1,225 @@
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Guillotine Packing (mixed rotation)
+# The grid layout (Checklist 6) puts every piece on the table in the same
+# rotation: max(floor(T1/x)*floor(T2/y), floor(T2/x)*floor(T1/y)). A guillotine
+# layout may cut the table into sub-rectangles and rotate each one on its own,
+# which fills the strips a uniform grid leaves empty.
+#
+# Search: bottom-up DP over the "normal" sizes (i*a + j*b, the only places a
+# useful cut can fall) in integer units. Every state starts from its best
+# uniform grid, so the result never drops below the grid layout; a state stops
+# early when it reaches the area bound floor(w*h / (a*b)).
+#
+# The DP tables hold len(X) * len(Y) states, which grows quickly for small
+# pieces. The resolution is coarsened (pieces round up, the table rounds
+# down, so layouts stay feasible) until the tables fit MAX_STATES; when no
+# resolution fits, the DP is skipped. The best one-cut layout (two uniform
+# grids) is computed first without any tables and is returned when the DP is
+# skipped, or when the time budget runs out (then flagged as not complete).
+
+UNITS = 100  # integer units per cm (0.1 mm)
+RESOLUTIONS = (UNITS, 50, 20, 10)  # units per cm tried for the DP, finest first
+MAX_STATES = 250_000  # DP states (~15 MB of tables, ~1 s of search)
+DEADLINE_CHECK = 256  # vertical-cut states between clock reads
+
+GRID, GRID_ROT, SPLIT_X, SPLIT_Y = 0, 1, 2, 3
+
+Placement = Tuple[float, float, bool]  # (x cm, y cm, rotated)
+
+
+def _units(cm: float, up: bool, units: int = UNITS) -> int:
+    # cm -> integer units; off-grid values round outwards for pieces (up) and
+    # inwards for the table, so every layout found is feasible in cm.
+    v = cm * units
+    r = round(v)
+    if abs(v - r) < 1e-6:
+        return int(r)
+    return math.ceil(v) if up else math.floor(v)
+
+
+def _normal(limit: int, a: int, b: int) -> np.ndarray:
+    # Sorted distinct i*a + j*b <= limit (0 included)
+    vals = set()
+    for i in range(limit // a + 1):
+        base = i * a
+        vals.update(range(base, limit + 1, b))
+    return np.array(sorted(vals), dtype=np.int64)
+
+
+def _normal_bound(limit: int, a: int, b: int) -> int:
+    # Upper bound on len(_normal(limit, a, b)) without building it
+    return min(limit + 1, sum((limit - i * a) // b + 1 for i in range(limit // a + 1)))
+
+
+def _expired(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.monotonic() > deadline
+
+
+def _grid(w, h, a: int, b: int):
+    # Best uniform grid in w x h: (count, rotated)
+    n1 = (w // a) * (h // b)
+    n2 = (w // b) * (h // a)
+    return np.maximum(n1, n2), n2 > n1
+
+
+def pack(W_cm: float, H_cm: float, x_cm: float, y_cm: float,
+         deadline: Optional[float] = None) -> Tuple[int, List[Placement], bool]:
+    # Max pieces of x_cm * y_cm (either rotation) on a W_cm * H_cm table.
+    # Returns (count, placements, complete); placements are piece corners in cm
+    # with x along the first table axis, rotated = piece y side along x.
+    W, H = _units(W_cm, up=False), _units(H_cm, up=False)
+    a, b = _units(x_cm, up=True), _units(y_cm, up=True)
+    if a <= 0 or b <= 0:
+        return 0, [], True
+    count, placements = _one_cut(W, H, a, b)
+
+    for units in RESOLUTIONS:
+        W, H = _units(W_cm, up=False, units=units), _units(H_cm, up=False, units=units)
+        a, b = _units(x_cm, up=True, units=units), _units(y_cm, up=True, units=units)
+        if _normal_bound(W, a, b) * _normal_bound(H, a, b) <= MAX_STATES:
+            break
+    else:
+        return count, placements, True  # too many states at any resolution
+    if _expired(deadline):
+        return count, placements, False
+
+    X = _normal(W, a, b)
+    Y = _normal(H, a, b)
+    result = _dp(X, Y, a, b, deadline)
+    if result is None:
+        return count, placements, False
+    F, kind, arg = result
+    if F[-1, -1] <= count:
+        return count, placements, True  # coarse DP no better than the one cut
+
+    placements = []
+    stack = [(len(X) - 1, len(Y) - 1, 0, 0)]
+    while stack:
+        i, j, ox, oy = stack.pop()
+        k, t = int(kind[i, j]), int(arg[i, j])
+        if k == SPLIT_X:
+            stack.append((t, j, ox, oy))
+            stack.append((_floor_index(X, X[i] - X[t]), j, ox + int(X[t]), oy))
+        elif k == SPLIT_Y:
+            stack.append((i, t, ox, oy))
+            stack.append((i, _floor_index(Y, Y[j] - Y[t]), ox, oy + int(Y[t])))
+        else:
+            placements.extend(_grid_placements(ox, oy, int(X[i]), int(Y[j]), a, b,
+                                               k == GRID_ROT, units))
+    return int(F[-1, -1]), placements, True
+
+
+def _floor_index(values: np.ndarray, v) -> int:
+    # Index of the largest normal size <= v
+    return int(np.searchsorted(values, v, side="right")) - 1
+
+
+def _grid_placements(ox: int, oy: int, w: int, h: int, a: int, b: int,
+                     rotated: bool, units: int = UNITS) -> List[Placement]:
+    px, py = (b, a) if rotated else (a, b)
+    if px <= 0 or py <= 0:
+        return []
+    return [((ox + c * px) / units, (oy + r * py) / units, rotated)
+            for r in range(h // py) for c in range(w // px)]
+
+
+def _init(X: np.ndarray, Y: np.ndarray, a: int, b: int):
+    # Every state starts as its best uniform grid
+    F, rot = _grid(X[:, None], Y[None, :], a, b)
+    kind = np.where(rot, GRID_ROT, GRID).astype(np.int8)
+    arg = np.zeros(F.shape, dtype=np.int32)
+    return F.astype(np.int64), kind, arg
+
+
+def _one_cut(W: int, H: int, a: int, b: int) -> Tuple[int, List[Placement]]:
+    # Best single cut of the table into two uniform grids (or one grid), no
+    # DP tables. A grid on one side is tight at a multiple of a or b, so only
+    # those cut positions are tried: O(W/a + H/a) work.
+    best, rotated = _grid(W, H, a, b)
+    best_rects = [(0, 0, W, H, bool(rotated))]
+    for along_x in (True, False):
+        length, other = (W, H) if along_x else (H, W)
+        cuts = np.unique(np.concatenate([np.arange(a, length, a), np.arange(b, length, b)]))
+        if len(cuts) == 0:
+            continue
+        if along_x:
+            n1, r1 = _grid(cuts, other, a, b)
+            n2, r2 = _grid(length - cuts, other, a, b)
+        else:
+            n1, r1 = _grid(other, cuts, a, b)
+            n2, r2 = _grid(other, length - cuts, a, b)
+        t = int((n1 + n2).argmax())
+        if n1[t] + n2[t] > best:
+            best = n1[t] + n2[t]
+            c = int(cuts[t])
+            if along_x:
+                best_rects = [(0, 0, c, H, bool(r1[t])), (c, 0, W - c, H, bool(r2[t]))]
+            else:
+                best_rects = [(0, 0, W, c, bool(r1[t])), (0, c, W, H - c, bool(r2[t]))]
+    placements = []
+    for ox, oy, w, h, rot in best_rects:
+        placements.extend(_grid_placements(ox, oy, w, h, a, b, rot))
+    return int(best), placements
+
+
+def _dp(X: np.ndarray, Y: np.ndarray, a: int, b: int, deadline: Optional[float]):
+    # Full guillotine DP; None when the deadline passes first
+    F, kind, arg = _init(X, Y, a, b)
+    bound = (X[:, None] * Y[None, :]) // (a * b)
+    nx = len(X)
+
+    # Complement indices of the cuts at X[1..m] inside each width X[i]
+    half_x = np.searchsorted(X, X // 2, side="right")  # cuts t < half_x[i]
+    comp_x: Dict[int, np.ndarray] = {}
+    for i in range(nx):
+        if half_x[i] > 1:
+            comp_x[i] = np.searchsorted(X, X[i] - X[1:half_x[i]], side="right") - 1
+
+    for j in range(1, len(Y)):
+        if _expired(deadline):
+            return None
+        # Horizontal cuts: all lower rows are final -> vectorized over widths
+        m = int(np.searchsorted(Y, Y[j] // 2, side="right"))
+        if m > 1:
+            ts = np.arange(1, m)
+            comp = np.searchsorted(Y, Y[j] - Y[ts], side="right") - 1
+            split = F[:, ts] + F[:, comp]
+            best_t = split.argmax(axis=1)
+            best = split[np.arange(nx), best_t]
+            better = best > F[:, j]
+            F[better, j] = best[better]
+            kind[better, j] = SPLIT_Y
+            arg[better, j] = ts[best_t[better]]
+
+        # Vertical cuts: depend on narrower states of this row
+        col = F[:, j]
+        for n, (i, comp) in enumerate(comp_x.items(), 1):
+            if n % DEADLINE_CHECK == 0 and _expired(deadline):
+                return None
+            if col[i] >= bound[i, j]:
+                continue
+            split = col[1:half_x[i]] + col[comp]
+            t = int(split.argmax())
+            if split[t] > col[i]:
+                col[i] = split[t]
+                kind[i, j] = SPLIT_X
+                arg[i, j] = t + 1
+    return F, kind, arg
+
+
+def grid_placements(W_cm: float, H_cm: float, x_cm: float, y_cm: float,
+                    rotated: bool) -> List[Placement]:
+    # Piece corners of the uniform grid layout, same floors as EPSLogic
+    px, py = (y_cm, x_cm) if rotated else (x_cm, y_cm)
+    return [(c * px, r * py, rotated)
+            for r in range(math.floor(H_cm / py)) for c in range(math.floor(W_cm / px))]
+
+
+def transpose(placements: List[Placement]) -> List[Placement]:
+    # Layout of the swapped table (T2, T1): axes swap, so does the rotation
+    return [(y, x, not rotated) for x, y, rotated in placements]
@@ -0,0 +1,439 @@
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+from .metrics import count_partitions
+
+# Row Planning (Checklist 6 & 8)
+# A plan assigns every "sira" of the table to exactly one component
+# (Box or one of the extra parts). A row never mixes item types (Spec 2).
+#
+# comps     -> ['Box', part_1, part_2, ...]
+# per_sira  -> name -> items cut from one row
+# ratios    -> name -> items needed per set (Box = 1)
+#
+# Every solver reports the partitions it looked at (count_partitions): each
+# enumerated composition for the exhaustive solvers, each feasibility probe
+# (one candidate partition of minimum rows) for the fast ones.
+
+STRATEGIES = ("fast", "exhaustive")
+DEADLINE_CHECK = 256  # partitions between clock reads (exhaustive search)
+
+
+def partitions(n, k):
+    # Generate all partitions of n rows into k bins (lexicographic order)
+    if k == 1:
+        yield [n]
+        return
+    for i in range(n + 1):
+        for p in partitions(n - i, k - 1):
+            yield [i] + p
+
+
+def _rows_for(amount: int, per_sira: int) -> Optional[int]:
+    # Minimum rows so that rows * per_sira >= amount. None -> impossible.
+    if amount <= 0:
+        return 0
+    if per_sira <= 0:
+        return None
+    return -(-amount // per_sira)
+
+
+# --- No Order: Maximum Sets in 1 Block ---
+
+def _expired(deadline: Optional[float], explored: int) -> bool:
+    # Anytime search: check the clock every DEADLINE_CHECK partitions
+    return deadline is not None and explored % DEADLINE_CHECK == 0 and time.monotonic() > deadline
+
+
+def max_sets_exhaustive(sira_max: int, comps: List[str], per_sira: Dict[str, int],
+                        ratios: Dict[str, int], deadline: Optional[float] = None
+                        ) -> Tuple[int, Dict[str, int], bool]:
+    # Reference strategy: enumerate every composition of sira_max rows.
+    # O(S^N) - kept for verification against the fast solver.
+    # Past the deadline the best plan so far is returned with optimal=False.
+    best_sets = -1
+    best_plan_rows = {'Box': sira_max}
+
+    explored = 0
+    for explored, p in enumerate(partitions(sira_max, len(comps)), 1):
+        if _expired(deadline, explored):
+            count_partitions(explored)
+            return best_sets, best_plan_rows, False
+
+        # Calc yield
+        current_yield = {}
+        for i, name in enumerate(comps):
+            current_yield[name] = p[i] * per_sira[name]
+
+        # Calc sets
+        limit = current_yield['Box']
+        for name in comps[1:]:
+            req = ratios[name]
+            if req > 0:
+                limit = min(limit, current_yield[name] // req)
+
+        if limit > best_sets:
+            best_sets = limit
+            best_plan_rows = {name: p[i] for i, name in enumerate(comps)}
+
+    count_partitions(explored)
+    return best_sets, best_plan_rows, True
+
+
+def max_sets_fast(sira_max: int, comps: List[str], per_sira: Dict[str, int],
+                  ratios: Dict[str, int], deadline: Optional[float] = None
+                  ) -> Tuple[int, Dict[str, int], bool]:
+    # Binary search on the set count T.
+    # T sets are feasible iff sum(ceil(T * ratio_i / per_sira_i)) <= sira_max.
+    # Feasibility is monotonic in T, so O(N log(S * per_sira_box)).
+    # Always optimal; the deadline is accepted for interface parity.
+    def min_rows(target):
+        rows = []
+        for name in comps:
+            r = _rows_for(target * ratios.get(name, 1), per_sira[name])
+            if r is None:
+                return None
+            rows.append(r)
+        return rows
+
+    def feasible(target):
+        count_partitions(1)
+        rows = min_rows(target)
+        return rows is not None and sum(rows) <= sira_max
+
+    lo, hi = 0, sira_max * per_sira['Box']
+
+    # Bracket: with W = sum(ratio_i / per_sira_i), T * W <= S is necessary
+    # and T * W <= S - N is sufficient (each ceil adds < 1 row).
+    if all(per_sira[name] > 0 for name in comps):
+        weight = sum(ratios.get(name, 1) / per_sira[name] for name in comps)
+        hi = min(hi, int(sira_max / weight) + 1)
+        guess = max(0, int((sira_max - len(comps)) / weight) - 1)
+        if feasible(guess):
+            lo = guess
+
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if feasible(mid):
+            lo = mid
+        else:
+            hi = mid - 1
+
+    return lo, plan_for_sets(lo, sira_max, comps, per_sira, ratios), True
+
+
+def plan_for_sets(target: int, sira_max: int, comps: List[str], per_sira: Dict[str, int],
+                  ratios: Dict[str, int]) -> Dict[str, int]:
+    # Same plan the enumerator keeps: the lexicographically first partition
+    # reaching the optimum -> minimum rows everywhere, remainder to the last.
+    # target must be feasible (e.g. the optimum of max_sets_fast).
+    rows = [_rows_for(target * ratios.get(name, 1), per_sira[name]) for name in comps]
+    rows[-1] += sira_max - sum(rows)
+    return {name: rows[i] for i, name in enumerate(comps)}
+
+
+MAX_SETS_SOLVERS = {
+    "fast": max_sets_fast,
+    "exhaustive": max_sets_exhaustive,
+}
+
+
+# --- Order: Minimum Blocks (Checklist 8) ---
+# Spec 7: the same plan is scaled to K blocks, so plan p needs
+# K >= ceil(req_i / (p_i * per_sira_i)) for every component.
+# Ties on K are broken by total excess (K * produced - required).
+
+def _excess(blocks: int, rows: List[int], comps: List[str], per_sira: Dict[str, int],
+            required: Dict[str, int]) -> int:
+    return sum(blocks * rows[i] * per_sira[name] - required.get(name, 0)
+               for i, name in enumerate(comps))
+
+
+def min_blocks_exhaustive(sira_max: int, comps: List[str], per_sira: Dict[str, int],
+                          required: Dict[str, int], deadline: Optional[float] = None,
+                          min_blocks: int = 1
+                          ) -> Tuple[Optional[int], Optional[Dict[str, int]], bool]:
+    # Reference strategy: enumerate every composition of sira_max rows.
+    # Past the deadline the best plan so far is returned with optimal=False.
+    # min_blocks (a lower bound hint) is not needed by the enumeration.
+    best_key = None
+    best_plan_rows = None
+    optimal = True
+
+    explored = 0
+    for explored, p in enumerate(partitions(sira_max, len(comps)), 1):
+        if _expired(deadline, explored):
+            optimal = False
+            break
+
+        k_needed = 0
+        for i, name in enumerate(comps):
+            req_amt = required.get(name, 0)
+            if req_amt > 0:
+                prod = p[i] * per_sira[name]
+                if prod == 0:
+                    k_needed = None  # Impossible plan
+                    break
+                k_needed = max(k_needed, math.ceil(req_amt / prod))
+        if not k_needed:
+            continue
+
+        key = (k_needed, _excess(k_needed, p, comps, per_sira, required))
+        if best_key is None or key < best_key:
+            best_key = key
+            best_plan_rows = {name: p[i] for i, name in enumerate(comps)}
+
+    count_partitions(explored)
+    if best_key is None:
+        return None, None, optimal
+    return best_key[0], best_plan_rows, optimal
+
+
+def min_blocks_fast(sira_max: int, comps: List[str], per_sira: Dict[str, int],
+                    required: Dict[str, int], deadline: Optional[float] = None,
+                    min_blocks: int = 1
+                    ) -> Tuple[Optional[int], Optional[Dict[str, int]], bool]:
+    # Search over the block count K.
+    # K is feasible iff sum(ceil(req_i / (K * per_sira_i))) <= sira_max.
+    # Always optimal; the deadline is accepted for interface parity.
+    # min_blocks: known lower bound on K (e.g. K of a smaller order quantity).
+    def min_rows(blocks):
+        rows = []
+        for name in comps:
+            r = _rows_for(required.get(name, 0), blocks * per_sira[name])
+            if r is None:
+                return None
+            rows.append(r)
+        return rows
+
+    def feasible(blocks):
+        count_partitions(1)
+        rows = min_rows(blocks)
+        return rows is not None and sum(rows) <= sira_max
+
+    # Upper bound: one row per component -> K = max(ceil(req_i / per_sira_i))
+    single_rows = min_rows(1)
+    if single_rows is None:
+        return None, None, True
+    hi = max(single_rows)
+    if hi == 0 or not feasible(hi):
+        return None, None, True
+
+    if min_blocks > 1:
+        # Gallop upward from the known lower bound (price sheets walk
+        # increasing quantities, so the answer is usually at or near it).
+        lo = min(min_blocks, hi)
+        step = 1
+        while not feasible(lo):
+            probe = min(lo + step, hi)
+            if feasible(probe):
+                lo, hi = lo + 1, probe
+                break
+            lo = probe + 1
+            step *= 2
+        else:
+            hi = lo
+    else:
+        # Bracket: with V = sum(req_i / per_sira_i), K >= V / S is necessary
+        # and K >= V / (S - N) is sufficient (each ceil adds < 1 row).
+        row_blocks = sum(required.get(name, 0) / per_sira[name] for name in comps if per_sira[name] > 0)
+        lo = max(1, int(row_blocks / sira_max) - 1)
+        needed = sum(1 for r in single_rows if r > 0)
+        if sira_max > needed:
+            guess = int(row_blocks / (sira_max - needed)) + 2
+            if guess < hi and feasible(guess):
+                hi = guess
+
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if feasible(mid):
+            hi = mid
+        else:
+            lo = mid + 1
+
+    # Minimum excess for K: every spare row costs K * per_sira_i extra pieces,
+    # so spare rows go to the lowest per_sira component (last one on ties,
+    # matching the enumerator's lexicographic order).
+    rows = min_rows(lo)
+    spare = sira_max - sum(rows)
+    if spare:
+        target = min(range(len(comps)), key=lambda i: (per_sira[comps[i]], -i))
+        rows[target] += spare
+    return lo, {name: rows[i] for i, name in enumerate(comps)}, True
+
+
+MIN_BLOCKS_SOLVERS = {
+    "fast": min_blocks_fast,
+    "exhaustive": min_blocks_exhaustive,
+}
+
+
+# --- Order: Mixed Blocks (main plan x (B-1) + one tail plan) ---
+# Spec 7 repeats one plan K times, so a ratio that does not divide evenly
+# leaves a mostly wasted last block. Here B-1 blocks share a main plan p and
+# one tail block gets its own plan q.
+#
+# With T_i = total rows of component i (sum T = B * S, T_i >= R_i, the minimum
+# rows for the order), p and q exist iff sum(T_i mod (B-1)) <= S: take
+# p_i = floor(T_i / (B-1)), the remainders go to the tail, and surplus main
+# rows move to the tail B-1 at a time. Feasibility is monotone in B (one more
+# main block never hurts), so a binary search between ceil(sum R / S) and the
+# uniform K finds the smallest B; at that B the spare rows either round a
+# component up to a multiple of B-1 or go to the cheapest component, and the
+# cheapest feasible choice (fewest excess pieces) wins. The uniform plan stays a
+# candidate at K, so the result is never worse than min_blocks_*.
+
+def _split_rows(totals: List[int], main_blocks: int, sira_max: int) -> Tuple[List[int], List[int]]:
+    # totals -> (main plan, tail plan) with main * main_blocks + tail == totals
+    main = [t // main_blocks for t in totals]
+    surplus = sum(main) - sira_max
+    for i in range(len(main) - 1, -1, -1):
+        take = min(surplus, main[i])
+        main[i] -= take
+        surplus -= take
+    tail = [t - main_blocks * p for t, p in zip(totals, main)]
+    return main, tail
+
+
+def _mixed_feasible(blocks: int, sira_max: int, min_rows: List[int]) -> bool:
+    # Do plans p, q (S rows each) with (blocks - 1) * p_i + q_i >= R_i exist?
+    # A main row of component i covers min(B-1, what is left of R_i): whole
+    # multiples first, then the largest remainders; the tail takes the rest.
+    count_partitions(1)
+    m = blocks - 1
+    total = sum(min_rows)
+    if m == 0:
+        return total <= sira_max
+    whole = sum(r // m for r in min_rows)
+    if whole >= sira_max:
+        covered = m * sira_max
+    else:
+        rest = sorted((r % m for r in min_rows), reverse=True)
+        covered = m * whole + sum(rest[:sira_max - whole])
+    return total - covered <= sira_max
+
+
+class _Expired(Exception):
+    # The deadline passed inside _mixed_totals
+    pass
+
+
+def _mixed_totals(blocks: int, sira_max: int, min_rows: List[int], costs: List[int],
+                  deadline: Optional[float] = None) -> Optional[Tuple[int, List[int]]]:
+    # Cheapest row totals (extra pieces, totals) splittable over `blocks`, or None.
+    # A set U of components is rounded up to a multiple of m = B-1 (up_i rows
+    # each) and the leftover L goes to one component j. Components outside U
+    # keep r_i = R_i mod m tail rows, j ends with L mod m more, so U is valid
+    # iff sum(up_U) <= spare and k + L mod m <= S with k = sum(r_i, i not in U);
+    # that does not depend on j (a j outside U is the same split as U + {j}),
+    # so L goes to the cheapest component. A knapsack over (|U|, k), k <= S,
+    # finds the cheapest U in O(N^2 S) instead of trying all 2^N sets.
+    m = blocks - 1
+    spare = blocks * sira_max - sum(min_rows)
+    if spare < 0:
+        return None
+    cheapest = min(range(len(min_rows)), key=lambda i: (costs[i], -i))
+    if m == 0:
+        count_partitions(1)
+        totals = list(min_rows)
+        totals[cheapest] += spare
+        return spare * costs[cheapest], totals
+
+    candidates = [i for i, r in enumerate(min_rows) if r % m]
+    width = min(sira_max, sum(min_rows[i] % m for i in candidates)) + 1
+    inf = float("inf")
+    # table[t][c][k]: cheapest sum(up_i * c_i) over U within the first t
+    # candidates, |U| = c, k tail rows kept
+    table = [[[0] + [inf] * (width - 1)]]
+    for i in candidates:
+        if deadline is not None and time.monotonic() > deadline:
+            raise _Expired()
+        r, cost = min_rows[i] % m, (m - min_rows[i] % m) * costs[i]
+        last = table[-1]
+        rows = []
+        for c in range(len(last) + 1):
+            keep = [inf] * r + last[c][:width - r] if c < len(last) else [inf] * width
+            if c == 0:
+                rows.append(keep)
+            else:
+                rows.append([min(a, b + cost) for a, b in zip(keep, last[c - 1])])
+        table.append(rows)
+
+    kept_total = sum(min_rows[i] % m for i in candidates)
+    final = table[-1]
+    count_partitions(len(final) * width)
+    best = None
+    for c, row in enumerate(final):
+        for k, value in enumerate(row):
+            if value == inf:
+                continue
+            left = spare - (c * m - (kept_total - k))
+            if left < 0 or k + left % m > sira_max:
+                continue
+            extra = value + left * costs[cheapest]
+            if best is None or extra < best[0]:
+                best = (extra, c, k)
+    if best is None:
+        return None
+
+    extra, c, k = best
+    totals = list(min_rows)
+    totals[cheapest] += spare - (c * m - (kept_total - k))
+    for t in range(len(candidates), 0, -1):
+        i = candidates[t - 1]
+        r = min_rows[i] % m
+        prev = table[t - 1]
+        if k >= r and c < len(prev) and prev[c][k - r] == table[t][c][k]:
+            k -= r
+        else:
+            totals[i] += m - r
+            c -= 1
+    return extra, totals
+
+
+def min_blocks_mixed(sira_max: int, comps: List[str], per_sira: Dict[str, int],
+                     required: Dict[str, int], uniform_blocks: int, uniform_rows: Dict[str, int],
+                     deadline: Optional[float] = None
+                     ) -> Tuple[int, List[Tuple[int, Dict[str, int]]], bool]:
+    # Returns (blocks, [(block count, rows per component), ...], optimal).
+    # uniform_blocks / uniform_rows: result of a min_blocks_* solver (upper bound).
+    min_rows = [_rows_for(required.get(name, 0), per_sira[name]) or 0 for name in comps]
+    costs = [per_sira[name] for name in comps]
+    uniform = [(uniform_blocks, uniform_rows)]
+    uniform_extra = sum((uniform_blocks * uniform_rows[name] - r) * c
+                        for name, r, c in zip(comps, min_rows, costs))
+
+    lo = max(1, -(-sum(min_rows) // sira_max))
+    hi = uniform_blocks
+    while lo < hi:
+        if deadline is not None and time.monotonic() > deadline:
+            return uniform_blocks, uniform, False
+        mid = (lo + hi) // 2
+        if _mixed_feasible(mid, sira_max, min_rows):
+            hi = mid
+        else:
+            lo = mid + 1
+
+    blocks = lo
+    while blocks <= uniform_blocks:
+        if deadline is not None and time.monotonic() > deadline:
+            return uniform_blocks, uniform, False
+        try:
+            found = _mixed_totals(blocks, sira_max, min_rows, costs, deadline)
+        except _Expired:
+            return uniform_blocks, uniform, False
+        if found is not None:
+            extra, totals = found
+            if blocks == uniform_blocks and extra >= uniform_extra:
+                break
+            if blocks == 1:
+                return 1, [(1, dict(zip(comps, totals)))], True
+            main, tail = _split_rows(totals, blocks - 1, sira_max)
+            plans = [(blocks - 1, dict(zip(comps, main)))]
+            if tail == main:
+                plans = [(blocks, plans[0][1])]
+            else:
+                plans.append((1, dict(zip(comps, tail))))
+            return blocks, plans, True
+        blocks += 1
+    return uniform_blocks, uniform, True
@@ -0,0 +1,84 @@
+import os
+import json
+from typing import List, Optional, Tuple
+from .models import PricingConfig, BlockType, DEFAULT_BLOCK
+
+# Pricing Engine (Checklist 10)
+# - USD Kuru
+# - Kur Risk Payı (%30)
+# - Ticari Çarpan (%20)
+# - Blok Fiyatı (Ham vs Karlı?)
+# - KDV (%20)
+#
+# Settings come from a PricingConfig (JSON file, see load_pricing_config).
+# The vectorized repricer (vectorized.reprice) follows the same operation
+# order, so bulk and single quotes agree to the last bit.
+
+
+def load_pricing_config(path: Optional[str] = None) -> PricingConfig:
+    # SFT_PRICING_CONFIG: path to a JSON file with PricingConfig fields
+    path = path or os.environ.get("SFT_PRICING_CONFIG")
+    if not path:
+        return PricingConfig()
+    with open(path, encoding="utf-8") as f:
+        return PricingConfig.model_validate_json(f.read())
+
+
+def load_block_catalogue(path: Optional[str] = None) -> List[BlockType]:
+    # SFT_BLOCK_CATALOGUE: path to a JSON list of BlockType objects
+    path = path or os.environ.get("SFT_BLOCK_CATALOGUE")
+    if not path:
+        return [DEFAULT_BLOCK]
+    with open(path, encoding="utf-8") as f:
+        blocks = [BlockType.model_validate(b) for b in json.load(f)]
+    if not blocks:
+        raise ValueError(f"{path}: empty block catalogue")
+    return blocks
+
+
+def block_pricing(config: PricingConfig, block: BlockType) -> PricingConfig:
+    # Pricing settings for a block type (its own block cost, if any)
+    if block.block_usd is None:
+        return config
+    return config.model_copy(update={'base_block_usd': block.block_usd})
+
+
+def price_totals(config: PricingConfig, blocks_needed: int, total_pieces: int,
+                 divider: int, dns: Optional[int]) -> Tuple[float, float]:
+    # Returns (unit_price, total_price) incl. VAT, unrounded.
+
+    # Block Base Price
+    # Checklist 11: Adet Aralığı Fiyatı Logic can be added here
+    base_block_usd = config.base_block_usd
+    if dns:
+        base_block_usd += (dns - config.dns_base) * config.dns_step_usd
+
+    block_cost_tl = base_block_usd * config.usd_rate
+
+    # Apply Multipliers
+    # Base -> Risk -> Trade
+    # Price = Cost * 1.30 * 1.20
+    sell_price_block = block_cost_tl * config.risk_margin * config.trade_margin
+
+    # Processing Cost (Kesim İşçiliği)
+    # Checklist 12: İşlem Tipi Fiyatı
+    # Assuming Standard Cut
+    proc_cost_total = total_pieces * config.processing_fee
+
+    # Total Excl VAT
+    total_price_ex_vat = (blocks_needed * sell_price_block) + proc_cost_total
+
+    # Shipping (Checklist 10)
+    total_price_ex_vat += config.shipping
+
+    # VAT
+    total_price_inc_vat = total_price_ex_vat * config.vat_rate
+
+    # Unit Price
+    if divider == 0: divider = 1
+    return total_price_inc_vat / divider, total_price_inc_vat
+
+
+def unit_divider(req_boxes: Optional[int], total_produced) -> int:
+    # Unit price is per ordered box, or per produced box without an order
+    return req_boxes if req_boxes else total_produced.get('Box', 1)
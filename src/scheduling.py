@@ -0,0 +1,196 @@
+import heapq
+from bisect import bisect_right
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+from .models import (
+    EPSOutput, ScheduleInput, ScheduleOutput, MachineSchedule, ScheduledBlock
+)
+
+# CNC Scheduling (hot-wire machines)
+# Machine time of a block is estimated from its plan:
+#   xy_cuts = table grid lines (columns + rows of the 2D layout)
+#   z_cuts  = one slice per item in every row, sum(sira_plan * per_sira)
+#   time    = (setup_s + xy_cuts * xy_cut_s + z_cuts * z_cut_s) / machine speed
+# Blocks are independent jobs on related machines (speed factors).
+#   objective "makespan": LPT list scheduling (longest block first on the
+#                         machine that finishes it earliest)
+#   objective "lateness": EDD list scheduling (earliest due job first)
+# followed by an improvement pass that relocates blocks off the critical
+# machine while the objective improves.
+
+IMPROVE_ROUNDS = 500
+IMPROVE_BUDGET = 0.25  # seconds
+
+Block = Tuple[int, int, float, float]  # (job index, block no, work seconds, due)
+
+
+def block_cuts(output: EPSOutput) -> List[Tuple[int, int, int]]:
+    # (blocks, xy_cuts, z_cuts) per distinct block plan of a computed quote
+    details = output.details
+    layout = details.layout_2d
+    if layout.placements:
+        xy = len({p[0] for p in layout.placements}) + len({p[1] for p in layout.placements})
+    else:
+        T1, T2 = layout.table_axes
+        x, y = details.cut_dims_cm.footprint
+        if layout.rotation == "Rotated":
+            x, y = y, x
+        xy = math.floor(T1 / x) + math.floor(T2 / y) if layout.sira_adedi else 0
+
+    per_sira = details.per_sira
+    if output.block_plans:
+        plans = [(p.blocks, p.sira_plan) for p in output.block_plans]
+    else:
+        plans = [(output.blocks_needed, details.sira_plan)]
+    return [(n, xy, sum(rows * per_sira.get(name, 0) for name, rows in sira_plan.items()))
+            for n, sira_plan in plans]
+
+
+def _blocks(req: ScheduleInput) -> List[Block]:
+    blocks = []
+    for j, job in enumerate(req.jobs):
+        due = job.due_s if job.due_s is not None else math.inf
+        no = 0
+        for n, xy, z in block_cuts(job.plan):
+            work = req.setup_s + xy * req.xy_cut_s + z * req.z_cut_s
+            for _ in range(n):
+                no += 1
+                blocks.append((j, no, work, due))
+    return blocks
+
+
+def _list_schedule(blocks: List[Block], speeds: List[float]) -> List[List[Block]]:
+    # Greedy: each block (in the given order) goes to the machine that
+    # finishes it earliest. Equal speeds -> a heap of machine loads.
+    queues: List[List[Block]] = [[] for _ in speeds]
+    if len(set(speeds)) == 1:
+        heap = [(0.0, m) for m in range(len(speeds))]
+        for b in blocks:
+            load, m = heapq.heappop(heap)
+            queues[m].append(b)
+            heapq.heappush(heap, (load + b[2] / speeds[m], m))
+        return queues
+    loads = [0.0] * len(speeds)
+    for b in blocks:
+        m = min(range(len(speeds)), key=lambda i: (loads[i] + b[2] / speeds[i], i))
+        queues[m].append(b)
+        loads[m] += b[2] / speeds[m]
+    return queues
+
+
+def _finish(queue: List[Block], speed: float) -> float:
+    return sum(b[2] for b in queue) / speed
+
+
+def _profile(queue: List[Block], speed: float):
+    # Per position: due dates, prefix max and suffix max of lateness (end - due)
+    dues = [b[3] for b in queue]
+    late = []
+    t = 0.0
+    for b in queue:
+        t += b[2] / speed
+        late.append(t - b[3])
+    prefix = [-math.inf]
+    for v in late:
+        prefix.append(max(prefix[-1], v))
+    suffix = [-math.inf]
+    for v in reversed(late):
+        suffix.append(max(suffix[-1], v))
+    suffix.reverse()
+    ends = [0.0]
+    for b in queue:
+        ends.append(ends[-1] + b[2] / speed)
+    # prefix[i] / suffix[i]: max over positions < i / >= i; ends[i]: end of first i
+    return dues, prefix, suffix, ends
+
+
+def _improve(queues: List[List[Block]], speeds: List[float], lateness: bool) -> None:
+    # Relocate one block from the critical machine to another machine (kept
+    # in EDD position for lateness) whenever that lowers the critical score:
+    # makespan, or (max lateness, finish time) for the lateness objective.
+    end = time.monotonic() + IMPROVE_BUDGET
+    for _ in range(IMPROVE_ROUNDS):
+        if time.monotonic() > end:
+            return
+        if lateness:
+            profiles = [_profile(q, s) for q, s in zip(queues, speeds)]
+            scores = [(p[1][-1], p[3][-1]) for p in profiles]
+        else:
+            scores = [(_finish(q, s),) for q, s in zip(queues, speeds)]
+        crit = max(range(len(queues)), key=lambda m: scores[m])
+        best = None
+        tried = set()
+        for pos, b in enumerate(queues[crit]):
+            if (b[2], b[3]) in tried:
+                continue  # identical blocks of one job behave the same
+            tried.add((b[2], b[3]))
+            if lateness:
+                _, prefix, suffix, ends = profiles[crit]
+                rest_score = (max(prefix[pos], suffix[pos + 1] - b[2] / speeds[crit]),
+                              ends[-1] - b[2] / speeds[crit])
+            else:
+                rest_score = (scores[crit][0] - b[2] / speeds[crit],)
+            for m in range(len(queues)):
+                if m == crit:
+                    continue
+                work = b[2] / speeds[m]
+                if lateness:
+                    dues, prefix, suffix, ends = profiles[m]
+                    i = bisect_right(dues, b[3])  # EDD position
+                    moved_score = (max(prefix[i], ends[i] + work - b[3], suffix[i] + work),
+                                   ends[-1] + work)
+                else:
+                    moved_score = (scores[m][0] + work,)
+                new = max(rest_score, moved_score)
+                if new < scores[crit] and (best is None or new < best[0]):
+                    best = (new, pos, m)
+        if best is None:
+            return
+        _, pos, m = best
+        b = queues[crit].pop(pos)
+        if lateness:
+            queues[m].insert(bisect_right([x[3] for x in queues[m]], b[3]), b)
+        else:
+            queues[m].append(b)
+
+
+def schedule(req: ScheduleInput) -> ScheduleOutput:
+    speeds = [m.speed for m in req.machines]
+    lateness = req.objective == "lateness"
+    blocks = _blocks(req)
+    if lateness:
+        blocks.sort(key=lambda b: (b[3], -b[2], b[0], b[1]))  # EDD
+    else:
+        blocks.sort(key=lambda b: (-b[2], b[0], b[1]))        # LPT
+    queues = _list_schedule(blocks, speeds)
+    _improve(queues, speeds, lateness)
+
+    machines = []
+    completion: Dict[int, float] = {}
+    for machine, queue in zip(req.machines, queues):
+        t = 0.0
+        out = []
+        for j, no, work, _ in queue:
+            start, t = t, t + work / machine.speed
+            out.append(ScheduledBlock(job_id=req.jobs[j].job_id, block=no,
+                                      start_s=round(start, 3), end_s=round(t, 3)))
+            completion[j] = max(completion.get(j, 0.0), t)
+        machines.append(MachineSchedule(machine=machine.name, busy_s=round(t, 3), blocks=out))
+
+    late = []
+    max_lateness: Optional[float] = None
+    for j, job in enumerate(req.jobs):
+        if job.due_s is None or j not in completion:
+            continue
+        lat = completion[j] - job.due_s
+        max_lateness = lat if max_lateness is None else max(max_lateness, lat)
+        if lat > 0:
+            late.append(job.job_id)
+
+    return ScheduleOutput(
+        makespan_s=round(max((m.busy_s for m in machines), default=0.0), 3),
+        max_lateness_s=round(max_lateness, 3) if max_lateness is not None else None,
+        late_jobs=late,
+        machines=machines,
+    )
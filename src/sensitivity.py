@@ -0,0 +1,153 @@
+import heapq
+import math
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .logic import EPSLogic, TOLERANCE_XY, TOLERANCE_Z, axis_configs
+from .models import (
+    EPSInput, DimensionSensitivity, LeanOutput, SensitivityInput, SensitivityOutput, YieldCliff
+)
+
+# Yield-Cliff Sensitivity
+# With the grid layout every quantity the quote depends on is a floor of a
+# block constant over a cut size:
+#   en, boy (cut_x / cut_y = d + TOLERANCE_XY): floor(T / cut) for every
+#       table axis T of every axis config, plus the rule_limit switch
+#       (cut >= 44 enables the configs with 202 on the table)
+#   yukseklik, part thickness (cut_h = d + TOLERANCE_Z): floor(h_eff / cut_h)
+# floor(A / c) only changes where c crosses A / k, so between two such
+# breakpoints axis selection, rows, per_sira, the plan and the price are all
+# constant. For each dimension the breakpoints are generated analytically in
+# order of distance (both directions, snapped to the step grid and checked
+# with the engine's own float arithmetic) and the engine is evaluated only
+# there, stopping at the first one that changes blocks_needed or the
+# per-block yield. With guillotine packing the layout has further
+# breakpoints between these, so results are reported as not exact.
+
+GRID_DIGITS = 6  # rounding of grid values (step multiples)
+
+
+def _grid(i: int, step: float) -> float:
+    return round(i * step, GRID_DIGITS)
+
+
+def _floor_crossings(A: float, d0: float, tol: float, step: float, up: bool) -> Iterator[float]:
+    # Grid values of d where floor(A / (d + tol)) changes, moving away from d0
+    k = math.floor(A / (d0 + tol))
+    count = lambda d: math.floor(A / (d + tol))
+    if up:
+        kk = k
+        while kk > 0:
+            # smallest d with count(d) < kk
+            i = max(1, math.floor((A / kk - tol) / step))
+            while count(_grid(i, step)) >= kk:
+                i += 1
+            while _grid(i - 1, step) > d0 and count(_grid(i - 1, step)) < kk:
+                i -= 1
+            yield _grid(i, step)
+            kk = count(_grid(i, step))
+    else:
+        kk = k + 1
+        while True:
+            # largest d with count(d) >= kk
+            i = math.floor((A / kk - tol) / step)
+            while i > 0 and count(_grid(i, step)) < kk:
+                i -= 1
+            while _grid(i + 1, step) < d0 and count(_grid(i + 1, step)) >= kk:
+                i += 1
+            if i <= 0:
+                return
+            yield _grid(i, step)
+            kk = max(kk + 1, count(_grid(i, step)) + 1)
+
+
+def _limit_crossing(L: float, d0: float, tol: float, step: float, up: bool) -> Iterator[float]:
+    # Grid value of d where (d + tol >= L) flips, if it lies in the direction
+    if up and d0 + tol < L:
+        i = math.floor((L - tol) / step)
+        while _grid(i, step) + tol < L:
+            i += 1
+        yield _grid(i, step)
+    elif not up and d0 + tol >= L:
+        i = math.ceil((L - tol) / step)
+        while _grid(i, step) + tol >= L:
+            i -= 1
+        if i > 0:
+            yield _grid(i, step)
+
+
+def _constants(engine: EPSLogic) -> Tuple[List[float], List[float], List[float]]:
+    # (table axes, h_eff values, rule limits) over the block catalogue
+    configs = [cfg for block in engine.blocks for cfg in axis_configs(block)]
+    tables = sorted({float(v) for cfg in configs for v in cfg['table']})
+    heights = sorted({float(cfg['h_eff']) for cfg in configs})
+    limits = sorted({float(block.rule_limit) for block in engine.blocks})
+    return tables, heights, limits
+
+
+def _outcome(result: Dict):
+    return (result['blocks_needed'], result['per_block'], result['total_produced'])
+
+
+def _cliff(engine: EPSLogic, apply: Callable[[float], EPSInput], d0: float, base,
+           candidates: Iterator[float], max_change: float) -> Tuple[Optional[YieldCliff], int]:
+    # First candidate whose quote differs from the base -> (cliff, evaluations)
+    evaluated = 0
+    last = None
+    for d in candidates:
+        if abs(d - d0) > max_change + 1e-9:
+            break
+        if d == last or d == d0:
+            continue
+        last = d
+        evaluated += 1
+        result = engine.calculate_lean(apply(d))
+        if _outcome(result) != base:
+            return YieldCliff(value=d, change_cm=round(d - d0, GRID_DIGITS), **result), evaluated
+    return None, evaluated
+
+
+def _dimension(engine: EPSLogic, name: str, d0: float, tol: float, constants: List[float],
+               limits: List[float], apply: Callable[[float], EPSInput], base,
+               req: SensitivityInput) -> DimensionSensitivity:
+    out = {}
+    evaluated = 0
+    for direction, up in (("decrease", False), ("increase", True)):
+        gens = [_floor_crossings(A, d0, tol, req.step_cm, up) for A in constants]
+        gens += [_limit_crossing(L, d0, tol, req.step_cm, up) for L in limits]
+        merged = heapq.merge(*gens) if up else heapq.merge(*gens, key=lambda v: -v)
+        out[direction], n = _cliff(engine, apply, d0, base, merged, req.max_change_cm)
+        evaluated += n
+    return DimensionSensitivity(dimension=name, value=d0, evaluated=evaluated, **out)
+
+
+def sensitivity(engine: EPSLogic, req: SensitivityInput) -> SensitivityOutput:
+    data = req.product
+    base_result = engine.calculate_lean(data)
+    base = _outcome(base_result)
+    tables, heights, limits = _constants(engine)
+
+    dims = []
+    for field in ("en", "boy", "yukseklik"):
+        if req.dimensions and field not in req.dimensions:
+            continue
+        xy = field != "yukseklik"
+        dims.append(_dimension(
+            engine, field, getattr(data, field), TOLERANCE_XY if xy else TOLERANCE_Z,
+            tables if xy else heights, limits if xy else [],
+            lambda d, f=field: data.model_copy(update={f: d}), base, req,
+        ))
+    for i, part in enumerate(data.extra_parts):
+        name = f"part:{part.name}"
+        if req.dimensions and name not in req.dimensions:
+            continue
+
+        def apply(d, i=i):
+            parts = list(data.extra_parts)
+            parts[i] = parts[i].model_copy(update={'thickness_cm': d})
+            return data.model_copy(update={'extra_parts': parts})
+
+        dims.append(_dimension(engine, name, part.thickness_cm, TOLERANCE_Z, heights, [],
+                               apply, base, req))
+
+    return SensitivityOutput(base=LeanOutput(**base_result), exact=engine.packing == "grid",
+                             dimensions=dims)
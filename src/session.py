@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .cache import LRUCache
+from .logic import EPSLogic
+from .metrics import profiled
+from .models import EPSInput, EPSOutput
+
+# Incremental Recompute Sessions (interactive form)
+# The UI posts the full EPSInput on every edit to
+#   POST /session/{session_id}/calculate?seq=<edit counter>
+# and the session keeps the last input with its geometry, plan and output.
+# Only the stages behind the changed fields are re-run:
+#   boy, en, yukseklik, extra_parts -> geometry, planning, pricing, report
+#   req_boxes, multi_block          -> planning, pricing, report
+#   dns                             -> pricing, report
+#   wall_thickness, start_time_unix -> nothing (not read by the engine)
+# With a block catalogue of several types geometry, plan and price decide
+# the block together, so any engine field re-runs select_block. A stage cut
+# short by the time budget (optimal=False) is never reused.
+#
+# Edits of one session run one at a time, newest wins: an edit that is
+# still waiting when a newer one arrives never starts (Superseded, HTTP
+# 409, which the client ignores). A running edit is bounded by the planning
+# time budget; on a local thread it also stops at the next stage boundary.
+#
+# Sessions live in the API process, an LRU of at most `max_sessions`. The
+# recompute itself is stateless: the last edit's (data, geometry, plan,
+# output) goes in and the new one comes out, so main.py runs it in the
+# calculation pool like every other quote.
+
+GEOMETRY_FIELDS = frozenset({"boy", "en", "yukseklik", "extra_parts"})
+PLAN_FIELDS = frozenset({"req_boxes", "multi_block"})
+PRICE_FIELDS = frozenset({"dns"})
+ENGINE_FIELDS = GEOMETRY_FIELDS | PLAN_FIELDS | PRICE_FIELDS
+
+
+class Superseded(Exception):
+    # A newer edit of the same session made this one obsolete
+    pass
+
+
+# Stage results of the last edit: (data, geometry, plan, output)
+State = Tuple[EPSInput, Dict, Dict, EPSOutput]
+
+
+class Session:
+    __slots__ = ("lock", "latest", "state")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.latest = 0  # newest edit counter seen
+        self.state: Optional[State] = None
+
+
+def changed_fields(old: Optional[EPSInput], new: EPSInput) -> frozenset:
+    if old is None:
+        return frozenset(EPSInput.model_fields)
+    return frozenset(f for f in EPSInput.model_fields if getattr(old, f) != getattr(new, f))
+
+
+def recompute(engine: EPSLogic, state: Optional[State], data: EPSInput,
+              time_budget: Optional[float] = None, stale: Optional[Callable[[], bool]] = None
+              ) -> Tuple[State, List[str]]:
+    # Stage results for `data` reusing what the last edit left valid
+    # -> (new state, stages re-run)
+    deadline = time.monotonic() + time_budget if time_budget else None
+    if state is None:
+        changed = changed_fields(None, data)
+        geometry = plan = output = None
+    else:
+        changed = changed_fields(state[0], data)
+        geometry, plan, output = state[1:]
+    stages = []
+
+    def check():
+        if stale is not None and stale():
+            raise Superseded()
+
+    if output is None or (len(engine.blocks) > 1 and changed & ENGINE_FIELDS):
+        geometry, plan = engine.select_block(data, deadline=deadline)
+        stages += ["geometry", "planning"]
+    elif changed & GEOMETRY_FIELDS or not geometry['complete']:
+        geometry = engine.geometry(data, deadline=deadline)
+        check()
+        plan = engine.plan(data, geometry, deadline=deadline)
+        stages += ["geometry", "planning"]
+    elif changed & PLAN_FIELDS or not plan['optimal']:
+        plan = engine.plan(data, geometry, deadline=deadline)
+        stages.append("planning")
+
+    if stages or changed & PRICE_FIELDS:
+        check()
+        output = engine.build_output(data, geometry, plan)
+        stages += ["pricing", "report"]
+    return (data, geometry, plan, output), stages
+
+
+Offload = Callable[[Optional[State], EPSInput, Optional[float]],
+                  Awaitable[Tuple[Tuple[State, List[str]], Dict]]]
+
+
+class SessionStore:
+    # offload(state, data, time_budget) -> ((state, stages), timings) runs
+    # recompute elsewhere (main.py: the calculation pool); without it edits
+    # run on a thread of this process.
+    def __init__(self, engine: EPSLogic, max_sessions: int = 1024,
+                 offload: Optional[Offload] = None):
+        self.engine = engine
+        self.offload = offload
+        self._sessions = LRUCache(max_sessions)
+        self._lock = threading.Lock()
+        self.counts = {"edits": 0, "superseded": 0, "unchanged": 0,
+                       "geometry": 0, "planning": 0, "pricing": 0}
+
+    def _session(self, session_id: str) -> Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = Session()
+            self._sessions.put(session_id, session)
+        return session
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    async def calculate(self, session_id: str, data: EPSInput, seq: Optional[int] = None,
+                        time_budget: Optional[float] = None) -> Tuple[EPSOutput, List[str], Dict]:
+        # -> (output, stages re-run, stage timings). seq: the client's edit
+        # counter (edits may arrive out of order over several connections);
+        # without it the arrival order counts. Raises Superseded for
+        # obsolete edits.
+        session = self._session(session_id)
+        self._count("edits")
+        seq = session.latest + 1 if seq is None else seq
+        if seq <= session.latest:
+            self._count("superseded")
+            raise Superseded()
+        session.latest = seq
+        stale = lambda: session.latest != seq
+
+        async with session.lock:
+            if stale():
+                self._count("superseded")
+                raise Superseded()
+            try:
+                if self.offload is not None:
+                    result, timings = await self.offload(session.state, data, time_budget)
+                else:
+                    loop = asyncio.get_running_loop()
+                    result, timings = await loop.run_in_executor(
+                        None, profiled, recompute, self.engine, session.state, data,
+                        time_budget, stale)
+            except Superseded:
+                self._count("superseded")
+                raise
+            # Stored on the event loop: a cancelled request never writes back
+            session.state, stages = result
+            output = session.state[3]
+        if not stages:
+            self._count("unchanged")
+        for name in ("geometry", "planning", "pricing"):
+            if name in stages:
+                self._count(name)
+        return output, stages, timings
+
+    def drop(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id) is not None
+
+    def info(self) -> Dict:
+        with self._lock:
+            counts = dict(self.counts)
+        return dict(counts, sessions=self._sessions.info()["size"])
@@ -0,0 +1,189 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from .logic import EPSLogic
+from .models import BlockType, EPSInput, EPSOutput, PricingConfig, canonical_hash
+from .pricing import load_block_catalogue
+
+# Shadow Verification (fast solvers vs. the exhaustive reference)
+# A sampled fraction of live /calculate requests is re-run in one background
+# process (SCHED_IDLE / nice 19) with strategy="exhaustive", the original
+# partitions() enumeration, capped at `budget` seconds. blocks_needed,
+# per_block and sira_plan are compared with the answer the client got.
+#
+# The request path only flips a coin and hands the input to the executor;
+# when `max_pending` checks are already queued the sample is dropped, so a
+# slow reference never builds up work or memory.
+#
+# A divergence is written to `directory` as <input hash>.json holding the
+# input, both answers and the engine settings; replay them with
+#   python -m src.shadow replay <directory>
+# Reference runs cut short by the budget count as inconclusive.
+
+_engine: Optional[EPSLogic] = None
+
+
+def _init(pricing: PricingConfig, packing: str, packing_budget: float,
+          blocks: Optional[List[BlockType]]) -> None:
+    # Shadow process: lowest CPU priority, exhaustive engine without cache
+    global _engine
+    try:
+        os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+    except (AttributeError, OSError):
+        os.nice(19)
+    _engine = EPSLogic(strategy="exhaustive", cache_size=0, pricing=pricing,
+                       packing=packing, packing_budget=packing_budget, blocks=blocks)
+
+
+def summary(output: EPSOutput) -> Dict:
+    # Compared fields of a quote
+    return {"blocks_needed": output.blocks_needed, "per_block": output.per_block,
+            "sira_plan": output.details.sira_plan}
+
+
+def _verify(data: EPSInput, fast: Dict, budget: float, directory: str, settings: Dict) -> str:
+    # Shadow process: reference run, comparison and fixture write
+    # -> "verified" | "diverged" | "inconclusive" | "errors"
+    output = _engine.calculate(data, time_budget=budget)
+    if not output.optimal:
+        return "inconclusive"
+    reference = summary(output)
+    if reference == fast:
+        return "verified"
+    try:
+        record(directory, data, fast, reference, settings)
+    except OSError:
+        return "errors"
+    return "diverged"
+
+
+def record(directory: str, data: EPSInput, fast: Dict, reference: Dict, settings: Dict) -> str:
+    # Divergence fixture <input hash>.json (written atomically)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, canonical_hash(data) + ".json")
+    fixture = {
+        "input": data.model_dump(mode="json"),
+        "fast": fast,
+        "exhaustive": reference,
+        "settings": settings,
+        "recorded_unix": int(time.time()),
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(fixture, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+    return path
+
+
+class ShadowVerifier:
+    def __init__(self, rate: float, directory: str, budget: float = 5.0, max_pending: int = 64,
+                 pricing: Optional[PricingConfig] = None, packing: str = "grid", packing_budget: float = 0.5,
+                 blocks: Optional[List[BlockType]] = None, seed: Optional[int] = None):
+        # Engine settings mirror the serving engine (only the strategy differs)
+        self.rate = rate
+        self.directory = directory
+        self.budget = budget
+        self.max_pending = max_pending
+        pricing = pricing or PricingConfig()
+        self._initargs = (pricing, packing, packing_budget, blocks)
+        self._settings = {"packing": packing, "pricing_version": pricing.version,
+                          "blocks": [b.name for b in blocks] if blocks else None,
+                          "budget_s": budget}
+        self._random = random.Random(seed)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)  # signalled when _pending drops to 0
+        self.counts = {"sampled": 0, "dropped": 0, "verified": 0, "diverged": 0,
+                       "inconclusive": 0, "errors": 0}
+
+    def maybe_submit(self, data: EPSInput, output: EPSOutput) -> bool:
+        # Called on the request path: never blocks on the reference run. The
+        # comparison and any fixture write happen in the shadow process, so
+        # the done callback (which may run right here when the future is
+        # already finished) only updates counters.
+        if self.rate <= 0 or self._random.random() >= self.rate:
+            return False
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.counts["dropped"] += 1
+                return False
+            self.counts["sampled"] += 1
+            self._pending += 1
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=1, initializer=_init,
+                                                 initargs=self._initargs)
+            try:
+                future = self._pool.submit(_verify, data, summary(output), self.budget,
+                                           self.directory, self._settings)
+            except Exception:
+                self.counts["errors"] += 1
+                self._release()
+                return False
+        future.add_done_callback(self._done)
+        return True
+
+    def _done(self, future: Future) -> None:
+        # Outcome first, pending last: wait() / info() never see a finished
+        # sample that is neither pending nor counted
+        try:
+            outcome = future.result()
+        except Exception:
+            outcome = "errors"
+        with self._lock:
+            self.counts[outcome] += 1
+            self._release()
+
+    def _release(self) -> None:
+        # Caller holds the lock
+        self._pending -= 1
+        if self._pending == 0:
+            self._idle.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        # Block until every queued check is counted (tests, shutdown);
+        # False when the timeout passed first
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def info(self) -> Dict:
+        with self._lock:
+            return dict(self.counts, pending=self._pending, rate=self.rate)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def replay(directory: str, budget: Optional[float] = None) -> List[Dict]:
+    # Re-run every fixture with both strategies -> [{file, diverges, fast, exhaustive}]
+    # (packing from the fixture, block catalogue from SFT_BLOCK_CATALOGUE)
+    blocks = load_block_catalogue()
+    out = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(directory, name)) as f:
+            fixture = json.load(f)
+        data = EPSInput(**fixture["input"])
+        packing = fixture["settings"]["packing"]
+        fast = summary(EPSLogic(cache_size=0, packing=packing, blocks=blocks).calculate(data))
+        ref = summary(EPSLogic(strategy="exhaustive", cache_size=0, packing=packing,
+                               blocks=blocks).calculate(data, time_budget=budget))
+        out.append({"file": name, "diverges": fast != ref, "fast": fast, "exhaustive": ref})
+    return out
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "replay":
+        sys.exit("usage: python -m src.shadow replay <directory>")
+    results = replay(sys.argv[2])
+    for r in results:
+        print(f"{r['file']}: {'DIVERGES' if r['diverges'] else 'ok'}")
+    sys.exit(1 if any(r["diverges"] for r in results) else 0)
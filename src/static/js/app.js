@@ -2,15 +2,7 @@ const form = document.getElementById('calcForm');
 const emptyState = document.getElementById('emptyState');
 const resultsDashboard = document.getElementById('resultsDashboard');
 
-form.addEventListener('submit', async (e) => {
-    e.preventDefault();
-
-    // Animate Button
-    const btn = form.querySelector('.hero-btn');
-    const originalText = btn.innerHTML;
-    btn.innerHTML = '<div class="spinner-sm"></div> İşleniyor...';
-    btn.style.opacity = '0.8';
-
+function collectData() {
     const formData = new FormData(form);
     const data = {};
     for (let [key, value] of formData.entries()) {
@@ -23,22 +15,64 @@ form.addEventListener('submit', async (e) => {
     ['top_cap_count', 'bottom_cap_count', 'req_boxes'].forEach(k => {
         if (data[k]) data[k] = parseInt(data[k]);
     });
+    return data;
+}
+
+function showResult(result) {
+    renderDashboard(result);
+
+    // Transition
+    emptyState.classList.add('hidden');
+    resultsDashboard.classList.remove('hidden');
+}
+
+// Live updates: every edit goes to this tab's session, which re-runs only
+// the stages the changed fields affect. seq orders the edits; 409 means a
+// newer edit superseded the request and its answer is dropped.
+const sessionId = Math.random().toString(36).slice(2) + Date.now().toString(36);
+let editSeq = 0;
+let shownSeq = 0;
+
+form.addEventListener('input', async () => {
+    if (!form.checkValidity()) return;
+    const seq = ++editSeq;
+    try {
+        const response = await fetch(`/session/${sessionId}/calculate?seq=${seq}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(collectData())
+        });
+        if (!response.ok || seq < shownSeq) return;
+        shownSeq = seq;
+        showResult(await response.json());
+    } catch (err) {
+        // Live preview only; the submit button reports errors
+    }
+});
+
+window.addEventListener('pagehide', () => {
+    fetch(`/session/${sessionId}`, { method: 'DELETE', keepalive: true });
+});
+
+form.addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    // Animate Button
+    const btn = form.querySelector('.hero-btn');
+    const originalText = btn.innerHTML;
+    btn.innerHTML = '<div class="spinner-sm"></div> İşleniyor...';
+    btn.style.opacity = '0.8';
 
     try {
         const response = await fetch('/calculate', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(data)
+            body: JSON.stringify(collectData())
         });
 
         if (!response.ok) throw new Error('Failed');
 
-        const result = await response.json();
-        renderDashboard(result);
-
-        // Transition
-        emptyState.classList.add('hidden');
-        resultsDashboard.classList.remove('hidden');
+        showResult(await response.json());
 
     } catch (err) {
         alert('Hesaplama Hatası: ' + err.message);
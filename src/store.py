@@ -0,0 +1,187 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Persistent Quote Store (SQLite, WAL)
+# Serialized EPSOutput keyed on (canonical EPSInput hash, engine config version).
+# WAL mode lets every uvicorn worker / container sharing the file read while
+# one writes, so repeat quotes survive restarts and are shared across workers.
+# put() only buffers: a writer thread flushes the buffer when a batch is
+# full or flush_interval has passed, so no request waits on a write and a
+# quiet process still persists its quotes. Pruning (on the writer thread)
+# drops expired rows (TTL) and the oldest rows beyond max_rows. get() reads
+# SQLite on its own connection; async callers run it on a thread (see main.py).
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    input_hash      TEXT NOT NULL,
+    pricing_version TEXT NOT NULL,
+    payload         TEXT NOT NULL,
+    created_at      REAL NOT NULL,
+    PRIMARY KEY (input_hash, pricing_version)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_quotes_created_at ON quotes (created_at);
+"""
+
+
+class QuoteStore:
+    # Locks: _lock guards the in-memory buffers only and is never held
+    # across SQLite calls, so put() (called on the event loop) cannot wait
+    # on another process's write lock. The writer connection belongs to
+    # flush/prune (_write_lock), lookups use their own connection
+    # (_read_lock); WAL readers do not wait on writers.
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, max_rows: int = 100_000,
+                 batch_size: int = 64, flush_interval: float = 1.0, prune_interval: float = 300.0):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.prune_interval = prune_interval
+
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.executescript(SCHEMA)
+        self._reader = self._connect()
+
+        self._pending: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._inflight: Dict[Tuple[str, str], Tuple[str, float]] = {}  # being written
+        self._flushed = threading.Condition(self._lock)  # signalled after each flush
+        self._last_prune = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="quote-store-writer",
+                                        daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def _write_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._closed:
+                return
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass  # rows go back to the buffer; retried on the next round
+
+    def get(self, input_hash: str, pricing_version: str) -> Optional[str]:
+        key = (input_hash, pricing_version)
+        now = time.time()
+        with self._lock:
+            pending = self._pending.get(key) or self._inflight.get(key)
+            if pending is not None:
+                self.hits += 1
+                return pending[0]
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT payload, created_at FROM quotes WHERE input_hash = ? AND pricing_version = ?",
+                key,
+            ).fetchone()
+        with self._lock:
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def put(self, input_hash: str, pricing_version: str, payload: str) -> None:
+        # Buffer only (no I/O); a full batch wakes the writer thread
+        with self._lock:
+            self._pending[(input_hash, pricing_version)] = (payload, time.time())
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                # Swap the buffer out; put() keeps filling a fresh one
+                self._inflight, self._pending = self._pending, {}
+                rows: List[Tuple[str, str, str, float]] = [
+                    (k[0], k[1], v[0], v[1]) for k, v in self._inflight.items()
+                ]
+            try:
+                if rows:
+                    self._conn.execute("BEGIN")
+                    try:
+                        self._conn.executemany(
+                            "INSERT OR REPLACE INTO quotes (input_hash, pricing_version, payload, created_at) "
+                            "VALUES (?, ?, ?, ?)",
+                            rows,
+                        )
+                    except sqlite3.Error:
+                        self._conn.execute("ROLLBACK")
+                        raise
+                    self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                with self._lock:
+                    # Retried on the next flush; newer puts of a key win
+                    self._pending = {**self._inflight, **self._pending}
+                    self._inflight = {}
+                raise
+            with self._lock:
+                self.writes += len(rows)
+                self._inflight = {}
+                self._flushed.notify_all()
+                prune_due = time.monotonic() - self._last_prune >= self.prune_interval
+        if prune_due:
+            self.prune()
+
+    def wait_flushed(self, timeout: Optional[float] = None) -> bool:
+        # Block until the writer has emptied the buffer (tests, shutdown)
+        with self._flushed:
+            return self._flushed.wait_for(lambda: not self._pending and not self._inflight,
+                                          timeout=timeout)
+
+    def prune(self) -> int:
+        # Drop expired rows, then the oldest rows beyond max_rows
+        with self._write_lock:
+            with self._lock:
+                self._last_prune = time.monotonic()
+            self._conn.execute("BEGIN")
+            removed = self._conn.execute(
+                "DELETE FROM quotes WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM quotes WHERE created_at <= ("
+                " SELECT created_at FROM quotes ORDER BY created_at DESC LIMIT 1 OFFSET ?)",
+                (self.max_rows,),
+            ).rowcount
+            self._conn.execute("COMMIT")
+            return removed
+
+    def info(self) -> Dict[str, int]:
+        with self._read_lock:
+            rows = self._reader.execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
+        with self._lock:
+            return {
+                "rows": rows,
+                "pending": len(self._pending) + len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+            }
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+        self.flush()
+        with self._write_lock, self._read_lock:
+            self._conn.close()
+            self._reader.close()
@@ -0,0 +1,65 @@
+import json
+import time
+from typing import Iterator, List, Optional, Tuple
+from .logic import EPSLogic
+from .models import EPSInput, SweepInput
+
+# Catalogue Sweep
+# Inputs are generated lazily from the ranges and results are emitted as
+# NDJSON lines, so memory stays flat for any grid (the point count is capped
+# by SweepInput). The grid is cut into chunks of dimension points; main.py
+# computes each chunk in the calculation pool and streams it before asking
+# for the next one.
+# Geometry (cut dims, axis config, per_sira) depends only on the dimensions,
+# so it is computed once per grid point and reused for every quantity. With
+# a block catalogue every line picks its block type (select_block), as
+# /calculate does.
+
+CHUNK_LINES = 256  # NDJSON lines per chunk (fewer when one point has more quantities)
+
+Dims = Tuple[float, float, float]  # boy, en, yukseklik
+
+
+def chunks(sweep: SweepInput) -> Iterator[List[Dims]]:
+    # Dimension points of the grid, CHUNK_LINES lines at a time
+    size = max(1, CHUNK_LINES // len(sweep.quantities))
+    chunk = []
+    for boy in sweep.boy.values():
+        for en in sweep.en.values():
+            for yukseklik in sweep.yukseklik.values():
+                chunk.append((boy, en, yukseklik))
+                if len(chunk) == size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def sweep_lines(engine: EPSLogic, sweep: SweepInput, points: List[Dims],
+                time_budget: Optional[float] = None) -> str:
+    # NDJSON lines of one chunk; time_budget: planning budget per line (as /calculate)
+    out = []
+    for boy, en, yukseklik in points:
+        base = EPSInput(
+            boy=boy, en=en, yukseklik=yukseklik,
+            wall_thickness=sweep.wall_thickness,
+            extra_parts=sweep.extra_parts,
+            dns=sweep.dns,
+        )
+        catalogue = len(engine.blocks) > 1
+        geometry = None if catalogue else engine.geometry(base)
+        for qty in sweep.quantities:
+            data = base.model_copy(update={'req_boxes': qty})
+            deadline = time.monotonic() + time_budget if time_budget else None
+            if catalogue:
+                geometry, plan = engine.select_block(data, deadline=deadline)
+            else:
+                plan = engine.plan(data, geometry, deadline=deadline)
+            result = engine.build_output(data, geometry, plan)
+            line = {
+                "boy": boy, "en": en, "yukseklik": yukseklik, "req_boxes": qty,
+                "result": result.model_dump(mode="json"),
+            }
+            out.append(json.dumps(line, ensure_ascii=False) + "\n")
+    return "".join(out)
+
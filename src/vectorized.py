@@ -0,0 +1,93 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# Batch Axis Selection (NumPy)
+# Same rules as the loop in EPSLogic.calculate (Checklist 4 & 6), evaluated
+# for a whole batch at once:
+#   rows1 = floor(T1/x) * floor(T2/y), rows2 = floor(T2/x) * floor(T1/y)
+#   total = max(rows1, rows2) * floor(h_eff / cut_box_h)
+# Configs are scanned in order and only a strictly better total replaces the
+# current choice, so ties resolve exactly like the scalar path.
+
+
+def select_axes(cut_x: List[float], cut_y: List[float], cut_box_h: List[float],
+                parts_h: List[List[float]], configs: List[Dict],
+                rule_limit: float) -> List[Tuple[int, int, str, int, List[int]]]:
+    # Returns per item: (config index, sira_adedi, rotation, box per_sira, parts per_sira)
+    x = np.asarray(cut_x, dtype=np.float64)
+    y = np.asarray(cut_y, dtype=np.float64)
+    h = np.asarray(cut_box_h, dtype=np.float64)
+    n = len(x)
+
+    allowed = {None: np.ones(n, dtype=bool), 'x': x >= rule_limit, 'y': y >= rule_limit}
+
+    best_total = np.full(n, -1.0)
+    best_idx = np.zeros(n, dtype=np.int64)
+    best_sira = np.zeros(n, dtype=np.float64)
+    best_rotated = np.zeros(n, dtype=bool)
+
+    for idx, cfg in enumerate(configs):
+        T1, T2 = cfg['table']
+        r1 = np.floor(T1 / x) * np.floor(T2 / y)
+        r2 = np.floor(T2 / x) * np.floor(T1 / y)
+        sira = np.maximum(r1, r2)
+        total = sira * np.floor(cfg['h_eff'] / h)
+
+        better = allowed[cfg['requires']] & (total > best_total)
+        best_total = np.where(better, total, best_total)
+        best_idx = np.where(better, idx, best_idx)
+        best_sira = np.where(better, sira, best_sira)
+        best_rotated = np.where(better, r2 > r1, best_rotated)
+
+    # Per Sira floors for Box and all extra parts (flattened across the batch)
+    h_eff = np.array([cfg['h_eff'] for cfg in configs], dtype=np.float64)[best_idx]
+    box_per_sira = np.floor(h_eff / h).astype(np.int64)
+
+    counts = [len(ph) for ph in parts_h]
+    owner = np.repeat(np.arange(n), counts)
+    flat_h = np.fromiter((v for ph in parts_h for v in ph), dtype=np.float64, count=sum(counts))
+    flat_per_sira = np.floor(h_eff[owner] / flat_h).astype(np.int64).tolist()
+
+    out = []
+    pos = 0
+    idx_l = best_idx.tolist()
+    sira_l = best_sira.astype(np.int64).tolist()
+    rot_l = best_rotated.tolist()
+    box_l = box_per_sira.tolist()
+    for i in range(n):
+        k = counts[i]
+        out.append((idx_l[i], sira_l[i], "Rotated" if rot_l[i] else "Normal",
+                    box_l[i], flat_per_sira[pos:pos + k]))
+        pos += k
+    return out
+
+
+# Bulk Repricing
+# Mirrors pricing.price_totals operation by operation (same float results).
+
+def reprice(config, blocks_needed: List[int], total_pieces: List[int], divider: List[int],
+            dns: List[int], block_usd: Optional[List[Optional[float]]] = None
+            ) -> Tuple[List[float], List[float]]:
+    # block_usd: per plan block cost (None entries -> config.base_block_usd)
+    blocks = np.asarray(blocks_needed, dtype=np.float64)
+    pieces = np.asarray(total_pieces, dtype=np.float64)
+    div = np.asarray(divider, dtype=np.float64)
+    dns_arr = np.asarray(dns, dtype=np.float64)
+
+    # dns 0 / None -> no density adjustment (adding 0.0 leaves the base exact)
+    step = np.where(dns_arr != 0, (dns_arr - config.dns_base) * config.dns_step_usd, 0.0)
+    base = config.base_block_usd
+    if block_usd is not None:
+        base = np.array([config.base_block_usd if b is None else b for b in block_usd], dtype=np.float64)
+    base_block_usd = base + step
+
+    block_cost_tl = base_block_usd * config.usd_rate
+    sell_price_block = block_cost_tl * config.risk_margin * config.trade_margin
+    proc_cost_total = pieces * config.processing_fee
+
+    total_ex_vat = (blocks * sell_price_block) + proc_cost_total
+    total_ex_vat = total_ex_vat + config.shipping
+    total_inc_vat = total_ex_vat * config.vat_rate
+
+    div = np.where(div == 0, 1.0, div)
+    return (total_inc_vat / div).tolist(), total_inc_vat.tolist()
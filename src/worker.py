@@ -0,0 +1,83 @@
+import os
+from typing import Dict, List, Optional, Tuple
+from .models import (
+    EPSInput, EPSOutput, PriceSheetInput, PriceSheetOutput, PricingConfig, NestingInput, NestingOutput,
+    ScheduleInput, ScheduleOutput, BlockType, SensitivityInput, SensitivityOutput, SweepInput,
+    CutProgramInput
+)
+from .logic import EPSLogic
+from .nesting import nest as nest_orders
+from .scheduling import schedule as schedule_blocks
+from .sensitivity import sensitivity as yield_sensitivity
+from .session import State, recompute as recompute_session
+from .sweep import Dims, sweep_lines
+from .cutprogram import programs as cut_programs
+from .metrics import profiled
+
+# Process-pool side of the API (see main.py)
+# Each worker process owns one EPSLogic (and therefore its own geometry cache).
+# Calls return the worker's pid and cache counters so the API process can
+# aggregate them for /stats.
+
+_engine: Optional[EPSLogic] = None
+
+
+def init_worker(strategy: str, cache_size: int, pricing: PricingConfig,
+                packing: str = "grid", packing_budget: float = 0.5,
+                blocks: Optional[List[BlockType]] = None) -> None:
+    global _engine
+    _engine = EPSLogic(strategy=strategy, cache_size=cache_size, pricing=pricing,
+                       packing=packing, packing_budget=packing_budget, blocks=blocks)
+
+
+def calculate(data: EPSInput, time_budget: Optional[float]
+              ) -> Tuple[Tuple[EPSOutput, Dict], int, Dict[str, int]]:
+    # (output, stage timings) - see metrics.profiled
+    return (profiled(_engine.calculate, data, time_budget=time_budget), os.getpid(),
+            _engine.cache_info())
+
+
+def calculate_lean(data: EPSInput, time_budget: Optional[float]
+                   ) -> Tuple[Tuple[Dict, Dict], int, Dict[str, int]]:
+    return (profiled(_engine.calculate_lean, data, time_budget=time_budget), os.getpid(),
+            _engine.cache_info())
+
+
+def recompute(state: Optional[State], data: EPSInput, time_budget: Optional[float]
+              ) -> Tuple[Tuple[Tuple[State, List[str]], Dict], int, Dict[str, int]]:
+    # Session edit (see session.py): the state travels with the call, so any
+    # worker can take the next edit of a session
+    return (profiled(recompute_session, _engine, state, data, time_budget), os.getpid(),
+            _engine.cache_info())
+
+
+def calculate_many(items: List[EPSInput], time_budget: Optional[float]
+                   ) -> Tuple[List[EPSOutput], int, Dict[str, int]]:
+    return _engine.calculate_many(items, time_budget=time_budget), os.getpid(), _engine.cache_info()
+
+
+def sweep(req: SweepInput, points: List[Dims], time_budget: Optional[float]
+          ) -> Tuple[str, int, Dict[str, int]]:
+    # One chunk of a catalogue sweep as NDJSON text
+    return sweep_lines(_engine, req, points, time_budget), os.getpid(), _engine.cache_info()
+
+
+def cut_program(req: CutProgramInput, time_budget: Optional[float]
+                ) -> Tuple[List[Tuple[int, Dict]], int, Dict[str, int]]:
+    return cut_programs(_engine, req, time_budget), os.getpid(), _engine.cache_info()
+
+
+def price_sheet(sheet: PriceSheetInput) -> Tuple[PriceSheetOutput, int, Dict[str, int]]:
+    return _engine.price_sheet(sheet.product, sheet.breakpoints()), os.getpid(), _engine.cache_info()
+
+
+def nest(req: NestingInput) -> Tuple[NestingOutput, int, Dict[str, int]]:
+    return nest_orders(_engine, req.orders), os.getpid(), _engine.cache_info()
+
+
+def schedule(req: ScheduleInput) -> Tuple[ScheduleOutput, int, Dict[str, int]]:
+    return schedule_blocks(req), os.getpid(), _engine.cache_info()
+
+
+def sensitivity(req: SensitivityInput) -> Tuple[SensitivityOutput, int, Dict[str, int]]:
+    return yield_sensitivity(_engine, req), os.getpid(), _engine.cache_info()
@@ -45,3 +45,249 @@ def test_calculate_with_order():
     res = response.json()
     assert res['blocks_needed'] > 0
     assert res['required']['boxes'] == 100
+
+def test_calculate_batch():
+    items = [
+        {"boy": 50, "en": 50, "yukseklik": 50, "wall_thickness": 1, "req_boxes": 100},
+        {"boy": 22.5, "en": 18.5, "yukseklik": 16.4, "wall_thickness": 0.5},
+    ]
+    response = client.post("/calculate/batch", json=items)
+    assert response.status_code == 200
+    res = response.json()
+    assert len(res) == 2
+    assert res[0] == client.post("/calculate", json=items[0]).json()
+
+def test_calculate_batch_item_cap():
+    from src.models import MAX_BATCH_ITEMS
+
+    item = {"boy": 20, "en": 15, "yukseklik": 10, "wall_thickness": 1}
+    response = client.post("/calculate/batch", json=[item] * (MAX_BATCH_ITEMS + 1))
+    assert response.status_code == 422
+
+def test_stats():
+    client.post("/calculate", json={"boy": 30, "en": 20, "yukseklik": 10, "wall_thickness": 1})
+    response = client.get("/stats")
+    assert response.status_code == 200
+    cache = response.json()["layout_cache"]
+    assert cache["hits"] + cache["misses"] >= 1
+    assert "workers" in response.json()["pool"]
+
+def test_reprice():
+    data = {"boy": 50, "en": 50, "yukseklik": 50, "wall_thickness": 1, "req_boxes": 100}
+    quote = client.post("/calculate", json=data).json()
+    plan = {
+        "blocks_needed": quote["blocks_needed"],
+        "total_produced": {k: v * quote["blocks_needed"] for k, v in quote["per_block"].items()},
+        "req_boxes": 100,
+    }
+    response = client.post("/reprice", json={"plans": [plan]})
+    assert response.status_code == 200
+    assert response.json() == [quote["pricing"]]
+    doubled = client.post("/reprice", json={"usd_rate": 64.0, "plans": [plan]}).json()
+    assert doubled[0]["total_price"] > quote["pricing"]["total_price"]
+
+def test_single_flight_coalesces_identical_calls():
+    import asyncio
+    from src.coalesce import SingleFlight
+
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"blocks_needed": 1}
+
+    async def burst():
+        flight = SingleFlight()
+        results = await asyncio.gather(*[flight.do("same", compute) for _ in range(5)])
+        return flight, results
+
+    flight, results = asyncio.run(burst())
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert flight.info() == {"executed": 1, "coalesced": 4, "inflight": 0}
+    assert "coalesced" in client.get("/stats").json()["coalescing"]
+
+def test_calculate_served_from_quote_store(tmp_path, monkeypatch):
+    import src.main as main
+    from src.store import QuoteStore
+
+    store = QuoteStore(str(tmp_path / "quotes.db"), batch_size=1)
+    monkeypatch.setattr(main, "_store", store)
+    data = {"boy": 40, "en": 30, "yukseklik": 20, "wall_thickness": 1, "req_boxes": 250}
+    first = client.post("/calculate", json=data)
+    assert store.wait_flushed(timeout=10)
+    second = client.post("/calculate", json=data)
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert store.info()["hits"] == 1 and store.info()["rows"] == 1
+    store.close()
+
+def test_calculate_sweep_streams_ndjson():
+    import json
+
+    sweep = {
+        "boy": {"start": 20, "stop": 21, "step": 0.5},
+        "en": {"start": 30, "stop": 30, "step": 1},
+        "yukseklik": {"start": 10, "stop": 12, "step": 2},
+        "wall_thickness": 1,
+        "quantities": [None, 100],
+    }
+    response = client.post("/calculate/sweep", json=sweep)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(l) for l in response.text.splitlines()]
+    assert len(lines) == 3 * 1 * 2 * 2
+    last = lines[-1]
+    single = client.post("/calculate", json={
+        "boy": last["boy"], "en": last["en"], "yukseklik": last["yukseklik"],
+        "wall_thickness": 1, "req_boxes": last["req_boxes"],
+    }).json()
+    assert last["result"] == single
+
+def test_calculate_sweep_limits(monkeypatch):
+    import json
+    import src.main
+
+    sweep = {
+        "boy": {"start": 10, "stop": 60, "step": 0.5},
+        "en": {"start": 10, "stop": 60, "step": 0.5},
+        "yukseklik": {"start": 10, "stop": 20, "step": 1},
+        "wall_thickness": 1,
+    }
+    assert client.post("/calculate/sweep", json=sweep).status_code == 422
+    small = dict(sweep, yukseklik={"start": 10, "stop": 10, "step": 1})
+    for quantities in ([-5], [0], [None, 100, 0]):
+        assert client.post("/calculate/sweep",
+                           json=dict(small, quantities=quantities)).status_code == 422
+    sweep["yukseklik"] = {"start": 10, "stop": 10, "step": 1}
+    monkeypatch.setattr(src.main, "STREAM_TIME_LIMIT", -1)
+    response = client.post("/calculate/sweep", json=sweep)
+    assert response.status_code == 200
+    assert [json.loads(l) for l in response.text.splitlines()] == [
+        {"error": "time limit exceeded", "lines": 0}]
+
+def test_price_sheet():
+    product = {"boy": 50, "en": 40, "yukseklik": 30, "wall_thickness": 1}
+    response = client.post("/price-sheet", json={
+        "product": product, "quantity_range": {"start": 100, "stop": 1000, "step": 300},
+    })
+    assert response.status_code == 200
+    tiers = response.json()["tiers"]
+    assert [t["req_boxes"] for t in tiers] == [100, 400, 700, 1000]
+    assert tiers[0]["blocks_needed"] <= tiers[-1]["blocks_needed"]
+    assert client.post("/price-sheet", json={"product": product}).status_code == 422
+
+def test_nesting():
+    orders = [{"boy": b, "en": 30, "yukseklik": 20, "wall_thickness": 1, "req_boxes": q}
+              for b, q in [(40, 20), (41, 25), (40, 10)]]
+    response = client.post("/nesting", json={"orders": orders})
+    assert response.status_code == 200
+    out = response.json()
+    assert out["blocks_needed"] == 1 and out["standalone_blocks"] == 3
+    assert out["blocks_saved"] == 2
+    assert sorted(o["order"] for o in out["blocks"][0]["orders"]) == [0, 1, 2]
+    orders[0].pop("req_boxes")
+    assert client.post("/nesting", json={"orders": orders}).status_code == 422
+
+def test_schedule():
+    plan = client.post("/calculate", json={
+        "boy": 40, "en": 30, "yukseklik": 20, "wall_thickness": 1, "req_boxes": 500,
+    }).json()
+    response = client.post("/schedule", json={
+        "jobs": [{"job_id": "A", "plan": plan, "due_s": 3600}],
+        "machines": [{"name": "CNC-1"}, {"name": "CNC-2", "speed": 2}],
+    })
+    assert response.status_code == 200
+    out = response.json()
+    assert sum(len(m["blocks"]) for m in out["machines"]) == plan["blocks_needed"]
+    assert out["makespan_s"] == max(m["busy_s"] for m in out["machines"])
+
+def test_cut_program_stream():
+    import json
+
+    product = {"boy": 40, "en": 30, "yukseklik": 20, "wall_thickness": 1, "req_boxes": 500}
+    with client.stream("POST", "/cut-program", json={"product": product}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [line for line in response.iter_lines() if line]
+    blocks = client.post("/calculate", json=product).json()["blocks_needed"]
+    assert len(lines) == blocks
+    assert [json.loads(line)["block"] for line in lines] == list(range(1, blocks + 1))
+
+def test_cut_program_limits(monkeypatch):
+    import json
+    import src.main
+
+    product = {"boy": 40, "en": 30, "yukseklik": 20, "wall_thickness": 1, "req_boxes": 10_000_000}
+    response = client.post("/cut-program", json={"product": product})
+    assert response.status_code == 422
+    monkeypatch.setattr(src.main, "STREAM_TIME_LIMIT", -1)
+    response = client.post("/cut-program", json={"product": dict(product, req_boxes=500)})
+    assert response.status_code == 200
+    assert [json.loads(l) for l in response.text.splitlines()] == [
+        {"error": "time limit exceeded", "lines": 0}]
+
+def test_calculate_profile_and_metrics():
+    data = {"boy": 40, "en": 30, "yukseklik": 20, "wall_thickness": 1, "req_boxes": 300}
+    plain = client.post("/calculate", json=data).json()
+    assert plain["details"]["profile"] is None
+    profiled = client.post("/calculate?profile=1", json=data).json()
+    profile = profiled["details"].pop("profile")
+    plain["details"].pop("profile")
+    assert profiled == plain
+    assert set(profile["stages_ms"]) == {"cut_dims", "axis_selection", "planning", "pricing", "report"}
+    assert profile["partitions_explored"] > 0
+    assert sum(profile["stages_ms"].values()) <= profile["total_ms"]
+
+    text = client.get("/metrics").text
+    assert 'sft_stage_seconds_bucket{stage="planning",le="+Inf"}' in text
+    assert 'sft_stage_seconds_count{stage="http"}' in text
+    assert 'sft_request_seconds_count{path="/calculate"}' in text
+    assert "sft_partitions_explored_count" in text
+
+def test_calculate_lean_matches_full_response():
+    for data in ({"boy": 40, "en": 30, "yukseklik": 20, "wall_thickness": 1, "req_boxes": 300},
+                 {"boy": 22.5, "en": 18.5, "yukseklik": 16.4, "wall_thickness": 0.5}):
+        full = client.post("/calculate", json=data).json()
+        response = client.post("/calculate/lean", json=data)
+        assert response.status_code == 200
+        lean = response.json()
+        assert set(lean) == {"blocks_needed", "per_block", "total_produced", "required",
+                             "excess", "pricing"}
+        for key in ("blocks_needed", "per_block", "required", "excess", "pricing"):
+            assert lean[key] == full[key]
+        assert lean["total_produced"] == {k: v * full["blocks_needed"]
+                                          for k, v in full["per_block"].items()}
+        assert len(response.content) < len(client.post("/calculate", json=data).content)
+    assert client.post("/calculate/lean", json={"boy": 40}).status_code == 422
+
+def test_sensitivity():
+    product = {"boy": 40, "en": 30, "yukseklik": 20, "wall_thickness": 1, "req_boxes": 500}
+    response = client.post("/sensitivity", json={"product": product, "dimensions": ["yukseklik"]})
+    assert response.status_code == 200
+    out = response.json()
+    assert out["exact"] and [d["dimension"] for d in out["dimensions"]] == ["yukseklik"]
+    cliff = out["dimensions"][0]["increase"]
+    assert cliff["change_cm"] > 0
+    changed = client.post("/calculate/lean", json=dict(product, yukseklik=cliff["value"])).json()
+    assert (changed["blocks_needed"], changed["per_block"]) == (cliff["blocks_needed"], cliff["per_block"])
+    assert out["base"]["blocks_needed"] == client.post("/calculate", json=product).json()["blocks_needed"]
+
+def test_session_calculate():
+    data = {"boy": 40, "en": 30, "yukseklik": 20, "wall_thickness": 1, "req_boxes": 300}
+    client.delete("/session/ui-test")
+    first = client.post("/session/ui-test/calculate?seq=1", json=data)
+    assert first.status_code == 200
+    assert first.headers["X-SFT-Stages"] == "geometry,planning,pricing,report"
+    assert first.json() == client.post("/calculate", json=data).json()
+    second = client.post("/session/ui-test/calculate?seq=2", json=dict(data, dns=22))
+    assert second.headers["X-SFT-Stages"] == "pricing,report"
+    assert second.json() == client.post("/calculate", json=dict(data, dns=22)).json()
+    stale = client.post("/session/ui-test/calculate?seq=2", json=data)
+    assert stale.status_code == 409
+    assert client.get("/stats").json()["sessions"]["sessions"] >= 1
+    assert client.delete("/session/ui-test").json() == {"dropped": True}
+    text = client.get("/metrics").text
+    assert 'sft_request_seconds_count{path="/session/{session_id}/calculate"}' in text
+    assert "ui-test" not in text
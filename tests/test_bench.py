@@ -0,0 +1,81 @@
+from benchmarks.bench_engine import CORPUS, compare, run_scenario
+
+
+def test_run_scenario_reports_latency_and_memory():
+    result = run_scenario(CORPUS["medium_order_500"], "cold", min_time=0, min_iters=5, mem_iters=1)
+    assert result["iterations"] >= 5
+    assert result["ops_per_s"] > 0 and result["p50_ms"] <= result["p99_ms"]
+    assert result["peak_kib"] > 0 and result["blocks_needed"] > 0
+
+
+def test_compare_flags_regressions_only_above_threshold():
+    base = {"a/cold": {"ops_per_s": 1000.0, "p50_ms": 1.0, "p99_ms": 2.0, "peak_kib": 100.0,
+                       "blocks_needed": 7}}
+    same = {"a/cold": dict(base["a/cold"], ops_per_s=900.0, p50_ms=1.1)}
+    assert compare(same, base, 0.2) == []
+    slow = {"a/cold": dict(base["a/cold"], ops_per_s=700.0, p50_ms=1.5, peak_kib=200.0,
+                           blocks_needed=8)}
+    reasons = [r.split()[0] for _, r in compare(slow, base, 0.2)]
+    assert reasons == ["blocks_needed", "ops/s", "p50", "peak"]
+    assert compare({"new/cold": base["a/cold"]}, base, 0.2) == []
+
+
+def test_loadtest_mix_is_valid_and_reproducible():
+    import json
+    from benchmarks.loadtest import payloads
+    from src.models import EPSInput
+
+    bodies = payloads(50, seed=3)
+    assert bodies == payloads(50, seed=3)
+    inputs = [EPSInput(**json.loads(b)) for b in bodies]
+    assert any(i.req_boxes for i in inputs) and any(not i.req_boxes for i in inputs)
+
+
+def test_loadtest_client_and_summary():
+    import asyncio
+    from benchmarks.loadtest import Connection, Recorder, summarize
+
+    async def handler(reader, writer):
+        while await reader.readline() not in (b"\r\n", b""):
+            pass
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+        while await reader.readline() not in (b"\r\n", b""):
+            pass
+        writer.write(b"HTTP/1.1 500 Error\r\nTransfer-Encoding: chunked\r\n\r\n3\r\nbad\r\n0\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+    async def scenario():
+        server = await asyncio.start_server(handler, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        conn = Connection("127.0.0.1", port)
+        first = await conn.request("GET", "/health")
+        second = await conn.request("GET", "/health")
+        conn.close()
+        server.close()
+        return first, second
+
+    assert asyncio.run(scenario()) == ((200, b"ok"), (500, b"bad"))
+
+    rec = Recorder(measure_from=0.0)
+    rec.latencies = [i / 1000 for i in range(1, 101)]
+    rec.statuses = {"200": 99, "500": 1}
+    summary = summarize(rec, 2.0)
+    assert summary["throughput_rps"] == 50.0 and summary["error_rate"] == 0.01
+    assert summary["latency_ms"] == {"p50": 50.0, "p90": 90.0, "p99": 99.0, "max": 100.0}
+
+
+def test_schedule_benchmark_reports_every_objective():
+    from benchmarks.bench_schedule import OBJECTIVES, run
+
+    results = run(5, repeat=1)
+    assert set(results) == set(OBJECTIVES)
+    assert all(r["blocks"] > 0 and r["seconds"] > 0 for r in results.values())
+
+
+def test_batch_benchmark_checks_results_and_reports_rates():
+    from benchmarks.bench_batch import run
+
+    result = run(20, repeat=1)
+    assert result["items"] == 20
+    assert result["single_per_s"] > 0 and result["batch_per_s"] > 0
@@ -0,0 +1,45 @@
+import csv
+import io
+import json
+
+from src.cli import run
+from src.logic import EPSLogic
+from src.models import EPSInput, ExtraPart
+
+CATALOGUE = """id,boy,en,yukseklik,wall_thickness,req_boxes,parts
+A,40,30,20,1,500,
+B,22.5,18.5,16.4,0.5,,Ust Kapak:1:1.0;Alt Kapak:2:1.5
+C,x,30,20,1,,
+D,40,30,20,1,10,Kapak:1
+"""
+
+
+def _records():
+    return csv.DictReader(io.StringIO(CATALOGUE))
+
+
+def test_cli_quotes_rows_in_order_and_reports_errors():
+    out = io.StringIO()
+    assert run(_records(), out, fmt="ndjson", chunk_size=1) == (4, 2)
+    lines = [json.loads(l) for l in out.getvalue().splitlines()]
+    assert [l["row"] for l in lines] == [1, 2, 3, 4]
+    assert [l["id"] for l in lines] == ["A", "B", "C", "D"]
+    assert "boy" in lines[2]["error"] and "parts" in lines[3]["error"]
+
+    engine = EPSLogic()
+    assert lines[0]["result"] == engine.calculate_lean(
+        EPSInput(boy=40, en=30, yukseklik=20, wall_thickness=1, req_boxes=500))
+    assert lines[1]["result"] == engine.calculate_lean(EPSInput(
+        boy=22.5, en=18.5, yukseklik=16.4, wall_thickness=0.5,
+        extra_parts=[ExtraPart(name="Ust Kapak", count=1, thickness_cm=1.0),
+                     ExtraPart(name="Alt Kapak", count=2, thickness_cm=1.5)]))
+
+
+def test_cli_pool_output_matches_in_process():
+    serial, pooled = io.StringIO(), io.StringIO()
+    run(_records(), serial, fmt="csv", workers=0)
+    run(_records(), pooled, fmt="csv", workers=2, chunk_size=1)
+    assert pooled.getvalue() == serial.getvalue()
+    rows = list(csv.DictReader(io.StringIO(serial.getvalue())))
+    assert rows[0]["blocks_needed"] and not rows[0]["error"]
+    assert rows[1]["per_block"].startswith("Box=")
@@ -0,0 +1,48 @@
+from src.cutprogram import block_program, cells, iter_blocks, programs
+from src.logic import EPSLogic
+from src.models import CutProgramInput, EPSInput, ExtraPart
+
+
+def _caps(**kw):
+    data = dict(boy=22.5, en=18.5, yukseklik=16.4, wall_thickness=0.5, req_boxes=500, extra_parts=[
+        ExtraPart(name="Ust Kapak", count=1, thickness_cm=1.0),
+        ExtraPart(name="Alt Kapak", count=1, thickness_cm=1.5),
+    ])
+    data.update(kw)
+    return EPSInput(**data)
+
+
+def test_z_planes_cover_exactly_the_rows_that_need_them():
+    engine = EPSLogic()
+    data = _caps()
+    geometry = engine.geometry(data)
+    plan = engine.plan(data, geometry)
+    passes, unmerged = block_program(geometry, plan['sira_plan'])
+    assert len(passes) < unmerged
+
+    heights = {'Box': geometry['cut_box_h'], **geometry['parts_h']}
+    table_cells = cells(geometry)
+    expected = {}
+    pos = 0
+    for name, rows in plan['sira_plan'].items():
+        for x0, y0, x1, y1 in table_cells[pos:pos + rows]:
+            for k in range(1, geometry['per_sira'][name] + 1):
+                z = round(k * heights[name], 6)
+                if z < geometry['config']['h_eff'] - 1e-6:
+                    expected[z] = expected.get(z, 0) + (x1 - x0) * (y1 - y0)
+        pos += rows
+    covered = {}
+    for p in passes:
+        if p["axis"] == "z":
+            x0, y0, x1, y1 = p["region"]
+            covered[p["at"]] = covered.get(p["at"], 0) + (x1 - x0) * (y1 - y0)
+    assert covered.keys() == expected.keys()
+    assert all(abs(covered[z] - expected[z]) < 1e-6 for z in expected)
+
+
+def test_program_streams_one_line_per_block():
+    engine = EPSLogic()
+    for data in (_caps(), _caps(multi_block="mixed"), _caps(req_boxes=None)):
+        lines = list(iter_blocks(programs(engine, CutProgramInput(product=data))))
+        assert [line["block"] for line in lines] == list(range(1, engine.calculate(data).blocks_needed + 1))
+        assert all(line["pass_count"] <= line["unmerged_pass_count"] for line in lines)
@@ -0,0 +1,314 @@
+import random
+import time
+
+from src.logic import EPSLogic
+from src.models import EPSInput, ExtraPart
+from src.planning import (
+    max_sets_fast, max_sets_exhaustive, min_blocks_fast, min_blocks_exhaustive,
+    min_blocks_mixed, partitions
+)
+
+
+def _caps_input(**kw):
+    data = dict(
+        boy=22.5, en=18.5, yukseklik=16.4, wall_thickness=0.5,
+        extra_parts=[
+            ExtraPart(name="Ust Kapak", count=1, thickness_cm=1.0),
+            ExtraPart(name="Alt Kapak", count=1, thickness_cm=1.5),
+        ],
+    )
+    data.update(kw)
+    return EPSInput(**data)
+
+
+def test_max_sets_fast_matches_exhaustive():
+    rng = random.Random(7)
+    for _ in range(500):
+        comps = ['Box'] + [f"p{i}" for i in range(rng.randint(0, 3))]
+        per_sira = {c: rng.choice([0, 1, 2, 5, 11, 40]) for c in comps}
+        ratios = {c: rng.randint(1, 3) for c in comps}
+        ratios['Box'] = 1
+        sira_max = rng.randint(0, 12)
+        assert max_sets_fast(sira_max, comps, per_sira, ratios) == \
+            max_sets_exhaustive(sira_max, comps, per_sira, ratios)
+
+
+def test_no_order_strategies_agree():
+    data = _caps_input()
+    fast = EPSLogic().calculate(data)
+    ref = EPSLogic(strategy="exhaustive").calculate(data)
+    assert fast.details.sira_plan == ref.details.sira_plan
+    assert fast.per_block == ref.per_block
+
+
+def test_no_order_many_parts_is_fast():
+    parts = [ExtraPart(name=f"Levha {i}", count=1 + i % 3, thickness_cm=0.5 + i * 0.3)
+             for i in range(12)]
+    res = EPSLogic().calculate(_caps_input(boy=5, en=5, extra_parts=parts))
+    assert sum(res.details.sira_plan.values()) == res.details.layout_2d.sira_adedi
+
+
+def test_min_blocks_fast_matches_exhaustive():
+    rng = random.Random(11)
+    for _ in range(500):
+        comps = ['Box'] + [f"p{i}" for i in range(rng.randint(0, 3))]
+        per_sira = {c: rng.choice([0, 1, 3, 8, 40]) for c in comps}
+        required = {c: rng.randint(1, 400) for c in comps}
+        sira_max = rng.randint(0, 10)
+        assert min_blocks_fast(sira_max, comps, per_sira, required) == \
+            min_blocks_exhaustive(sira_max, comps, per_sira, required)
+
+
+def test_order_minimizes_blocks_then_excess():
+    res = EPSLogic().calculate(_caps_input(req_boxes=1000))
+    ref = EPSLogic(strategy="exhaustive").calculate(_caps_input(req_boxes=1000))
+    assert res.blocks_needed == ref.blocks_needed
+    assert res.excess == ref.excess
+    assert all(v >= 0 for v in res.excess.values())
+
+
+def test_calculate_many_matches_calculate():
+    rng = random.Random(5)
+    items = []
+    for _ in range(200):
+        parts = [ExtraPart(name=f"p{j}", count=rng.randint(1, 2), thickness_cm=rng.uniform(0.5, 5))
+                 for j in range(rng.randint(0, 3))]
+        items.append(EPSInput(
+            boy=rng.uniform(3, 120), en=rng.uniform(3, 120), yukseklik=rng.uniform(2, 120),
+            wall_thickness=1, extra_parts=parts, req_boxes=rng.choice([None, 10, 5000]),
+        ))
+    engine = EPSLogic()
+    assert [r.model_dump() for r in engine.calculate_many(items)] == \
+        [engine.calculate(d).model_dump() for d in items]
+
+
+def test_geometry_cache_hits_across_quantities_and_names():
+    engine = EPSLogic(cache_size=2)
+    first = engine.calculate(_caps_input())
+    renamed = _caps_input(extra_parts=[
+        ExtraPart(name="Alt", count=1, thickness_cm=1.5),
+        ExtraPart(name="Ust", count=1, thickness_cm=1.0),
+    ])
+    hit = engine.calculate(renamed)
+    assert engine.cache_info()["hits"] == 1
+    assert hit.details.per_sira == {"Box": first.details.per_sira["Box"],
+                                    "Alt": first.details.per_sira["Alt Kapak"],
+                                    "Ust": first.details.per_sira["Ust Kapak"]}
+    assert hit.model_dump_json() == EPSLogic(cache_size=0).calculate(renamed).model_dump_json()
+
+    engine.calculate(_caps_input(req_boxes=500))
+    assert engine.cache_info()["hits"] == 2
+
+    engine.calculate(_caps_input(boy=30))
+    engine.calculate(_caps_input(boy=31))
+    info = engine.cache_info()
+    assert info["size"] == 2 and info["evictions"] == 1
+
+
+def test_stages_and_bulk_reprice_match_calculate():
+    from src.models import PricingConfig, StoredPlan
+
+    engine = EPSLogic()
+    quotes = [_caps_input(req_boxes=q, dns=d) for q in (1, 37, 1000) for d in (None, 10, 18)]
+    quotes.append(_caps_input())
+    stored = []
+    for data in quotes:
+        plan = engine.plan(data, engine.geometry(data))
+        assert engine.price(data, plan) == engine.calculate(data).pricing
+        stored.append(StoredPlan(blocks_needed=plan['blocks_needed'], total_produced=plan['total_produced'],
+                                 req_boxes=data.req_boxes, dns=data.dns))
+
+    repriced = engine.reprice_many(stored, usd_rate=35.5)
+    new_rate = EPSLogic(pricing=PricingConfig(usd_rate=35.5))
+    assert repriced == [new_rate.calculate(d).pricing for d in quotes]
+
+
+def test_time_budget_returns_best_plan_so_far():
+    parts = [ExtraPart(name=f"Levha {i}", count=1, thickness_cm=1.0 + i) for i in range(6)]
+    data = _caps_input(boy=5, en=5, extra_parts=parts)
+    res = EPSLogic(strategy="exhaustive").calculate(data, time_budget=0.05)
+    assert res.optimal is False
+    assert sum(res.details.sira_plan.values()) == res.details.layout_2d.sira_adedi
+    assert EPSLogic().calculate(data, time_budget=0.05).optimal is True
+    # calculate_many gives every item the same budget (vectorized and per-item paths)
+    for engine in (EPSLogic(strategy="exhaustive"), EPSLogic(strategy="exhaustive", packing="guillotine")):
+        batch = engine.calculate_many([data, data], time_budget=0.05)
+        assert [r.optimal for r in batch] == [False, False]
+
+
+def test_price_sheet_matches_single_quotes():
+    engine = EPSLogic()
+    quantities = [5000, 1, 250, 999, 250, 12000]
+    sheet = engine.price_sheet(_caps_input(dns=12), quantities)
+    assert [t.req_boxes for t in sheet.tiers] == sorted(set(quantities))
+    for tier in sheet.tiers:
+        single = engine.calculate(_caps_input(dns=12, req_boxes=tier.req_boxes))
+        assert (tier.blocks_needed, tier.per_block, tier.excess, tier.pricing) == \
+            (single.blocks_needed, single.per_block, single.excess, single.pricing)
+
+
+def test_guillotine_packing_feeds_planning():
+    data = _caps_input(boy=13.5, en=10, yukseklik=20, req_boxes=None)
+    grid = EPSLogic().calculate(data)
+    mixed = EPSLogic(packing="guillotine").calculate(data)
+    layout = mixed.details.layout_2d
+    assert layout.sira_adedi > grid.details.layout_2d.sira_adedi
+    assert layout.rotation == "Mixed" and len(layout.placements) == layout.sira_adedi
+    assert mixed.per_block["Box"] >= grid.per_block["Box"]
+    assert mixed.optimal
+
+
+def test_min_blocks_mixed_matches_brute_force():
+    rng = random.Random(2)
+    for _ in range(150):
+        comps = ['Box'] + [f"p{i}" for i in range(rng.randint(0, 2))]
+        per_sira = {c: rng.randint(1, 12) for c in comps}
+        required = {c: rng.randint(1, 300) for c in comps}
+        sira_max = rng.randint(2, 7)
+        k, rows, _ = min_blocks_fast(sira_max, comps, per_sira, required)
+        if rows is None:
+            continue
+        blocks, plans, optimal = min_blocks_mixed(sira_max, comps, per_sira, required, k, rows)
+
+        produced = {c: sum(n * r[c] * per_sira[c] for n, r in plans) for c in comps}
+        assert optimal and all(produced[c] >= required[c] for c in comps)
+        assert sum(n for n, _ in plans) == blocks and all(sum(r.values()) == sira_max for _, r in plans)
+
+        best = None
+        for b in range(1, k + 1):
+            for p in partitions(sira_max, len(comps)):
+                for q in partitions(sira_max, len(comps)):
+                    made = [((b - 1) * p[i] + q[i]) * per_sira[c] for i, c in enumerate(comps)]
+                    if all(made[i] >= required[c] for i, c in enumerate(comps)):
+                        key = (b, sum(made) - sum(required.values()))
+                        best = key if best is None else min(best, key)
+            if best:
+                break
+        assert (blocks, sum(produced.values()) - sum(required.values())) == best
+
+
+def test_min_blocks_mixed_large_order_within_budget():
+    # Hundreds of thousands of blocks: the block count is binary searched,
+    # so the plan is optimal well inside the time budget
+    parts = [ExtraPart(name="Kapak", count=1, thickness_cm=3.0)] + [
+        ExtraPart(name=f"Levha {i}", count=1, thickness_cm=4.5) for i in range(3)]
+    data = _caps_input(boy=60, en=55, yukseklik=40, extra_parts=parts,
+                       req_boxes=1_000_000, multi_block="mixed")
+    res = EPSLogic().calculate(data, time_budget=1.0)
+    assert res.optimal
+    assert res.blocks_needed < EPSLogic().calculate(data.model_copy(update={"multi_block": "uniform"})).blocks_needed
+    produced = sum(p.blocks * p.per_block["Box"] for p in res.block_plans)
+    assert produced >= 1_000_000
+
+
+def test_min_blocks_mixed_many_parts_within_budget():
+    # 20 parts: the tail split is a knapsack, not 2^20 subsets
+    parts = [ExtraPart(name=f"P{i}", count=1, thickness_cm=round(0.8 + 0.17 * i, 2)) for i in range(20)]
+    data = _caps_input(boy=12, en=13, yukseklik=7.3, extra_parts=parts, req_boxes=12345,
+                       multi_block="mixed")
+    res = EPSLogic(cache_size=0).calculate(data, time_budget=0.2)
+    assert res.optimal
+    assert all(v >= 0 for v in res.excess.values())
+
+    # Past the deadline the uniform plan comes back, marked not optimal
+    comps = ['Box', 'p0', 'p1']
+    per_sira = {'Box': 3, 'p0': 7, 'p1': 5}
+    required = {'Box': 100, 'p0': 100, 'p1': 100}
+    k, rows, _ = min_blocks_fast(6, comps, per_sira, required)
+    assert min_blocks_mixed(6, comps, per_sira, required, k, rows,
+                            deadline=time.monotonic() - 1) == (k, [(k, rows)], False)
+
+
+def test_mixed_multi_block_order_beats_uniform():
+    uniform = EPSLogic().calculate(_caps_input(req_boxes=2000))
+    mixed = EPSLogic().calculate(_caps_input(req_boxes=2000, multi_block="mixed"))
+    assert uniform.block_plans is None
+    assert mixed.blocks_needed < uniform.blocks_needed
+    assert sum(p.blocks for p in mixed.block_plans) == mixed.blocks_needed
+    assert all(v >= 0 for v in mixed.excess.values())
+    assert sum(mixed.excess.values()) < sum(uniform.excess.values())
+    assert mixed.pricing.total_price < uniform.pricing.total_price
+
+
+def test_block_catalogue_picks_cheapest_type_and_prunes_by_bound():
+    from src.logic import AXIS_CONFIGS, axis_configs
+    from src.models import DEFAULT_BLOCK, BlockType, StoredPlan
+
+    assert axis_configs(DEFAULT_BLOCK) == [
+        {**cfg, 'table': [float(v) for v in cfg['table']]} for cfg in AXIS_CONFIGS
+    ]
+
+    catalogue = [
+        DEFAULT_BLOCK,
+        BlockType(name="100x100x200", dims=[100, 100, 200], block_usd=95),
+        BlockType(name="60x100x120", dims=[60, 100, 120], long_tolerance=2, rule_limit=30, block_usd=40),
+        BlockType(name="gold", dims=[103, 122, 202], block_usd=5000),
+    ]
+    for qty in (None, 40, 800, 5000):
+        for boy, en in ((22.5, 18.5), (48, 35), (90, 55)):
+            data = _caps_input(boy=boy, en=en, req_boxes=qty)
+            engine = EPSLogic(blocks=catalogue)
+            res = engine.calculate(data)
+            singles = [EPSLogic(blocks=[b]).calculate(data) for b in catalogue]
+            key = (lambda r: r.pricing.unit_price) if qty is None else (lambda r: r.pricing.total_price)
+            feasible = [r for r in singles if r.blocks_needed and r.per_block["Box"]]
+            assert key(res) == min(key(r) for r in feasible)
+            # The 5000 USD block never beats the standard one -> pruned unseen
+            assert res.details.block_type != "gold"
+            assert engine.cache_info()["misses"] < len(catalogue)
+
+            total = res.excess if qty is None else {k: res.required[k] + res.excess[k] for k in res.required}
+            block_usd = next(b.block_usd for b in catalogue if b.name == res.details.block_type)
+            stored = StoredPlan(blocks_needed=res.blocks_needed, total_produced=total,
+                                req_boxes=qty, block_usd=block_usd)
+            assert engine.reprice_many([stored])[0] == res.pricing
+
+
+def test_block_catalogue_in_price_sheet_and_nesting():
+    from src.models import BlockType
+    from src.nesting import nest
+
+    catalogue = [BlockType(name="exp", dims=[103, 122, 202], block_usd=500),
+                 BlockType(name="cheap", dims=[103, 122, 202], block_usd=100)]
+    engine = EPSLogic(blocks=catalogue)
+    data = _caps_input(boy=40, en=30, yukseklik=20, req_boxes=500)
+    sheet = engine.price_sheet(data, [1, 500, 5000])
+    for tier in sheet.tiers:
+        single = engine.calculate(data.model_copy(update={"req_boxes": tier.req_boxes}))
+        assert single.details.block_type == "cheap"
+        assert (tier.blocks_needed, tier.pricing) == (single.blocks_needed, single.pricing)
+    assert sheet.details.block_type == "cheap"
+
+    out = nest(engine, [data, data.model_copy(update={"req_boxes": 80})])
+    assert {b.block_type for b in out.blocks} == {"cheap"}
+
+
+def test_config_version_covers_every_quote_setting():
+    from src.models import BlockType, PricingConfig
+
+    base = EPSLogic().config_version()
+    assert EPSLogic(cache_size=0).config_version() == base
+    variants = [
+        EPSLogic(blocks=[BlockType(name="103x122x202", dims=[103, 122, 202], block_usd=80)]),
+        EPSLogic(packing="guillotine"),
+        EPSLogic(strategy="exhaustive"),
+        EPSLogic(pricing=PricingConfig(usd_rate=PricingConfig().usd_rate + 1)),
+    ]
+    versions = {e.config_version() for e in variants}
+    assert len(versions) == len(variants) and base not in versions
+    assert (EPSLogic(packing="guillotine", packing_budget=1.0).config_version()
+            != EPSLogic(packing="guillotine").config_version())
+
+
+def test_profiled_counts_explored_partitions():
+    from src.metrics import profiled
+
+    data = _caps_input()
+    engine = EPSLogic(strategy="exhaustive", cache_size=0)
+    out, timings = profiled(engine.calculate, data)
+    comps = 1 + len(data.extra_parts)
+    assert timings["partitions"] == sum(1 for _ in partitions(out.details.layout_2d.sira_adedi, comps))
+    assert all(v >= 0 for v in timings["seconds"].values())
+    assert timings["seconds"]["planning"] > 0
+    # Nothing is recorded outside profiled()
+    assert engine.calculate(data) == out
@@ -0,0 +1,42 @@
+import random
+
+from src.logic import EPSLogic
+from src.models import EPSInput, ExtraPart
+from src.nesting import nest
+
+
+def _orders(n, seed):
+    rng = random.Random(seed)
+    return [EPSInput(
+        boy=rng.uniform(15, 60), en=rng.uniform(15, 50), yukseklik=rng.uniform(8, 40),
+        wall_thickness=1, req_boxes=rng.randint(20, 800),
+        extra_parts=[ExtraPart(name="Kapak", count=2, thickness_cm=1.5)] if rng.random() < 0.5 else [],
+    ) for _ in range(n)]
+
+
+def test_nesting_covers_every_order_and_saves_blocks():
+    engine = EPSLogic()
+    orders = _orders(200, seed=4)
+    out = nest(engine, orders)
+    assert not out.unplaced
+    assert out.blocks_needed == len(out.blocks)
+    assert 0 < out.blocks_saved == out.standalone_blocks - out.blocks_needed
+
+    made = {}
+    for block in out.blocks:
+        assert block.used_width_cm <= block.table_axes[0] + 1e-6
+        for o in block.orders:
+            for name, rows in o.sira_plan.items():
+                made[(o.order, name)] = made.get((o.order, name), 0) + rows
+    for i, data in enumerate(orders):
+        per_sira = engine.geometry(data)['per_sira']
+        assert made[(i, 'Box')] * per_sira['Box'] >= data.req_boxes
+        for p in data.extra_parts:
+            assert made[(i, p.name)] * per_sira[p.name] >= data.req_boxes * p.count
+
+
+def test_single_order_matches_standalone_quote():
+    engine = EPSLogic()
+    for data in _orders(30, seed=9):
+        out = nest(engine, [data])
+        assert out.blocks_needed <= engine.calculate(data).blocks_needed
@@ -0,0 +1,68 @@
+import math
+import random
+import time
+
+from src import packing
+from src.packing import pack
+
+
+def _grid(W, H, x, y):
+    return max(math.floor(W / x) * math.floor(H / y), math.floor(W / y) * math.floor(H / x))
+
+
+def _assert_valid(W, H, x, y, placements):
+    rects = [(px, py, px + (y if r else x), py + (x if r else y)) for px, py, r in placements]
+    eps = 1e-9
+    for r in rects:
+        assert r[0] >= 0 and r[1] >= 0 and r[2] <= W + eps and r[3] <= H + eps
+    rects.sort()
+    for i, a in enumerate(rects):
+        for b in rects[i + 1:]:
+            if b[0] >= a[2] - eps:
+                break
+            assert a[3] <= b[1] + eps or b[3] <= a[1] + eps
+
+
+def test_guillotine_never_below_grid_and_layout_is_valid():
+    rng = random.Random(3)
+    for _ in range(60):
+        x, y = rng.randint(30, 600) / 10 + 0.2, rng.randint(30, 600) / 10 + 0.2
+        for W, H in [(103, 122), (199, 122), (199, 103)]:
+            count, placements, complete = pack(W, H, x, y, time.monotonic() + 5)
+            assert complete
+            assert count >= _grid(W, H, x, y)
+            assert len(placements) == count
+            _assert_valid(W, H, x, y, placements)
+
+
+def test_guillotine_mixes_rotations():
+    # 10.2 x 13.7 on 199 x 122: a uniform grid fits 154, mixed strips 168
+    count, placements, complete = pack(199, 122, 10.2, 13.7)
+    assert complete and count == 168
+    assert {r for _, _, r in placements} == {True, False}
+    _assert_valid(199, 122, 10.2, 13.7, placements)
+
+
+def _no_tables(*args):
+    raise AssertionError("DP tables built")
+
+
+def test_guillotine_budget_falls_back_to_one_cut(monkeypatch):
+    # Deadline already passed: one-cut layout without building the DP tables
+    monkeypatch.setattr(packing, "_init", _no_tables)
+    count, placements, complete = pack(199, 122, 5.5, 7.1, deadline=time.monotonic())
+    assert not complete
+    assert count >= _grid(199, 122, 5.5, 7.1)
+    assert len(placements) == count
+    _assert_valid(199, 122, 5.5, 7.1, placements)
+
+
+def test_guillotine_small_pieces_skip_the_dp(monkeypatch):
+    # Millions of DP states even at coarse resolution: one-cut layout, no tables
+    monkeypatch.setattr(packing, "_init", _no_tables)
+    for x, y in [(1.2, 1.7), (1.21, 1.33), (0.41, 0.53)]:
+        count, placements, complete = pack(199, 122, x, y, deadline=time.monotonic() + 0.5)
+        assert complete and count >= _grid(199, 122, x, y)
+        assert len(placements) == count
+        if x == 1.2:
+            _assert_valid(199, 122, x, y, placements)
@@ -0,0 +1,50 @@
+import random
+
+from src.logic import EPSLogic
+from src.models import EPSInput, Machine, ScheduleInput, ScheduleJob
+from src.scheduling import block_cuts, schedule
+
+
+def _jobs(n, seed):
+    rng = random.Random(seed)
+    engine = EPSLogic()
+    return [ScheduleJob(
+        job_id=f"J{i}",
+        plan=engine.calculate(EPSInput(
+            boy=rng.uniform(15, 60), en=rng.uniform(15, 50), yukseklik=rng.uniform(8, 40),
+            wall_thickness=1, req_boxes=rng.randint(50, 3000),
+        )),
+        due_s=rng.uniform(3600, 30 * 8 * 3600),
+    ) for i in range(n)]
+
+
+def _check(req, out):
+    expected = {(j.job_id, k) for j in req.jobs for k in range(1, j.plan.blocks_needed + 1)}
+    seen = [(b.job_id, b.block) for m in out.machines for b in m.blocks]
+    assert sorted(seen) == sorted(expected)
+    for m in out.machines:
+        t = 0.0
+        for b in m.blocks:
+            assert abs(b.start_s - t) < 1e-2 and b.end_s > b.start_s
+            t = b.end_s
+
+
+def test_schedule_covers_every_block():
+    jobs = _jobs(300, seed=1)
+    machines = [Machine(name="A"), Machine(name="B", speed=1.5), Machine(name="C", speed=0.8)]
+    for objective in ("makespan", "lateness"):
+        req = ScheduleInput(jobs=jobs, machines=machines, objective=objective)
+        _check(req, schedule(req))
+
+
+def test_makespan_near_lower_bound_and_lateness_objective_helps():
+    jobs = _jobs(120, seed=2)
+    machines = [Machine(name=f"M{i}") for i in range(4)]
+    req = ScheduleInput(jobs=jobs, machines=machines)
+    work = sum(n * (req.setup_s + xy * req.xy_cut_s + z * req.z_cut_s)
+               for j in jobs for n, xy, z in block_cuts(j.plan))
+    out = schedule(req)
+    assert work / 4 <= out.makespan_s <= work / 4 * 1.01
+
+    edd = schedule(req.model_copy(update={"objective": "lateness"}))
+    assert edd.max_lateness_s <= out.max_lateness_s
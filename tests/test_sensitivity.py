@@ -0,0 +1,50 @@
+import random
+
+from src.logic import EPSLogic
+from src.models import EPSInput, ExtraPart, SensitivityInput
+from src.sensitivity import sensitivity
+
+
+def _outcome(r):
+    return r["blocks_needed"], r["per_block"]
+
+
+def _with(data, dimension, value):
+    if dimension.startswith("part:"):
+        parts = [p.model_copy(update={"thickness_cm": value}) if f"part:{p.name}" == dimension else p
+                 for p in data.extra_parts]
+        return data.model_copy(update={"extra_parts": parts})
+    return data.model_copy(update={dimension: value})
+
+
+def test_breakpoints_match_grid_scan():
+    # The first 1 mm step that changes the quote, found by scanning every step
+    engine = EPSLogic()
+    rng = random.Random(4)
+    window = 2.0
+    for _ in range(25):
+        parts = [ExtraPart(name=f"p{i}", count=1, thickness_cm=round(rng.uniform(0.5, 3), 1))
+                 for i in range(rng.randint(0, 2))]
+        data = EPSInput(boy=round(rng.uniform(5, 70), 1), en=round(rng.uniform(5, 70), 1),
+                        yukseklik=round(rng.uniform(3, 60), 1), wall_thickness=1,
+                        extra_parts=parts, req_boxes=rng.choice([None, 50, 777]))
+        out = sensitivity(engine, SensitivityInput(product=data, max_change_cm=window))
+        base = _outcome(engine.calculate_lean(data))
+        assert len(out.dimensions) == 3 + len(parts)
+        for dim in out.dimensions:
+            scanned = 0
+            for sign, cliff in ((-1, dim.decrease), (1, dim.increase)):
+                expected = None
+                for i in range(1, int(window * 10) + 1):
+                    value = round(dim.value + sign * i * 0.1, 6)
+                    if value <= 0:
+                        break
+                    scanned += 1
+                    result = engine.calculate_lean(_with(data, dim.dimension, value))
+                    if _outcome(result) != base:
+                        expected = value
+                        break
+                assert (cliff.value if cliff else None) == expected, (data, dim.dimension, sign)
+                if cliff:
+                    assert cliff.blocks_needed == result["blocks_needed"]
+            assert dim.evaluated <= scanned
@@ -0,0 +1,80 @@
+import asyncio
+
+from src.logic import EPSLogic
+from src.models import BlockType, EPSInput, ExtraPart
+from src.session import SessionStore, Superseded
+
+
+def _edits():
+    base = EPSInput(boy=40, en=30, yukseklik=20, wall_thickness=1, req_boxes=500,
+                    extra_parts=[ExtraPart(name="Kapak", count=1, thickness_cm=2)])
+    return [
+        (base, ["geometry", "planning", "pricing", "report"]),
+        (base.model_copy(update={"wall_thickness": 1.5}), []),
+        (base.model_copy(update={"dns": 20}), ["pricing", "report"]),
+        (base.model_copy(update={"dns": 20, "req_boxes": 900}), ["planning", "pricing", "report"]),
+        (base.model_copy(update={"dns": 20, "req_boxes": 900, "multi_block": "mixed"}),
+         ["planning", "pricing", "report"]),
+        (base.model_copy(update={"dns": 20, "req_boxes": 900, "multi_block": "mixed", "en": 31.5}),
+         ["geometry", "planning", "pricing", "report"]),
+        (base.model_copy(update={"req_boxes": None}), ["geometry", "planning", "pricing", "report"]),
+    ]
+
+
+def test_session_reruns_only_affected_stages():
+    engine = EPSLogic()
+    store = SessionStore(engine)
+
+    async def run():
+        for data, expected in _edits():
+            output, stages, timings = await store.calculate("s", data)
+            assert stages == expected
+            # Same answer as a fresh full calculation
+            assert output == EPSLogic(cache_size=0).calculate(data)
+            if not stages:
+                assert timings["seconds"]["planning"] == 0
+
+    asyncio.run(run())
+    assert store.info()["unchanged"] == 1 and store.info()["sessions"] == 1
+
+
+def test_session_with_block_catalogue_reselects_block():
+    blocks = [BlockType(name="std", dims=[103, 122, 202]),
+              BlockType(name="small", dims=[60, 100, 120], block_usd=20)]
+    store = SessionStore(EPSLogic(blocks=blocks))
+    data = EPSInput(boy=20, en=15, yukseklik=10, wall_thickness=1, req_boxes=50)
+
+    async def run():
+        for d in (data, data.model_copy(update={"req_boxes": 50_000}),
+                  data.model_copy(update={"req_boxes": 50_000, "dns": 18})):
+            output, stages, _ = await store.calculate("s", d)
+            assert stages[0] == "geometry"
+            assert output == EPSLogic(blocks=blocks, cache_size=0).calculate(d)
+
+    asyncio.run(run())
+
+
+def test_session_newest_edit_wins():
+    store = SessionStore(EPSLogic())
+    data = [EPSInput(boy=40, en=30, yukseklik=20, wall_thickness=1, req_boxes=n)
+            for n in (100, 200, 300)]
+
+    async def run():
+        # Three edits in one burst: the queued middle one never runs
+        results = await asyncio.gather(*[store.calculate("s", d) for d in data],
+                                       return_exceptions=True)
+        assert isinstance(results[1], Superseded)
+        assert results[2][0] == EPSLogic().calculate(data[2])
+        # Out-of-order arrival: an older edit counter is rejected
+        await store.calculate("t", data[0], seq=5)
+        try:
+            await store.calculate("t", data[1], seq=4)
+            assert False, "expected Superseded"
+        except Superseded:
+            pass
+        # Sessions are independent
+        await store.calculate("u", data[1], seq=1)
+
+    asyncio.run(run())
+    assert store.info()["superseded"] >= 2
+    assert store.drop("t") and not store.drop("t")
@@ -0,0 +1,66 @@
+from src.store import QuoteStore
+
+
+def test_batched_writes_and_lookup(tmp_path):
+    store = QuoteStore(str(tmp_path / "quotes.db"), batch_size=3, flush_interval=60)
+    store.put("a", "v1", '{"blocks_needed": 1}')
+    store.put("b", "v1", '{"blocks_needed": 2}')
+    assert store.info()["pending"] == 2
+    assert store.get("a", "v1") == '{"blocks_needed": 1}'  # served from the batch
+    store.put("c", "v1", '{"blocks_needed": 3}')  # full batch -> writer thread flushes
+    assert store.wait_flushed(timeout=10)
+    assert store.info()["pending"] == 0 and store.info()["rows"] == 3
+    assert store.get("b", "v1") == '{"blocks_needed": 2}'
+    assert store.get("b", "v2") is None
+    store.close()
+
+    reopened = QuoteStore(str(tmp_path / "quotes.db"))
+    assert reopened.get("c", "v1") == '{"blocks_needed": 3}'
+    reopened.close()
+
+
+def test_prune_ttl_and_size(tmp_path):
+    store = QuoteStore(str(tmp_path / "quotes.db"), max_rows=2, batch_size=1)
+    for key in "abc":
+        store.put(key, "v1", "{}")
+        assert store.wait_flushed(timeout=10)
+    assert store.prune() == 1
+    assert store.get("a", "v1") is None
+    assert store.info()["rows"] == 2
+
+    store.ttl = -1  # everything expired
+    assert store.get("c", "v1") is None
+    assert store.prune() == 2
+    store.close()
+
+
+def test_quiet_store_flushes_on_interval(tmp_path):
+    # A lone write below the batch size is persisted without further traffic
+    store = QuoteStore(str(tmp_path / "quotes.db"), batch_size=100, flush_interval=0.05)
+    store.put("a", "v1", "{}")
+    assert store.wait_flushed(timeout=10)
+    assert store.info()["rows"] == 1
+    store.close()
+
+
+def test_put_does_not_wait_on_a_locked_database(tmp_path):
+    # Another worker holds the write lock: the writer thread waits on it,
+    # buffering (put) and buffered lookups (get) do not
+    import sqlite3
+    import threading
+
+    path = str(tmp_path / "quotes.db")
+    store = QuoteStore(path, batch_size=1, flush_interval=0.05)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    store.put("a", "v1", '{"a": 1}')
+    putter = threading.Thread(target=store.put, args=("b", "v1", '{"b": 2}'))
+    putter.start()
+    putter.join(timeout=2)
+    assert not putter.is_alive()
+    assert store.get("a", "v1") == '{"a": 1}'
+    other.execute("ROLLBACK")
+    other.close()
+    assert store.wait_flushed(timeout=20)
+    assert store.info()["rows"] == 2
+    store.close()
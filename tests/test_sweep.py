@@ -0,0 +1,24 @@
+import json
+
+from src.logic import EPSLogic
+from src.models import BlockType, EPSInput, SweepInput
+from src.sweep import chunks, sweep_lines
+
+
+def test_sweep_lines_match_calculate_with_block_catalogue():
+    catalogue = [BlockType(name="exp", dims=[103, 122, 202], block_usd=500),
+                 BlockType(name="cheap", dims=[103, 122, 202], block_usd=100)]
+    sweep = SweepInput(boy={"start": 40, "stop": 41, "step": 1}, en={"start": 30, "stop": 30, "step": 1},
+                       yukseklik={"start": 20, "stop": 20, "step": 1}, wall_thickness=1,
+                       quantities=[None, 500])
+    for blocks in (None, catalogue):
+        engine = EPSLogic(blocks=blocks)
+        lines = [json.loads(line) for points in chunks(sweep)
+                 for line in sweep_lines(engine, sweep, points).splitlines()]
+        assert len(lines) == sweep.points() == 4
+        for line in lines:
+            data = EPSInput(boy=line["boy"], en=line["en"], yukseklik=line["yukseklik"],
+                            wall_thickness=1, req_boxes=line["req_boxes"])
+            assert line["result"] == engine.calculate(data).model_dump(mode="json")
+        if blocks:
+            assert {line["result"]["details"]["block_type"] for line in lines} == {"cheap"}